@@ -1,12 +1,59 @@
 import os
 import logging
 import json
-import queue
-import threading
-from datetime import datetime, timedelta
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 from flask import Flask, render_template, request, jsonify, Response, stream_with_context, session
-from utils.github import create_github_issue, validate_github_token
-from utils.gemini_helper import process_issue_description
+from werkzeug.exceptions import RequestEntityTooLarge
+from utils.github import (
+    check_issue_access,
+    create_github_issue,
+    create_github_issues,
+    extract_repo_info,
+    get_label_names,
+    get_metadata_cache_stats,
+    get_repo_id_cache_stats,
+    get_schema_cache_stats,
+    get_token_cache_stats,
+    link_related_issues,
+    new_marker,
+    parse_issue_fields,
+    resolve_issue_fields,
+    token_fingerprint,
+    validate_github_token,
+    validate_query_registry,
+)
+from utils.admission import AdmissionRejected, llm_admission
+from utils.code_index import (
+    CODE_INDEX_MAX_ARCHIVE_BYTES,
+    build_code_context,
+    get_code_index,
+    get_code_index_stats,
+    index_archive,
+    index_local_path,
+    is_allowed_local_path,
+)
+from utils.context_compactor import compact_code_context
+from utils.duplicates import DUPLICATE_CHECK, find_duplicates, get_duplicate_index_stats
+from utils.providers import format_issue, latency_tracker
+from utils.issue_cache import get_issue_cache_stats
+from utils.jobs import JobQueueFull, JobRunner
+from utils.metrics import render_prometheus, set_gauge, track_stage
+from utils.outbox import (
+    OUTBOX_ENABLED,
+    enqueue_issue,
+    get_outbox_item,
+    get_outbox_stats,
+    init_outbox,
+    is_transient_error,
+    list_outbox_items,
+    release_token,
+    start_drain_worker,
+    submit_now,
+)
+from utils.progress import create_progress_backend, start_cleanup_thread
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -18,23 +65,58 @@ app.secret_key = os.environ.get("FLASK_SECRET_KEY", "default_secret_key")
 app.config['SESSION_COOKIE_SECURE'] = True
 app.config['SESSION_COOKIE_HTTPONLY'] = True
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=1)
+# Repository archive uploads are the largest request bodies
+app.config['MAX_CONTENT_LENGTH'] = CODE_INDEX_MAX_ARCHIVE_BYTES + 1024 * 1024
 
-# Store progress updates for each session
-progress_queues = {}
-progress_cleanup = {}
-
-def cleanup_old_sessions():
-    """Remove progress queues for sessions older than 5 minutes"""
-    current_time = datetime.now()
-    to_remove = []
-    for session_id, timestamp in progress_cleanup.items():
-        if current_time - timestamp > timedelta(minutes=5):
-            to_remove.append(session_id)
-    
-    for session_id in to_remove:
-        if session_id in progress_queues:
-            del progress_queues[session_id]
-        del progress_cleanup[session_id]
+# Check the precompiled GraphQL queries against GitHub's schema at startup
+# when a server-side token is available; otherwise this happens on first use.
+if os.environ.get("GITHUB_TOKEN"):
+    try:
+        validate_query_registry(os.environ["GITHUB_TOKEN"])
+    except Exception as e:
+        logger.warning(f"Could not validate GraphQL query registry at startup: {str(e)}")
+
+# Limits for the bulk /create_issues endpoint
+BULK_MAX_ISSUES = int(os.environ.get("BULK_MAX_ISSUES", 100))
+BULK_FORMAT_CONCURRENCY = int(os.environ.get("BULK_FORMAT_CONCURRENCY", 8))
+
+# Limits for filing one issue in several repositories (repo_urls). Checks and
+# submissions for every target share one bounded pool.
+FANOUT_MAX_REPOS = int(os.environ.get("FANOUT_MAX_REPOS", 10))
+FANOUT_CONCURRENCY = int(os.environ.get("FANOUT_CONCURRENCY", 8))
+fanout_executor = ThreadPoolExecutor(max_workers=FANOUT_CONCURRENCY, thread_name_prefix="fanout")
+
+# Progress updates for each session go through a pluggable bus (in-process by
+# default, SQLite when PROGRESS_BACKEND=sqlite for multi-worker deployments)
+progress_backend = create_progress_backend()
+start_cleanup_thread(progress_backend)
+
+# Background pipeline runner for asynchronous /create_issue submissions. Job
+# records are shared through the progress bus so any worker can report them.
+job_runner = JobRunner(
+    max_workers=int(os.environ.get("JOB_WORKERS", 4)),
+    max_queue=int(os.environ.get("JOB_QUEUE_DEPTH", 100)),
+    store=progress_backend
+)
+
+# Server-sent event stream tuning for /progress
+SSE_HEARTBEAT_SECONDS = float(os.environ.get("SSE_HEARTBEAT_SECONDS", 15))
+SSE_MAX_STREAM_SECONDS = float(os.environ.get("SSE_MAX_STREAM_SECONDS", 5 * 60))
+SSE_RETRY_MS = int(os.environ.get("SSE_RETRY_MS", 2000))
+
+# Progress streams replay every buffered event, including formatted issues, so
+# they are only served to the browser session that minted the ID (POST
+# /progress) or, for asynchronous submissions, to holders of the job ID
+PROGRESS_IDS_PER_SESSION = 20
+
+# Stream partial titles/bodies from the LLM over the progress channel
+LLM_STREAMING = os.environ.get("LLM_STREAMING", "true").lower() == "true"
+
+# Formatted issues are written to a durable outbox before submission so a
+# GitHub outage or exhausted rate limit queues them instead of losing them
+if OUTBOX_ENABLED:
+    init_outbox(app)
+    start_drain_worker()
 
 @app.route('/')
 def index():
@@ -71,63 +153,390 @@ def save_token():
 @app.route('/token', methods=['DELETE'])
 def clear_token():
     """Clear the stored GitHub token"""
-    session.pop('github_token', None)
+    token = session.pop('github_token', None)
+    if token and OUTBOX_ENABLED:
+        release_token(token)
     return jsonify({'status': 'success', 'message': 'Token cleared'})
 
-def send_progress_update(session_id, step, error=None, complete=False):
+def request_token():
+    """GitHub token for read-only endpoints: the X-GitHub-Token header, else the one saved in the session"""
+    return request.headers.get('X-GitHub-Token') or session.get('github_token')
+
+def admission_key(github_token, session_id=None):
+    """Queue key for LLM admission: one queue per GitHub token, so per user"""
+    return token_fingerprint(github_token) if github_token else session_id or 'anonymous'
+
+def admission_rejected_response(error, step='validation'):
+    """429 response telling the client when to retry"""
+    return jsonify({
+        'error': str(error),
+        'step': step,
+        'status': 'error',
+        'retry_after': error.retry_after
+    }), 429, {'Retry-After': str(error.retry_after)}
+
+def access_error(repo_url, github_token):
+    """Return (error, status code) if the token cannot open issues in the repository, else None"""
+    try:
+        error = check_issue_access(repo_url, github_token)
+    except ValueError as e:
+        return str(e), 400
+    except Exception as e:
+        # GitHub is unreachable; let the submission through so it can be queued
+        logger.warning(f"Could not check repository access: {str(e)}")
+        return None
+    return (error, 403) if error else None
+
+def access_denied_response(repo_url, github_token):
+    """Return an error response if the token cannot open issues in the repository, else None"""
+    problem = access_error(repo_url, github_token)
+    if not problem:
+        return None
+    error, status_code = problem
+    return jsonify({
+        'error': error,
+        'step': 'validation',
+        'status': 'error'
+    }), status_code
+
+def fields_problem(repo_url, github_token, fields):
+    """Return an error naming labels, assignees or a milestone that do not exist in the repository, else None"""
+    if not fields:
+        return None
+    try:
+        owner, repo = extract_repo_info(repo_url)
+        resolve_issue_fields(owner, repo, github_token, **fields)
+    except ValueError as e:
+        return str(e)
+    except Exception as e:
+        # Resolved again at submission time, where failures are retried
+        logger.warning(f"Could not resolve labels, assignees or milestone: {str(e)}")
+    return None
+
+def submission_problem(repo_url, github_token, fields):
+    """Return (error, status code) if the issue can never be created in the repository, else None"""
+    problem = access_error(repo_url, github_token)
+    if problem:
+        return problem
+    error = fields_problem(repo_url, github_token, fields)
+    return (error, 400) if error else None
+
+def for_each_target(fn, repo_urls):
+    """Return [fn(url) for each repository], using the fan-out pool only when there is more than one"""
+    if len(repo_urls) == 1:
+        return [fn(repo_urls[0])]
+    return list(fanout_executor.map(fn, repo_urls))
+
+def label_options(repo_urls, github_token):
+    """Return the label names every repository has, for the LLM to choose from, or None if unavailable"""
+    def names(repo_url):
+        owner, repo = extract_repo_info(repo_url)
+        return get_label_names(owner, repo, github_token)
+
+    try:
+        label_sets = for_each_target(names, repo_urls)
+    except Exception as e:
+        logger.warning(f"Could not load labels for suggestions: {str(e)}")
+        return None
+    shared = [
+        label for label in label_sets[0]
+        if all(label.lower() in {other.lower() for other in labels} for labels in label_sets[1:])
+    ]
+    return shared or None
+
+def with_suggested_labels(fields, processed_issue):
+    """Add the labels the LLM suggested to those given with the request"""
+    suggested = processed_issue.get('labels') or []
+    if not suggested:
+        return fields
+    labels = list(dict.fromkeys((fields or {}).get('labels', []) + suggested))
+    return dict(fields or {}, labels=labels)
+
+def likely_duplicates(repo_url, description, github_token):
+    """Return existing issues similar to the description; never blocks a submission on failure"""
+    if not DUPLICATE_CHECK:
+        return []
+    try:
+        return find_duplicates(repo_url, description, github_token)
+    except Exception as e:
+        logger.warning(f"Duplicate check failed: {str(e)}")
+        return []
+
+def send_progress_update(session_id, step, error=None, complete=False, data=None):
     """Send a progress update to the client"""
-    if session_id in progress_queues:
-        progress_queues[session_id].put({
+    if not session_id:
+        return
+    try:
+        progress_backend.publish(session_id, {
             'step': step,
             'error': error,
-            'complete': complete
+            'complete': complete,
+            **(data or {})
         })
+    except Exception as e:
+        logger.warning(f"Failed to publish progress update: {str(e)}")
+
+@app.route('/progress', methods=['POST'])
+def new_progress_session():
+    """Mint a progress session ID bound to the caller's browser session"""
+    session_id = uuid.uuid4().hex
+    minted = session.get('progress_ids') or []
+    session['progress_ids'] = minted[-(PROGRESS_IDS_PER_SESSION - 1):] + [session_id]
+    return jsonify({'session_id': session_id})
+
+def owns_progress_session(session_id):
+    """True if this browser session minted the progress ID"""
+    return session_id in (session.get('progress_ids') or [])
 
 @app.route('/progress/<session_id>')
 def progress(session_id):
-    """SSE endpoint for progress updates"""
-    cleanup_old_sessions()
-    
-    if session_id not in progress_queues:
-        progress_queues[session_id] = queue.Queue()
-        progress_cleanup[session_id] = datetime.now()
+    """
+    SSE endpoint for progress updates. Events carry their bus ID so a reconnecting
+    EventSource resumes from Last-Event-ID; idle periods send heartbeat comments.
+    """
+    if not owns_progress_session(session_id) and job_runner.get(session_id) is None:
+        return jsonify({'error': 'Unknown progress session', 'status': 'error'}), 404
+
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID') or request.args.get('last_event_id') or 0)
+    except ValueError:
+        last_event_id = 0
 
     def generate():
-        q = progress_queues[session_id]
-        while True:
-            try:
-                progress_data = q.get(timeout=30)  # 30 second timeout
+        nonlocal last_event_id
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        deadline = time.monotonic() + SSE_MAX_STREAM_SECONDS
+        while time.monotonic() < deadline:
+            events = progress_backend.read(session_id, last_event_id, timeout=SSE_HEARTBEAT_SECONDS)
+            if not events:
+                yield ": heartbeat\n\n"
+                continue
+            for event_id, progress_data in events:
+                last_event_id = event_id
+                yield f"id: {event_id}\ndata: {json.dumps(progress_data)}\n\n"
                 if progress_data.get('complete') or progress_data.get('error'):
-                    break
-                yield f"data: {json.dumps(progress_data)}\n\n"
-            except queue.Empty:
-                break
-        
-        # Clean up the queue
-        if session_id in progress_queues:
-            del progress_queues[session_id]
-        if session_id in progress_cleanup:
-            del progress_cleanup[session_id]
-    
-    return Response(stream_with_context(generate()), mimetype='text/event-stream')
+                    return
+        # Long-lived streams are closed periodically; the browser reconnects
+        # with Last-Event-ID and picks up where it left off.
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def format_for_submission(session_id, repo_urls, description, code_context, github_token, suggest_labels=False):
+    """Compact the code context and format the description; returns (issue, context stats)"""
+    # Process the description with Gemini, streaming the partial issue
+    # to the progress channel when someone may be listening
+    send_progress_update(session_id, 'processing_description')
+    context_stats = None
+    if code_context:
+        code_context, context_stats = compact_code_context(code_context, description)
+        logger.info(
+            f"Compacted code context from {context_stats['original_tokens']} "
+            f"to {context_stats['compacted_tokens']} tokens"
+        )
+        send_progress_update(session_id, 'processing_description', data={'context_stats': context_stats})
+    on_partial = None
+    if session_id and LLM_STREAMING:
+        on_partial = lambda partial: send_progress_update(session_id, 'processing_description', data=partial)
+    options = label_options(repo_urls, github_token) if suggest_labels else None
+    with track_stage('llm_format'):
+        processed_issue = format_issue(
+            description, code_context, on_partial=on_partial, label_options=options,
+            admission_key=admission_key(github_token, session_id)
+        )
+    return processed_issue, context_stats
+
+def submit_issue(session_id, repo_url, processed_issue, github_token, fields=None, progress=None, marker=None):
+    """
+    Create a formatted issue, through the outbox when it is enabled. If GitHub
+    is unavailable the issue stays queued for the drain worker and a result
+    with status 'queued' is returned instead.
+    """
+    with track_stage('github_create'):
+        if not OUTBOX_ENABLED:
+            return create_github_issue(
+                repo_url=repo_url,
+                title=processed_issue['title'],
+                body=processed_issue['body'],
+                token=github_token,
+                progress=progress,
+                marker=marker,
+                **(fields or {})
+            )
+
+        outbox_id = enqueue_issue(
+            repo_url, processed_issue['title'], processed_issue['body'], github_token, session_id,
+            claim=True, fields=fields, marker=marker
+        )
+        try:
+            result = submit_now(outbox_id, progress=progress)
+        except Exception as e:
+            if not is_transient_error(e):
+                raise
+            logger.warning(f"Queued issue {outbox_id} for later submission: {str(e)}")
+            return {
+                'success': False,
+                'status': 'queued',
+                'step': 'queued',
+                'outbox_id': outbox_id,
+                'status_url': f'/outbox/{outbox_id}',
+                'details': str(e)
+            }
+        result['outbox_id'] = outbox_id
+        return result
+
+def run_issue_pipeline(session_id, repo_url, description, code_context, github_token, fields=None,
+                       suggest_labels=False):
+    """Format the description and create the GitHub issue, reporting progress"""
+    try:
+        processed_issue, context_stats = format_for_submission(
+            session_id, [repo_url], description, code_context, github_token, suggest_labels
+        )
+        fields = with_suggested_labels(fields, processed_issue)
+
+        # Create the issue using GitHub GraphQL API; each GitHub stage reports
+        # its own progress as it starts
+        report = lambda step: send_progress_update(session_id, step)
+        result = submit_issue(session_id, repo_url, processed_issue, github_token, fields, progress=report)
+        if result.get('status') == 'queued':
+            # GitHub is unavailable; the drain worker will retry it
+            send_progress_update(session_id, 'queued', complete=True, data={'outbox_id': result['outbox_id']})
+            return result
+
+        # Mark as complete
+        send_progress_update(session_id, 'completed', complete=True)
+        result['status'] = 'success'
+        result['step'] = 'completed'
+        if fields:
+            result.update(fields)
+        if context_stats:
+            result['context_stats'] = context_stats
+        return result
+
+    except Exception as e:
+        logger.error(f"Error in GitHub API call: {str(e)}")
+        send_progress_update(session_id, 'submitting_issue', error=str(e))
+        raise
+
+def run_fanout_pipeline(session_id, repo_urls, description, code_context, github_token, fields=None,
+                        suggest_labels=False, cross_link=False):
+    """
+    Format the description once and create the issue in every repository
+    concurrently, with one result per repository. With cross_link the
+    created issues are then edited to reference each other.
+    """
+    try:
+        processed_issue, context_stats = format_for_submission(
+            session_id, repo_urls, description, code_context, github_token, suggest_labels
+        )
+        fields = with_suggested_labels(fields, processed_issue)
+
+        send_progress_update(session_id, 'submitting_issue')
+        markers = {repo_url: new_marker() for repo_url in repo_urls}
+
+        def submit(repo_url):
+            try:
+                result = submit_issue(
+                    session_id, repo_url, processed_issue, github_token, fields, marker=markers[repo_url]
+                )
+            except Exception as e:
+                result = {'success': False, 'step': 'submitting_issue', 'error': str(e)}
+            return dict(result, repo_url=repo_url)
+
+        results = list(fanout_executor.map(submit, repo_urls))
+        created = [result for result in results if result['success']]
+        queued = [result for result in results if result.get('status') == 'queued']
+        if len(created) == len(results):
+            status = 'success'
+        elif created:
+            status = 'partial'
+        elif queued:
+            status = 'queued'
+        else:
+            status = 'error'
+
+        response = {
+            'status': status,
+            'step': 'completed',
+            'title': processed_issue['title'],
+            'created': len(created),
+            'queued': len(queued),
+            'failed': len(results) - len(created) - len(queued),
+            'results': results
+        }
+        if fields:
+            response.update(fields)
+        if context_stats:
+            response['context_stats'] = context_stats
+
+        if cross_link and len(created) > 1:
+            try:
+                if not all(result.get('id') for result in created):
+                    raise Exception('GitHub did not return the issue IDs needed to link them')
+                link_related_issues([
+                    {
+                        'id': result['id'],
+                        'repo': '/'.join(extract_repo_info(result['repo_url'])),
+                        'number': result['number'],
+                        'body': processed_issue['body'],
+                        'marker': markers[result['repo_url']]
+                    }
+                    for result in created
+                ], github_token)
+                response['cross_linked'] = True
+            except Exception as e:
+                # The issues exist either way; only the references are missing
+                logger.warning(f"Could not cross-link issues: {str(e)}")
+                response['cross_linked'] = False
+                response['cross_link_error'] = str(e)
+
+        send_progress_update(session_id, 'completed', complete=True)
+        return response
+
+    except Exception as e:
+        logger.error(f"Error creating issues in several repositories: {str(e)}")
+        send_progress_update(session_id, 'processing_description', error=str(e))
+        raise
 
 @app.route('/create_issue', methods=['POST'])
 def create_issue():
+    session_id = None
     try:
         data = request.json
-        session_id = data.get('session_id')
-        repo_url = data.get('repo_url')
+        # Only publish to progress IDs this browser minted
+        session_id = data.get('session_id') if owns_progress_session(data.get('session_id')) else None
         description = data.get('description')
         github_token = data.get('github_token') or session.get('github_token')
         code_context = data.get('code_context', '')
+        run_async = bool(data.get('async')) or request.args.get('async') == '1'
+        fields = parse_issue_fields(data)
+        suggest_labels = bool(data.get('suggest_labels'))
+
+        # One repository, or a list to file the same issue in each of them
+        repo_urls = data.get('repo_urls') or data.get('repo_url')
+        if isinstance(repo_urls, str):
+            repo_urls = [repo_urls]
+        repo_urls = list(dict.fromkeys(
+            url.strip() for url in repo_urls or [] if isinstance(url, str) and url.strip()
+        ))
 
-        if not all([repo_url, description]):
+        if not all([repo_urls, description]):
             return jsonify({
                 'error': 'Missing required fields',
                 'step': 'validation',
                 'status': 'error'
             }), 400
 
+        if len(repo_urls) > FANOUT_MAX_REPOS:
+            return jsonify({
+                'error': f'An issue can be filed in at most {FANOUT_MAX_REPOS} repositories per request',
+                'step': 'validation',
+                'status': 'error'
+            }), 400
+
         if not github_token:
             return jsonify({
                 'error': 'GitHub token is required',
@@ -135,38 +544,90 @@ def create_issue():
                 'status': 'error'
             }), 400
 
+        # Turn the request away now if the formatting queue is already full
         try:
-            # Process the description with Gemini
-            send_progress_update(session_id, 'processing_description')
-            processed_issue = process_issue_description(description, code_context)
-            
-            # Update progress for GraphQL query generation
-            send_progress_update(session_id, 'generating_query')
-            
-            # Create the issue using GitHub GraphQL API
-            send_progress_update(session_id, 'fetching_repo')
-            
-            # Submitting the issue
-            send_progress_update(session_id, 'submitting_issue')
-            result = create_github_issue(
-                repo_url=repo_url,
-                title=processed_issue['title'],
-                body=processed_issue['body'],
-                token=github_token
-            )
-            
-            # Mark as complete
-            send_progress_update(session_id, 'completed', complete=True)
-            result['status'] = 'success'
-            result['step'] = 'completed'
-            return jsonify(result)
+            llm_admission.check(admission_key(github_token, session_id))
+        except AdmissionRejected as e:
+            return admission_rejected_response(e)
+
+        # Reject submissions that can never be created before spending an LLM call
+        problems = for_each_target(lambda url: submission_problem(url, github_token, fields), repo_urls)
+        for repo_url, problem in zip(repo_urls, problems):
+            if problem:
+                error, status_code = problem
+                return jsonify({
+                    'error': f'{repo_url}: {error}' if len(repo_urls) > 1 else error,
+                    'step': 'validation',
+                    'status': 'error'
+                }), status_code
+
+        # Point out likely duplicates first; resubmitting with force skips this
+        if not data.get('force'):
+            found = for_each_target(lambda url: likely_duplicates(url, description, github_token), repo_urls)
+            duplicates = [
+                dict(issue, repo_url=repo_url)
+                for repo_url, issues in zip(repo_urls, found)
+                for issue in issues
+            ]
+            if duplicates:
+                return jsonify({
+                    'error': 'Similar issues already exist',
+                    'step': 'duplicate_check',
+                    'status': 'duplicates',
+                    'duplicates': duplicates
+                }), 409
 
+        # Pull code_context from an indexed repository archive when none was pasted
+        code_index_id = data.get('code_index_id')
+        if code_index_id and not code_context:
+            try:
+                code_context, selection = build_code_context(
+                    code_index_id, description, token_fingerprint(github_token)
+                )
+            except ValueError as e:
+                return jsonify({
+                    'error': str(e),
+                    'step': 'validation',
+                    'status': 'error'
+                }), 400
+            logger.info(f"Selected {selection['snippets']} snippets ({selection['bytes']} bytes) from code index")
+
+        if len(repo_urls) > 1:
+            pipeline = run_fanout_pipeline
+            arguments = (repo_urls, description, code_context, github_token, fields, suggest_labels,
+                         bool(data.get('cross_link')))
+        else:
+            pipeline = run_issue_pipeline
+            arguments = (repo_urls[0], description, code_context, github_token, fields, suggest_labels)
+
+        if run_async:
+            # Progress events for asynchronous submissions are keyed by job ID
+            # and buffered by the progress bus until /progress/<job_id> reads them.
+            job_id = uuid.uuid4().hex
+            try:
+                job_runner.submit(pipeline, job_id, *arguments, job_id=job_id)
+            except JobQueueFull as e:
+                return jsonify({
+                    'error': str(e),
+                    'step': 'validation',
+                    'status': 'error'
+                }), 503
+            return jsonify({
+                'status': 'queued',
+                'step': 'queued',
+                'job_id': job_id,
+                'status_url': f'/jobs/{job_id}',
+                'progress_url': f'/progress/{job_id}'
+            }), 202
+
+        try:
+            result = pipeline(session_id, *arguments)
+            return jsonify(result), {'queued': 202, 'error': 502}.get(result['status'], 200)
+        except AdmissionRejected as e:
+            return admission_rejected_response(e, step='processing_description')
         except Exception as e:
-            logger.error(f"Error in GitHub API call: {str(e)}")
-            error_msg = 'Failed to create GitHub issue'
-            send_progress_update(session_id, 'submitting_issue', error=str(e))
             return jsonify({
-                'error': error_msg,
+                'error': 'Failed to create GitHub issue',
                 'step': 'submitting_issue',
                 'status': 'error',
                 'details': str(e)
@@ -182,5 +643,291 @@ def create_issue():
             'status': 'error'
         }), 500
 
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Report the state of an asynchronous issue submission"""
+    job = job_runner.get(job_id)
+    if not job:
+        return jsonify({'error': 'Unknown job', 'status': 'error'}), 404
+    return jsonify(job)
+
+@app.route('/outbox')
+def outbox():
+    """List the caller's outbox items, newest first, with counts per state"""
+    if not OUTBOX_ENABLED:
+        return jsonify({'error': 'Outbox is disabled', 'status': 'error'}), 404
+    github_token = request_token()
+    if not github_token:
+        return jsonify({'error': 'GitHub token is required', 'status': 'error'}), 401
+    fingerprint = token_fingerprint(github_token)
+    limit = min(request.args.get('limit', 50, type=int), 500)
+    return jsonify({
+        'counts': get_outbox_stats(fingerprint),
+        'items': list_outbox_items(fingerprint, request.args.get('status'), limit)
+    })
+
+@app.route('/outbox/<item_id>')
+def outbox_item(item_id):
+    """Report the delivery state of one of the caller's queued issues"""
+    github_token = request_token()
+    if not github_token:
+        return jsonify({'error': 'GitHub token is required', 'status': 'error'}), 401
+    item = get_outbox_item(item_id, token_fingerprint(github_token)) if OUTBOX_ENABLED else None
+    if not item:
+        return jsonify({'error': 'Unknown outbox item', 'status': 'error'}), 404
+    return jsonify(item)
+
+@app.route('/create_issues', methods=['POST'])
+def create_issues():
+    """Format and create many issues in one repository with per-item results"""
+    session_id = None
+    try:
+        data = request.json
+        # Only publish to progress IDs this browser minted
+        session_id = data.get('session_id') if owns_progress_session(data.get('session_id')) else None
+        repo_url = data.get('repo_url')
+        items = data.get('issues') or []
+        github_token = data.get('github_token') or session.get('github_token')
+
+        if not repo_url or not items or not all(isinstance(item, dict) and item.get('description') for item in items):
+            return jsonify({
+                'error': 'Missing required fields',
+                'step': 'validation',
+                'status': 'error'
+            }), 400
+
+        if len(items) > BULK_MAX_ISSUES:
+            return jsonify({
+                'error': f'At most {BULK_MAX_ISSUES} issues can be created per request',
+                'step': 'validation',
+                'status': 'error'
+            }), 400
+
+        if not github_token:
+            return jsonify({
+                'error': 'GitHub token is required',
+                'step': 'validation',
+                'status': 'error'
+            }), 400
+
+        key = admission_key(github_token, session_id)
+        try:
+            llm_admission.check(key)
+        except AdmissionRejected as e:
+            return admission_rejected_response(e)
+
+        denied = access_denied_response(repo_url, github_token)
+        if denied:
+            return denied
+
+        # Items without pasted code_context get snippets from this indexed archive
+        code_index_id = data.get('code_index_id')
+        try:
+            if code_index_id and get_code_index(code_index_id, token_fingerprint(github_token)) is None:
+                raise ValueError(f'Unknown code index: {code_index_id}')
+        except ValueError as e:
+            return jsonify({
+                'error': str(e),
+                'step': 'validation',
+                'status': 'error'
+            }), 400
+
+        # Format every description concurrently; failures are kept per item.
+        # All items share the caller's admission queue, so a large batch
+        # takes turns with other users' requests.
+        send_progress_update(session_id, 'processing_description')
+        options = label_options([repo_url], github_token) if data.get('suggest_labels') else None
+
+        def format_item(item):
+            """Return (processed issue, fields, failed step, error) for one item"""
+            # Items naming labels, assignees or a milestone that do not exist
+            # fail here, before they spend an LLM call
+            fields = parse_issue_fields(item)
+            error = fields_problem(repo_url, github_token, fields)
+            if error:
+                return None, fields, 'validation', error
+            try:
+                code_context = item.get('code_context', '')
+                if code_index_id and not code_context:
+                    code_context, _ = build_code_context(
+                        code_index_id, item['description'], token_fingerprint(github_token)
+                    )
+                code_context, _ = compact_code_context(code_context, item['description'])
+                with track_stage('llm_format'):
+                    processed_issue = format_issue(
+                        item['description'], code_context, label_options=options, admission_key=key
+                    )
+                return processed_issue, with_suggested_labels(fields, processed_issue), None, None
+            except Exception as e:
+                return None, fields, 'processing_description', str(e)
+
+        with ThreadPoolExecutor(max_workers=min(BULK_FORMAT_CONCURRENCY, len(items))) as executor:
+            formatted = list(executor.map(format_item, items))
+
+        results = [None] * len(items)
+        to_submit = []
+        for index, (processed_issue, fields, step, error) in enumerate(formatted):
+            if error:
+                results[index] = {'index': index, 'success': False, 'step': step, 'error': error}
+            else:
+                to_submit.append((index, processed_issue, fields))
+
+        created = []
+        if to_submit:
+            send_progress_update(session_id, 'submitting_issue')
+            created = create_github_issues(
+                repo_url=repo_url,
+                issues=[dict(fields, title=issue['title'], body=issue['body']) for _, issue, fields in to_submit],
+                token=github_token
+            )
+        for (index, processed_issue, fields), result in zip(to_submit, created):
+            result.update(fields, index=index, title=processed_issue['title'])
+            if not result['success']:
+                result['step'] = 'submitting_issue'
+            results[index] = result
+
+        succeeded = sum(1 for result in results if result['success'])
+        if succeeded == len(results):
+            status = 'success'
+        elif succeeded:
+            status = 'partial'
+        else:
+            status = 'error'
+
+        send_progress_update(session_id, 'completed', complete=True)
+        return jsonify({
+            'status': status,
+            'step': 'completed',
+            'created': succeeded,
+            'failed': len(results) - succeeded,
+            'results': results
+        }), 200 if succeeded else 502
+
+    except Exception as e:
+        logger.error(f"Unexpected error creating issues: {str(e)}")
+        if session_id:
+            send_progress_update(session_id, 'unknown', error=str(e))
+        return jsonify({
+            'error': str(e),
+            'step': 'unknown',
+            'status': 'error'
+        }), 500
+
+@app.route('/code_index', methods=['POST'])
+def create_code_index():
+    """Index an uploaded repository archive, or a local checkout, for use as code_index_id"""
+    # Checked before the body is read, so rejected uploads are never spooled
+    github_token = request_token()
+    if not github_token or not validate_github_token(github_token):
+        return jsonify({
+            'error': 'A valid GitHub token is required',
+            'step': 'validation',
+            'status': 'error'
+        }), 401
+    too_large = jsonify({
+        'error': f'Archive is larger than {CODE_INDEX_MAX_ARCHIVE_BYTES} bytes',
+        'step': 'validation',
+        'status': 'error'
+    }), 413
+    if (request.content_length or 0) > CODE_INDEX_MAX_ARCHIVE_BYTES:
+        return too_large
+
+    try:
+        if 'archive' in request.files:
+            upload = request.files['archive']
+            index = index_archive(upload.stream, upload.filename, owner=token_fingerprint(github_token))
+        else:
+            path = (request.get_json(silent=True) or {}).get('path')
+            if not path:
+                return jsonify({
+                    'error': 'Upload an archive or give a local path',
+                    'step': 'validation',
+                    'status': 'error'
+                }), 400
+            if not is_allowed_local_path(path):
+                return jsonify({
+                    'error': 'Indexing this local path is not allowed',
+                    'step': 'validation',
+                    'status': 'error'
+                }), 403
+            index = index_local_path(path, owner=token_fingerprint(github_token))
+        return jsonify(dict(index.stats(), status='success'))
+    except RequestEntityTooLarge:
+        # Uploads without a Content-Length are cut off at MAX_CONTENT_LENGTH
+        return too_large
+    except ValueError as e:
+        return jsonify({
+            'error': str(e),
+            'step': 'validation',
+            'status': 'error'
+        }), 400
+    except Exception as e:
+        logger.error(f"Error indexing code archive: {str(e)}")
+        return jsonify({
+            'error': 'Failed to index code archive',
+            'step': 'indexing',
+            'status': 'error',
+            'details': str(e)
+        }), 500
+
+@app.route('/code_index/<index_id>')
+def code_index_info(index_id):
+    """Report file and symbol counts for an archive the caller indexed"""
+    github_token = request_token()
+    if not github_token:
+        return jsonify({'error': 'GitHub token is required', 'status': 'error'}), 401
+    try:
+        index = get_code_index(index_id, token_fingerprint(github_token))
+    except ValueError:
+        index = None
+    if not index:
+        return jsonify({'error': 'Unknown code index', 'status': 'error'}), 404
+    return jsonify(index.stats())
+
+@app.route('/stats')
+def stats():
+    """Report cache hit rates, job queue state and LLM provider latencies"""
+    return jsonify({
+        'issue_cache': get_issue_cache_stats(),
+        'schema_cache': get_schema_cache_stats(),
+        'repo_id_cache': get_repo_id_cache_stats(),
+        'token_cache': get_token_cache_stats(),
+        'metadata_cache': get_metadata_cache_stats(),
+        'duplicate_index': get_duplicate_index_stats(),
+        'code_index': get_code_index_stats(),
+        'jobs': job_runner.stats(),
+        'llm_latency': latency_tracker.stats(),
+        'llm_admission': llm_admission.stats(),
+        'outbox': get_outbox_stats() if OUTBOX_ENABLED else None
+    })
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus text exposition of stage latencies, errors, in-flight work and caches"""
+    caches = {
+        'issue': get_issue_cache_stats(),
+        'schema': get_schema_cache_stats(),
+        'repo_id': get_repo_id_cache_stats(),
+        **get_token_cache_stats(),
+        **get_metadata_cache_stats()
+    }
+    cache_fields = {
+        'hits': 'Cache hits since process start',
+        'misses': 'Cache misses since process start',
+        'size': 'Entries currently cached'
+    }
+    for cache_name, cache_stats in caches.items():
+        for field, help_text in cache_fields.items():
+            set_gauge(f'issue_creator_cache_{field}', help_text, cache_stats[field], {'cache': cache_name})
+    admission = llm_admission.stats()
+    set_gauge('issue_creator_admission_active', 'Requests holding an admission slot', admission['active'], {'stage': 'llm'})
+    set_gauge('issue_creator_admission_waiting', 'Requests queued for admission', admission['waiting'], {'stage': 'llm'})
+    for state, count in job_runner.stats().items():
+        set_gauge('issue_creator_jobs', 'Asynchronous job counts by state', count, {'state': state})
+    if OUTBOX_ENABLED:
+        for state, count in get_outbox_stats().items():
+            set_gauge('issue_creator_outbox_items', 'Outbox items by state', count, {'state': state})
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
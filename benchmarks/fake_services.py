@@ -0,0 +1,296 @@
+"""
+Local stand-ins for GitHub GraphQL, Gemini and OpenAI used by the benchmarks.
+
+Each fake speaks just enough of the real wire protocol for the app's clients:
+GraphQL introspection, repository { id }, labels and milestones, (aliased)
+user lookups, issue listings and (aliased) createIssue and updateIssue; Gemini generateContent / streamGenerateContent over REST; OpenAI
+chat completions. Latency and failure rates are configurable per service.
+"""
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.graphql_queries import QUERY_REGISTRY
+
+SAMPLE_LABELS = ["bug", "documentation", "enhancement", "performance"]
+SAMPLE_MILESTONES = ["v1.0", "v2.0"]
+
+SAMPLE_ISSUE = {
+    "title": "Benchmark issue",
+    "body": "## Description\nGenerated by the offline benchmark.\n\n" + "Lorem ipsum dolor sit amet. " * 40,
+}
+
+class FakeService:
+    """Latency/failure settings shared by a fake server's handler threads."""
+
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.requests = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def delay(self):
+        """Sleep for the configured latency and decide whether this call fails."""
+        time.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+        with self._lock:
+            self.requests += 1
+            failed = random.random() < self.failure_rate
+            if failed:
+                self.failures += 1
+        return failed
+
+class _Handler(BaseHTTPRequestHandler):
+    service = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, payload, status=200, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+class FakeGitHubHandler(_Handler):
+    """
+    Answers the GraphQL operations the app sends to api.github.com/graphql.
+    Injected failures on createIssue sometimes happen after the issue was
+    stored, like a real timeout or 502, to exercise duplicate-safe retries.
+    """
+
+    issue_counter = 0
+    counter_lock = threading.Lock()
+    created_issues = []
+
+    def _schema_type(self, name):
+        fields = set()
+        for operation in QUERY_REGISTRY.values():
+            fields.update(operation["requires"].get(name, []))
+        entries = [{"name": field, "type": {"name": None, "kind": "SCALAR", "ofType": None}, "args": []} for field in sorted(fields)]
+        return {"name": name, "kind": "OBJECT", "description": "", "fields": entries, "inputFields": entries}
+
+    def _next_issue(self, title="", body="", label_ids=None):
+        with self.counter_lock:
+            FakeGitHubHandler.issue_counter += 1
+            number = FakeGitHubHandler.issue_counter
+            issue = {
+                "id": f"I_fake{number}",
+                "url": f"https://github.com/bench/repo/issues/{number}",
+                "number": number,
+            }
+            FakeGitHubHandler.created_issues.append(dict(
+                issue,
+                title=title,
+                body=body,
+                labelIds=label_ids or [],
+                state="OPEN",
+                updatedAt=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            ))
+            del FakeGitHubHandler.created_issues[:-500]
+        return issue
+
+    def _create_issues(self, query, variables):
+        aliases = re.findall(r"(\w+)\s*:\s*createIssue", query)
+        if not aliases:
+            return {"createIssue": {"issue": self._next_issue(
+                variables.get("title", ""), variables.get("body", ""), variables.get("labelIds")
+            )}}
+        return {
+            alias: {"issue": self._next_issue(
+                variables.get(f"title{alias[len('issue'):]}", ""),
+                variables.get(f"body{alias[len('issue'):]}", ""),
+                variables.get(f"labelIds{alias[len('issue'):]}")
+            )}
+            for alias in aliases
+        }
+
+    def _update_issues(self, query, variables):
+        """Replace issue bodies by node ID for aliased updateIssue fields."""
+        data = {}
+        for alias, id_variable, body_variable in re.findall(
+            r"(\w+)\s*:\s*updateIssue\(input:\s*\{\s*id:\s*\$(\w+)\s*body:\s*\$(\w+)", query
+        ):
+            with self.counter_lock:
+                for issue in FakeGitHubHandler.created_issues:
+                    if issue["id"] == variables[id_variable]:
+                        issue["body"] = variables[body_variable]
+                        data[alias] = {"issue": {"url": issue["url"]}}
+        return data
+
+    def _repository_metadata(self):
+        page_info = {"hasNextPage": False, "endCursor": None}
+        return {"repository": {
+            "id": "R_fakerepo",
+            "labels": {"pageInfo": page_info, "nodes": [{"id": f"LA_{name}", "name": name} for name in SAMPLE_LABELS]},
+            "milestones": {"pageInfo": page_info, "nodes": [
+                {"id": f"MI_{number}", "number": number, "title": title}
+                for number, title in enumerate(SAMPLE_MILESTONES, 1)
+            ]},
+        }}
+
+    def _users(self, query, variables):
+        """Resolve aliased user(login:) fields; logins starting with "ghost" do not exist."""
+        data, errors = {}, []
+        for alias, variable in re.findall(r"(\w+)\s*:\s*user\(login:\s*\$(\w+)\)", query):
+            login = variables.get(variable, "")
+            data[alias] = None if login.startswith("ghost") else {"id": f"U_{login}"}
+            if data[alias] is None:
+                errors.append({"type": "NOT_FOUND", "path": [alias], "message": f"Could not resolve to a User with the login of '{login}'."})
+        return data, errors
+
+    def _issues_since(self, variables):
+        """Page through stored issues updated at or after `since`, 100 at a time."""
+        with self.counter_lock:
+            issues = [
+                issue for issue in FakeGitHubHandler.created_issues
+                if not variables.get("since") or issue["updatedAt"] >= variables["since"]
+            ]
+        start = int(variables.get("after") or 0)
+        page = issues[start:start + 100]
+        return {"repository": {"issues": {
+            "pageInfo": {"hasNextPage": start + 100 < len(issues), "endCursor": str(start + len(page))},
+            "nodes": page,
+        }}}
+
+    def do_POST(self):
+        payload = self._read_json()
+        query = payload.get("query", "")
+        variables = payload.get("variables") or {}
+        if self.service.delay():
+            if "createIssue" in query and random.random() < 0.5:
+                self._create_issues(query, variables)
+            self._send_json({"message": "Server Error"}, status=502)
+            return
+
+        headers = {"X-RateLimit-Remaining": "4999", "X-RateLimit-Reset": str(int(time.time()) + 3600)}
+
+        if "__type" in query:
+            data = {"__type": self._schema_type(variables.get("name"))}
+        elif "viewer" in query and "repository" not in query:
+            data = {"viewer": {"login": "benchmark"}}
+            headers["X-OAuth-Scopes"] = "repo"
+        elif "updateIssue" in query:
+            data = self._update_issues(query, variables)
+        elif "createIssue" in query:
+            data = self._create_issues(query, variables)
+        elif "user(login" in query:
+            data, errors = self._users(query, variables)
+            self._send_json({"data": data, "errors": errors} if errors else {"data": data}, headers=headers)
+            return
+        elif "labels(" in query:
+            data = self._repository_metadata()
+        elif "filterBy" in query:
+            data = self._issues_since(variables)
+        elif "issues(" in query:
+            with self.counter_lock:
+                recent = list(reversed(FakeGitHubHandler.created_issues))[:variables.get("count", 25)]
+            data = {"repository": {"issues": {"nodes": recent}}}
+        elif "repository" in query:
+            data = {"repository": {
+                "id": "R_fakerepo",
+                "viewerPermission": "WRITE",
+                "hasIssuesEnabled": True,
+                "isPrivate": False,
+            }}
+        else:
+            data = {}
+        self._send_json({"data": data}, headers=headers)
+
+def _sample_issue(prompt):
+    """The canned issue, with suggested labels when the prompt asks for them."""
+    if "chosen only from" in prompt:
+        return dict(SAMPLE_ISSUE, labels=["bug", "not-a-label"])
+    return SAMPLE_ISSUE
+
+class FakeGeminiHandler(_Handler):
+    """Implements models/*:generateContent and :streamGenerateContent (REST transport)."""
+
+    def _candidate(self, text):
+        return {"candidates": [{
+            "content": {"parts": [{"text": text}], "role": "model"},
+            "finishReason": "STOP",
+            "index": 0,
+        }]}
+
+    def do_POST(self):
+        payload = self._read_json()
+        if self.service.delay():
+            self._send_json({"error": {"code": 503, "message": "unavailable", "status": "UNAVAILABLE"}}, status=503)
+            return
+
+        text = json.dumps(_sample_issue(json.dumps(payload.get("contents", []))))
+        if ":streamGenerateContent" not in self.path:
+            self._send_json(self._candidate(text))
+            return
+
+        # Stream in several chunks, like the real API
+        chunks = [text[i:i + 64] for i in range(0, len(text), 64)]
+        sse = "alt=sse" in self.path
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream" if sse else "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def write(data):
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        if sse:
+            for chunk in chunks:
+                write(f"data: {json.dumps(self._candidate(chunk))}\r\n\r\n".encode("utf-8"))
+        else:
+            write(json.dumps([self._candidate(chunk) for chunk in chunks]).encode("utf-8"))
+        self.wfile.write(b"0\r\n\r\n")
+
+class FakeOpenAIHandler(_Handler):
+    """Implements /v1/chat/completions with a JSON issue or GraphQL query body."""
+
+    def do_POST(self):
+        payload = self._read_json()
+        if self.service.delay():
+            self._send_json({"error": {"message": "overloaded", "type": "server_error"}}, status=503)
+            return
+
+        prompt = json.dumps(payload.get("messages", []))
+        if "GraphQL" in prompt:
+            content = json.dumps({
+                "query": QUERY_REGISTRY["create_issue_mutation"]["query"],
+                "variables": {},
+            })
+        else:
+            content = json.dumps(_sample_issue(prompt))
+        self._send_json({
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "gpt-4o"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        })
+
+def start_fake_server(handler_class, service, host="127.0.0.1", port=0):
+    """Start a threaded fake server; returns (server, base_url)."""
+    handler = type(handler_class.__name__, (handler_class,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name=handler_class.__name__, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
@@ -0,0 +1,114 @@
+"""
+Cold-start import benchmark.
+
+Imports the app in fresh interpreters with -X importtime and reports the
+median cumulative import time of each first-party module and of the heaviest
+third-party packages. With --check it exits non-zero when a provider SDK is
+imported at startup or the total exceeds --max-ms, so CI can catch new
+top-level imports before they slow down every worker:
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --check --max-ms 800
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Heavy SDKs that must only be imported on first use
+LAZY_MODULES = ("google.generativeai", "openai", "numpy")
+
+FIRST_PARTY = ("app", "utils")
+
+IMPORT_SCRIPT = "import json, sys; import app; print(json.dumps(sorted(sys.modules)))"
+
+def measure(module_env=None):
+    """Import app once in a fresh interpreter; returns ({module: cumulative_us}, loaded module names)."""
+    env = dict(os.environ, **(module_env or {}))
+    env.pop("GITHUB_TOKEN", None)
+    env.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='issue-import-')}/outbox.db")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_SCRIPT],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = int(cumulative)
+    return timings, json.loads(result.stdout.strip().splitlines()[-1])
+
+def summarize(runs, top=10):
+    """Reduce several runs to median milliseconds for first-party modules and the top third-party packages."""
+    def median_ms(name):
+        return statistics.median(timings.get(name, 0) for timings, _ in runs) / 1000
+
+    names = set().union(*(timings for timings, _ in runs))
+    first_party = {
+        name: median_ms(name)
+        for name in names
+        if name.split(".")[0] in FIRST_PARTY
+    }
+    packages = {}
+    for name in names:
+        root = name.split(".")[0]
+        if root in FIRST_PARTY or root.startswith("_"):
+            continue
+        packages[root] = max(packages.get(root, 0.0), median_ms(name))
+    heaviest = dict(sorted(packages.items(), key=lambda item: -item[1])[:top])
+    return {"total_ms": median_ms("app"), "first_party_ms": first_party, "third_party_ms": heaviest}
+
+def eager_sdks(runs):
+    """Return the lazily-loaded SDKs that some run imported at startup."""
+    loaded = set().union(*(set(modules) for _, modules in runs))
+    return sorted(module for module in LAZY_MODULES if module in loaded)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters to sample")
+    parser.add_argument("--top", type=int, default=10, help="third-party packages to list")
+    parser.add_argument("--check", action="store_true", help="fail on eager SDK imports or a slow import")
+    parser.add_argument("--max-ms", type=float, default=1000.0, help="import budget for --check")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args()
+
+    runs = [measure() for _ in range(args.repeat)]
+    summary = summarize(runs, args.top)
+    summary["eager_sdks"] = eager_sdks(runs)
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print(f"import app: {summary['total_ms']:.1f} ms (median of {args.repeat})")
+        print("  first-party modules (cumulative ms):")
+        for name, value in sorted(summary["first_party_ms"].items(), key=lambda item: -item[1]):
+            print(f"    {name:<28} {value:8.1f}")
+        print("  heaviest third-party packages (cumulative ms):")
+        for name, value in summary["third_party_ms"].items():
+            print(f"    {name:<28} {value:8.1f}")
+        if summary["eager_sdks"]:
+            print(f"  imported at startup but should be lazy: {', '.join(summary['eager_sdks'])}")
+
+    if args.check:
+        failures = []
+        if summary["eager_sdks"]:
+            failures.append(f"provider SDKs imported at startup: {', '.join(summary['eager_sdks'])}")
+        if summary["total_ms"] > args.max_ms:
+            failures.append(f"import app took {summary['total_ms']:.1f} ms, budget is {args.max_ms:.0f} ms")
+        for failure in failures:
+            print(f"FAIL: {failure}", file=sys.stderr)
+        sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
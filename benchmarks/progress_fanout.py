@@ -0,0 +1,89 @@
+"""
+Fan-out latency benchmark for the progress backends.
+
+Publishes numbered events to many sessions and measures the delay until each
+subscriber reads them. Run from the repository root:
+
+    python -m benchmarks.progress_fanout --sessions 200 --events 10
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from utils.progress import InMemoryProgressBackend, SQLiteProgressBackend
+
+def percentile(values, pct):
+    """Return the pct-th percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def run(backend, sessions, events, interval):
+    """Publish `events` events to each of `sessions` sessions; return latencies in ms."""
+    latencies = []
+    lock = threading.Lock()
+
+    def subscribe(session_id):
+        last_id = 0
+        received = 0
+        while received < events:
+            batch = backend.read(session_id, last_id, timeout=10)
+            if not batch:
+                break
+            now = time.perf_counter()
+            with lock:
+                latencies.extend((now - event["sent_at"]) * 1000 for _, event in batch)
+            last_id = batch[-1][0]
+            received += len(batch)
+
+    subscribers = [
+        threading.Thread(target=subscribe, args=(f"bench-{i}",), daemon=True)
+        for i in range(sessions)
+    ]
+    for thread in subscribers:
+        thread.start()
+
+    started = time.perf_counter()
+    for _ in range(events):
+        for i in range(sessions):
+            backend.publish(f"bench-{i}", {"step": "bench", "sent_at": time.perf_counter()})
+        time.sleep(interval)
+    for thread in subscribers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    for i in range(sessions):
+        backend.discard(f"bench-{i}")
+    return latencies, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--events", type=int, default=10)
+    parser.add_argument("--interval", type=float, default=0.01, help="seconds between publish rounds")
+    parser.add_argument("--backend", choices=["memory", "sqlite", "all"], default="all")
+    args = parser.parse_args()
+
+    backends = []
+    if args.backend in ("memory", "all"):
+        backends.append(("memory", InMemoryProgressBackend(buffer_size=args.events)))
+    if args.backend in ("sqlite", "all"):
+        db_path = os.path.join(tempfile.mkdtemp(), "progress.db")
+        backends.append(("sqlite", SQLiteProgressBackend(path=db_path, buffer_size=args.events)))
+
+    print(f"{'backend':<8} {'events':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'ev/s':>10}")
+    for name, backend in backends:
+        latencies, elapsed = run(backend, args.sessions, args.events, args.interval)
+        print(
+            f"{name:<8} {len(latencies):>8} {statistics.median(latencies) if latencies else 0:>8.2f} "
+            f"{percentile(latencies, 95):>8.2f} {percentile(latencies, 99):>8.2f} "
+            f"{max(latencies, default=0):>8.2f} {len(latencies) / elapsed:>10.0f}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Offline end-to-end benchmark for /create_issue.
+
+Starts local fake GitHub, Gemini and OpenAI servers, serves the Flask app on
+a local port pointed at them, then drives /create_issue (optionally with a
+/progress SSE listener per request) at the requested concurrency. Reports
+latency percentiles, throughput and a per-stage breakdown, and stores the
+results under benchmarks/results/ so runs can be compared across commits:
+
+    python -m benchmarks.run_benchmark --requests 200 --concurrency 20 --llm-latency 0.8
+    python -m benchmarks.run_benchmark --compare benchmarks/results/<previous>.json
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+from benchmarks.fake_services import (
+    FakeGeminiHandler,
+    FakeGitHubHandler,
+    FakeOpenAIHandler,
+    FakeService,
+    start_fake_server,
+)
+from benchmarks.progress_fanout import percentile
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+def configure_environment(github_url, gemini_url, openai_url):
+    """Point the app's clients at the fake services; must run before importing app."""
+    os.environ["GITHUB_GRAPHQL_URL"] = f"{github_url}/graphql"
+    os.environ["GEMINI_API_ENDPOINT"] = gemini_url
+    os.environ["GEMINI_API_KEY"] = "benchmark"
+    os.environ["OPENAI_BASE_URL"] = f"{openai_url}/v1"
+    os.environ["OPENAI_API_KEY"] = "benchmark"
+    os.environ.pop("GITHUB_TOKEN", None)
+    # Every simulated request shares one token; without this the per-token
+    # mutation pacing (80/min by default) would be all the benchmark measures.
+    os.environ.setdefault("GITHUB_MUTATIONS_PER_MINUTE", "100000")
+    os.environ.setdefault("GITHUB_RATE_PER_SECOND", "100000")
+    # Keep benchmark submissions out of the real outbox database and duplicate index
+    state_dir = tempfile.mkdtemp(prefix='issue-bench-')
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{state_dir}/outbox.db")
+    os.environ.setdefault("DUPLICATE_INDEX_DIR", os.path.join(state_dir, "duplicates"))
+
+def start_app():
+    """Serve the Flask app on a free local port in a background thread."""
+    from werkzeug.serving import make_server
+    from app import app
+
+    # Served over plain HTTP on loopback; progress IDs live in the session cookie
+    app.config['SESSION_COOKIE_SECURE'] = False
+    # app.py logs at DEBUG; per-request logging would dominate the measurements
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, name="benchmark-app", daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+def listen_progress(client, base_url, session_id, result, ready):
+    """Read the SSE stream for one submission, recording time to first event and the terminal event."""
+    started = time.perf_counter()
+    try:
+        with client.get(f"{base_url}/progress/{session_id}", stream=True, timeout=60) as response:
+            ready.set()
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data: "):
+                    continue
+                event = json.loads(line[len("data: "):])
+                result["events"] += 1
+                if result["first_event_ms"] is None:
+                    result["first_event_ms"] = (time.perf_counter() - started) * 1000
+                if event.get("complete") or event.get("error"):
+                    result["terminal_event"] = True
+                    break
+    except requests.RequestException:
+        pass
+    finally:
+        ready.set()
+
+def submit_one(base_url, index, use_sse, repo_url):
+    """Run one /create_issue request and return its measurements."""
+    client = requests.Session()
+    session_id = None
+    progress = {"events": 0, "first_event_ms": None, "terminal_event": False}
+    listener = None
+    if use_sse:
+        session_id = client.post(f"{base_url}/progress", timeout=10).json()["session_id"]
+        ready = threading.Event()
+        listener = threading.Thread(
+            target=listen_progress, args=(client, base_url, session_id, progress, ready), daemon=True
+        )
+        listener.start()
+        ready.wait(5)
+
+    started = time.perf_counter()
+    try:
+        response = client.post(
+            f"{base_url}/create_issue",
+            json={
+                "session_id": session_id,
+                "repo_url": repo_url,
+                "description": f"Benchmark issue {index} {uuid.uuid4().hex}",
+                "github_token": "benchmark-token",
+                "code_context": "",
+            },
+            timeout=120
+        )
+        status = response.status_code
+    except requests.RequestException:
+        status = None
+    latency_ms = (time.perf_counter() - started) * 1000
+
+    if listener:
+        listener.join(10)
+    return {"latency_ms": latency_ms, "status": status, **progress}
+
+def summarize(samples, elapsed, stages):
+    """Reduce per-request samples to the stored result record."""
+    latencies = [sample["latency_ms"] for sample in samples]
+    ok = [sample for sample in samples if sample["status"] == 200]
+    first_events = [sample["first_event_ms"] for sample in samples if sample["first_event_ms"] is not None]
+    return {
+        "requests": len(samples),
+        "succeeded": len(ok),
+        "failed": len(samples) - len(ok),
+        "throughput_rps": len(samples) / elapsed if elapsed else 0.0,
+        "latency_ms": {
+            "mean": statistics.mean(latencies) if latencies else 0.0,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": max(latencies, default=0.0),
+        },
+        "sse": {
+            "first_event_p50_ms": percentile(first_events, 50),
+            "terminal_events": sum(1 for sample in samples if sample["terminal_event"]),
+        },
+        "stages_ms": {
+            stage: {
+                "count": values["count"],
+                "mean": values["sum"] / values["count"] * 1000 if values["count"] else 0.0,
+                "errors": values["errors"],
+            }
+            for stage, values in sorted(stages.items())
+        },
+    }
+
+def git_commit():
+    """Return the current commit hash, or "unknown" outside a git checkout."""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(RESULTS_DIR),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def print_report(record, baseline=None):
+    """Print a human-readable summary, with deltas against a baseline record."""
+    def delta(current, previous):
+        if previous in (None, 0):
+            return ""
+        return f" ({(current - previous) / previous * 100:+.1f}%)"
+
+    summary = record["summary"]
+    base = baseline["summary"] if baseline else {}
+    print(f"commit {record['commit']}  {summary['requests']} requests, concurrency {record['config']['concurrency']}")
+    print(f"  succeeded {summary['succeeded']}, failed {summary['failed']}")
+    print(f"  throughput {summary['throughput_rps']:.1f} req/s"
+          f"{delta(summary['throughput_rps'], base.get('throughput_rps'))}")
+    for key in ("p50", "p95", "p99", "max"):
+        value = summary["latency_ms"][key]
+        previous = base.get("latency_ms", {}).get(key)
+        print(f"  {key:<4} {value:9.1f} ms{delta(value, previous)}")
+    if record["config"]["sse"]:
+        print(f"  SSE first event p50 {summary['sse']['first_event_p50_ms']:.1f} ms, "
+              f"terminal events {summary['sse']['terminal_events']}/{summary['requests']}")
+    print("  stages (mean ms):")
+    for stage, values in summary["stages_ms"].items():
+        previous = base.get("stages_ms", {}).get(stage, {}).get("mean")
+        print(f"    {stage:<24} {values['mean']:9.1f} x{values['count']:<6} errors {values['errors']}"
+              f"{delta(values['mean'], previous)}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds per fake LLM call")
+    parser.add_argument("--llm-failure-rate", type=float, default=0.0)
+    parser.add_argument("--github-latency", type=float, default=0.05, help="seconds per fake GitHub call")
+    parser.add_argument("--github-failure-rate", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- seconds added to every fake call")
+    parser.add_argument("--no-sse", action="store_true", help="do not open a /progress stream per request")
+    parser.add_argument("--label", default="", help="free-form note stored with the results")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    llm = FakeService(args.llm_latency, args.jitter, args.llm_failure_rate)
+    github = FakeService(args.github_latency, args.jitter, args.github_failure_rate)
+    _, github_url = start_fake_server(FakeGitHubHandler, github)
+    _, gemini_url = start_fake_server(FakeGeminiHandler, llm)
+    _, openai_url = start_fake_server(FakeOpenAIHandler, llm)
+    configure_environment(github_url, gemini_url, openai_url)
+
+    from utils.metrics import get_stage_summary
+
+    _, base_url = start_app()
+    use_sse = not args.no_sse
+    repo_url = "https://github.com/bench/repo"
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        samples = list(executor.map(
+            lambda index: submit_one(base_url, index, use_sse, repo_url),
+            range(args.requests)
+        ))
+    elapsed = time.perf_counter() - started
+
+    record = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "label": args.label,
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "llm_latency": args.llm_latency,
+            "llm_failure_rate": args.llm_failure_rate,
+            "github_latency": args.github_latency,
+            "github_failure_rate": args.github_failure_rate,
+            "jitter": args.jitter,
+            "sse": use_sse,
+        },
+        "fake_calls": {"llm": llm.requests, "github": github.requests},
+        "summary": summarize(samples, elapsed, get_stage_summary()),
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(record, baseline)
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{record['commit']}.json")
+        with open(path, "w") as f:
+            json.dump(record, f, indent=2)
+        print(f"results written to {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+import os
+
+# Threaded workers keep idle /progress event streams cheap: each open stream
+# costs a thread rather than a whole worker process. For thousands of idle
+# streams, install the gevent extra (pip install ".[gevent]") and set
+# GUNICORN_WORKER_CLASS=gevent for an event-loop worker.
+# Use PROGRESS_BACKEND=sqlite when running more than one worker.
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 64))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+keepalive = 5
@@ -0,0 +1,62 @@
+"""
+Bulk-create GitHub issues from a JSONL or CSV file.
+
+Each record needs a "description" (and optionally "code_context" and a stable
+"id"); with --skip-format, records carry a ready "title" and "body" instead.
+Optional "labels", "assignees" (lists, or comma-separated in CSV) and
+"milestone" are set when each issue is created. With --code-index, records
+without code_context get snippets from a repository archive or checkout that
+is indexed once for the whole run.
+Progress is checkpointed next to the input file, so re-running the same
+command after a crash or Ctrl-C resumes without creating issues twice:
+
+    python import_issues.py backlog.jsonl --repo https://github.com/owner/repo
+    python import_issues.py export.csv --repo https://github.com/owner/repo --skip-format
+    python import_issues.py backlog.jsonl --repo https://github.com/owner/repo --code-index repo.tar.gz
+"""
+import argparse
+import logging
+import os
+import sys
+
+from utils.bulk_import import run_import
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="JSONL (.jsonl/.ndjson) or CSV file of issues")
+    parser.add_argument("--repo", required=True, help="target repository URL")
+    parser.add_argument("--token", default=os.environ.get("GITHUB_TOKEN"), help="GitHub token (default: $GITHUB_TOKEN)")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <path>.checkpoint)")
+    parser.add_argument("--format-workers", type=int, default=4, help="concurrent LLM formatting calls")
+    parser.add_argument("--submit-workers", type=int, default=2, help="concurrent GitHub submissions")
+    parser.add_argument("--skip-format", action="store_true", help="use each record's title and body as-is")
+    parser.add_argument("--code-index", help="repository archive (.zip/.tar.gz) or checkout to take code_context from")
+    parser.add_argument("--progress-interval", type=float, default=5.0, help="seconds between progress lines")
+    args = parser.parse_args()
+
+    if not args.token:
+        parser.error("a GitHub token is required (--token or GITHUB_TOKEN)")
+
+    logging.basicConfig(level=logging.WARNING)
+    try:
+        result = run_import(
+            args.path,
+            args.repo,
+            args.token,
+            checkpoint_path=args.checkpoint,
+            format_workers=args.format_workers,
+            submit_workers=args.submit_workers,
+            skip_format=args.skip_format,
+            code_index_path=args.code_index,
+            progress_interval=args.progress_interval
+        )
+    except KeyboardInterrupt:
+        print("Interrupted; re-run the same command to resume.", file=sys.stderr)
+        sys.exit(130)
+    except Exception as e:
+        print(f"Import failed: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    sys.exit(1 if result["failed"] else 0)
+
+if __name__ == "__main__":
+    main()
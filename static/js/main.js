@@ -9,6 +9,8 @@ document.addEventListener('DOMContentLoaded', function() {
     const clearTokenBtn = document.getElementById('clearToken');
     const tokenAlert = document.getElementById('tokenAlert');
     let eventSource = null;
+    // Set by "Create Anyway" to skip the duplicate check on the next submit
+    let forceSubmit = false;
 
     // Initialize token state
     updateTokenState();
@@ -94,6 +96,42 @@ document.addEventListener('DOMContentLoaded', function() {
     progressContainer.style.display = 'none';
     resultDiv.parentNode.insertBefore(progressContainer, resultDiv);
 
+    // Live preview of the issue while the model is still writing it
+    const previewContainer = document.createElement('div');
+    previewContainer.className = 'card mb-3';
+    previewContainer.style.display = 'none';
+    previewContainer.innerHTML = `
+        <div class="card-body">
+            <h5 class="card-title preview-title"></h5>
+            <pre class="card-text preview-body mb-0" style="white-space: pre-wrap;"></pre>
+        </div>
+    `;
+    resultDiv.parentNode.insertBefore(previewContainer, resultDiv);
+    const previewTitle = previewContainer.querySelector('.preview-title');
+    const previewBody = previewContainer.querySelector('.preview-body');
+
+    function resetPreview() {
+        previewContainer.style.display = 'none';
+        previewTitle.textContent = '';
+        previewBody.textContent = '';
+    }
+
+    function updatePreview(data) {
+        if (data.title) {
+            previewTitle.textContent = data.title;
+            previewContainer.style.display = 'block';
+        }
+        if (typeof data.body === 'string') {
+            // A fallback provider answered: replace the partial preview
+            previewBody.textContent = data.body;
+            previewContainer.style.display = 'block';
+        }
+        if (data.body_delta) {
+            previewBody.textContent += data.body_delta;
+            previewContainer.style.display = 'block';
+        }
+    }
+
     const steps = {
         'processing_description': {
             message: 'Processing Description...',
@@ -188,6 +226,34 @@ document.addEventListener('DOMContentLoaded', function() {
         return order[step] || 0;
     }
 
+    function escapeHtml(text) {
+        const div = document.createElement('div');
+        div.textContent = text;
+        return div.innerHTML.replace(/"/g, '&quot;');
+    }
+
+    // Index results per archive file, so resubmitting with the same file skips the upload
+    const archiveIndexes = new Map();
+
+    async function indexArchive(file) {
+        const key = `${file.name}:${file.size}:${file.lastModified}`;
+        if (archiveIndexes.has(key)) {
+            return archiveIndexes.get(key);
+        }
+        const formData = new FormData();
+        formData.append('archive', file);
+        const response = await fetch('/code_index', {
+            method: 'POST',
+            headers: { 'X-GitHub-Token': document.getElementById('githubToken').value },
+            body: formData
+        });
+        const data = await response.json();
+        if (response.ok) {
+            archiveIndexes.set(key, data);
+        }
+        return data;
+    }
+
     function cleanupEventSource() {
         if (eventSource) {
             eventSource.close();
@@ -206,6 +272,7 @@ document.addEventListener('DOMContentLoaded', function() {
         
         // Clean up any existing event source
         cleanupEventSource();
+        resetPreview();
 
         try {
             let codeContext = '';
@@ -215,14 +282,33 @@ document.addEventListener('DOMContentLoaded', function() {
                 codeContext = await codebaseFile.text();
             }
 
-            // Generate a unique session ID for this submission
-            const sessionId = Date.now().toString();
+            // A repository archive is indexed once; the server picks snippets from it
+            let codeIndexId = null;
+            const repoArchive = document.getElementById('repoArchive').files[0];
+            if (repoArchive && !codeContext) {
+                const indexed = await indexArchive(repoArchive);
+                if (indexed.status === 'error') {
+                    progressContainer.style.display = 'none';
+                    alertDiv.className = 'alert alert-danger';
+                    alertDiv.innerHTML = `
+                        <h5><i class="bi bi-exclamation-triangle me-2"></i>Error Indexing Archive</h5>
+                        <p>${escapeHtml(indexed.error)}</p>
+                    `;
+                    return;
+                }
+                codeIndexId = indexed.code_index_id;
+            }
+
+            // The server mints the progress session ID and ties it to this browser session
+            const progressResponse = await fetch('/progress', { method: 'POST' });
+            const { session_id: sessionId } = await progressResponse.json();
 
             // Set up SSE connection first
             eventSource = new EventSource(`/progress/${sessionId}`);
             
             eventSource.onmessage = function(event) {
                 const data = JSON.parse(event.data);
+                updatePreview(data);
                 if (data.step) {
                     updateProgress(data.step, data.error);
                 }
@@ -231,8 +317,12 @@ document.addEventListener('DOMContentLoaded', function() {
                 }
             };
 
+            // The browser reconnects on its own and resumes from the last
+            // event ID; only give up once the stream has been closed for good.
             eventSource.onerror = function() {
-                cleanupEventSource();
+                if (eventSource && eventSource.readyState === EventSource.CLOSED) {
+                    cleanupEventSource();
+                }
             };
 
             // Start with processing description
@@ -248,21 +338,66 @@ document.addEventListener('DOMContentLoaded', function() {
                     repo_url: document.getElementById('repoUrl').value,
                     description: document.getElementById('description').value,
                     github_token: document.getElementById('githubToken').value,
-                    code_context: codeContext
+                    code_context: codeContext,
+                    code_index_id: codeIndexId,
+                    labels: document.getElementById('labels').value,
+                    assignees: document.getElementById('assignees').value,
+                    milestone: document.getElementById('milestone').value,
+                    suggest_labels: document.getElementById('suggestLabels').checked,
+                    force: forceSubmit
                 })
             });
+            forceSubmit = false;
 
             const data = await response.json();
 
-            if (response.ok) {
+            if (data.status === 'duplicates') {
+                // Similar issues exist; let the user open one or create theirs anyway
+                resetPreview();
+                progressContainer.style.display = 'none';
+                alertDiv.className = 'alert alert-warning';
+                alertDiv.innerHTML = `
+                    <h5><i class="bi bi-files me-2"></i>Similar Issues Found</h5>
+                    <p>These existing issues look like the one you are about to create:</p>
+                    <ul class="mb-3">
+                        ${data.duplicates.map(issue => `
+                            <li>
+                                <a href="${escapeHtml(issue.url)}" target="_blank">#${issue.number} ${escapeHtml(issue.title)}</a>
+                                <small class="text-muted">(${escapeHtml(issue.state.toLowerCase())}, ${Math.round(issue.score * 100)}% similar)</small>
+                            </li>
+                        `).join('')}
+                    </ul>
+                    <button type="button" id="createAnyway" class="btn btn-outline-warning">
+                        <i class="bi bi-plus-circle me-2"></i>Create Anyway
+                    </button>
+                `;
+                document.getElementById('createAnyway').addEventListener('click', function() {
+                    forceSubmit = true;
+                    form.requestSubmit();
+                });
+            } else if (data.status === 'queued') {
+                // GitHub is unavailable; the issue is stored and will be submitted later
+                resetPreview();
+                alertDiv.className = 'alert alert-warning';
+                alertDiv.innerHTML = `
+                    <h5><i class="bi bi-hourglass-split me-2"></i>Issue Queued</h5>
+                    <p>GitHub could not be reached, so your issue has been saved and will be created automatically.</p>
+                    <a href="${data.status_url}" target="_blank" class="btn btn-outline-warning">
+                        <i class="bi bi-box-arrow-up-right me-2"></i>Check Status
+                    </a>
+                `;
+                form.reset();
+            } else if (response.ok) {
                 // Update progress to completed
                 updateProgress('completed');
+                resetPreview();
                 
                 // Show success message
                 alertDiv.className = 'alert alert-success';
                 alertDiv.innerHTML = `
                     <h5><i class="bi bi-check-circle me-2"></i>Issue Created Successfully!</h5>
                     <p>Your issue has been created. You can view it here:</p>
+                    ${data.labels ? `<p>Labels: ${data.labels.map(label => `<span class="badge bg-secondary me-1">${escapeHtml(label)}</span>`).join('')}</p>` : ''}
                     <a href="${data.url}" target="_blank" class="btn btn-outline-success">
                         <i class="bi bi-box-arrow-up-right me-2"></i>View Issue #${data.number}
                     </a>
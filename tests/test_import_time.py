@@ -0,0 +1,24 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Heavy SDKs that must only be imported on first use
+LAZY_MODULES = ("google.generativeai", "openai", "numpy")
+
+def test_app_import_does_not_load_heavy_sdks(tmp_path):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path}/outbox.db")
+    env.pop("GITHUB_TOKEN", None)
+    result = subprocess.run(
+        [sys.executable, "-c", "import json, sys; import app; print(json.dumps(sorted(sys.modules)))"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=60
+    )
+    assert result.returncode == 0, result.stderr
+    loaded = set(json.loads(result.stdout.strip().splitlines()[-1]))
+    assert [name for name in LAZY_MODULES if name in loaded] == []
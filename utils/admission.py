@@ -0,0 +1,167 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from .metrics import inc_counter, observe_histogram
+
+# Admission control for the LLM formatting stage. At most LLM_MAX_CONCURRENCY
+# formatting calls run at once; the rest wait in per-user queues that are
+# served round-robin, so one user submitting in bulk cannot starve everyone
+# else. Requests beyond the queue limits are turned away at once with a
+# Retry-After estimate instead of piling up in worker threads.
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", 8))
+LLM_MAX_QUEUE = int(os.environ.get("LLM_MAX_QUEUE", 64))
+LLM_MAX_QUEUE_PER_KEY = int(os.environ.get("LLM_MAX_QUEUE_PER_KEY", 16))
+LLM_MAX_QUEUE_WAIT = float(os.environ.get("LLM_MAX_QUEUE_WAIT", 30))
+# Bounds for the Retry-After hint sent with a rejection
+RETRY_AFTER_MIN = 1
+RETRY_AFTER_MAX = 60
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be queued, or waited longer than allowed; carries a Retry-After hint."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class _Waiter:
+    def __init__(self):
+        self.event = threading.Event()
+        self.admitted = False
+
+class AdmissionController:
+    """
+    Counting semaphore with fair queueing. Waiters are grouped by key (a
+    token fingerprint or session) and keys take turns, so a key with many
+    queued requests gets one slot per round like every other key.
+    """
+
+    def __init__(self, capacity=LLM_MAX_CONCURRENCY, max_queue=LLM_MAX_QUEUE,
+                 max_queue_per_key=LLM_MAX_QUEUE_PER_KEY, max_wait=LLM_MAX_QUEUE_WAIT, name="llm"):
+        self.capacity = capacity
+        self.max_queue = max_queue
+        self.max_queue_per_key = max_queue_per_key
+        self.max_wait = max_wait
+        self.name = name
+        self._active = 0
+        self._waiting = 0
+        self._queues = OrderedDict()
+        self._service_times = deque(maxlen=100)
+        self._counts = {"admitted": 0, "rejected": 0, "timed_out": 0}
+        self._lock = threading.Lock()
+
+    def retry_after(self):
+        """Seconds a rejected client should wait: the time to work through the current queue."""
+        with self._lock:
+            return self._retry_after_locked()
+
+    def _retry_after_locked(self):
+        service_time = sum(self._service_times) / len(self._service_times) if self._service_times else 5.0
+        estimate = (self._waiting / self.capacity + 1) * service_time
+        return max(RETRY_AFTER_MIN, min(RETRY_AFTER_MAX, math.ceil(estimate)))
+
+    def _reject_locked(self, key):
+        """Return the reason a new waiter for `key` would be turned away, or None."""
+        if self._active < self.capacity and not self._waiting:
+            return None
+        if self._waiting >= self.max_queue:
+            return "Too many issues are being formatted right now, try again later"
+        if len(self._queues.get(key, ())) >= self.max_queue_per_key:
+            return "Too many of your issues are waiting to be formatted, try again later"
+        return None
+
+    def check(self, key):
+        """Raise AdmissionRejected now if a request for `key` would be turned away."""
+        with self._lock:
+            reason = self._reject_locked(key)
+            if reason:
+                self._count("rejected")
+                raise AdmissionRejected(reason, self._retry_after_locked())
+
+    def _count(self, outcome):
+        self._counts[outcome] += 1
+        inc_counter(
+            "issue_creator_admission_requests_total",
+            "Admission decisions for rate-limited stages",
+            {"stage": self.name, "outcome": outcome}
+        )
+
+    def _acquire(self, key):
+        """Take a slot, waiting in `key`'s queue if necessary; returns seconds spent queued."""
+        queued_at = time.monotonic()
+        with self._lock:
+            reason = self._reject_locked(key)
+            if reason:
+                self._count("rejected")
+                raise AdmissionRejected(reason, self._retry_after_locked())
+            if self._active < self.capacity and not self._waiting:
+                self._active += 1
+                self._count("admitted")
+                return 0.0
+            waiter = _Waiter()
+            self._queues.setdefault(key, deque()).append(waiter)
+            self._waiting += 1
+
+        waiter.event.wait(self.max_wait)
+        with self._lock:
+            if not waiter.admitted:
+                queue = self._queues.get(key)
+                if queue is not None:
+                    queue.remove(waiter)
+                    if not queue:
+                        del self._queues[key]
+                self._waiting -= 1
+                self._count("timed_out")
+                raise AdmissionRejected(
+                    f"Waited {self.max_wait:g}s for a formatting slot, try again later",
+                    self._retry_after_locked()
+                )
+            self._count("admitted")
+        return time.monotonic() - queued_at
+
+    def _release(self, service_time):
+        """Free a slot and hand it to the next key in turn."""
+        with self._lock:
+            self._service_times.append(service_time)
+            self._active -= 1
+            while self._active < self.capacity and self._queues:
+                key, queue = self._queues.popitem(last=False)
+                waiter = queue.popleft()
+                if queue:
+                    self._queues[key] = queue  # back of the line for its next request
+                waiter.admitted = True
+                self._waiting -= 1
+                self._active += 1
+                waiter.event.set()
+
+    @contextmanager
+    def admit(self, key):
+        """Run the body once a slot is free for `key`; raises AdmissionRejected instead of waiting too long."""
+        queue_time = self._acquire(key)
+        observe_histogram(
+            "issue_creator_admission_queue_seconds",
+            "Time requests waited for admission",
+            queue_time,
+            {"stage": self.name}
+        )
+        started = time.monotonic()
+        try:
+            yield queue_time
+        finally:
+            self._release(time.monotonic() - started)
+
+    def stats(self):
+        """Return slot usage, queue depth and decision counts."""
+        with self._lock:
+            return {
+                "capacity": self.capacity,
+                "active": self._active,
+                "waiting": self._waiting,
+                "waiting_keys": len(self._queues),
+                "retry_after": self._retry_after_locked(),
+                **self._counts,
+            }
+
+llm_admission = AdmissionController()
@@ -0,0 +1,257 @@
+import csv
+import hashlib
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from .code_index import index_archive, index_local_path, select_code_context
+from .context_compactor import compact_code_context
+from .github import (
+    check_issue_access,
+    create_github_issue,
+    extract_repo_info,
+    find_issues_by_markers,
+    new_marker,
+    parse_issue_fields,
+)
+from .providers import format_issue
+
+logger = logging.getLogger(__name__)
+
+# Items buffered between stages per worker; keeps memory flat on huge files
+QUEUE_DEPTH_PER_WORKER = 4
+# Markers looked up per request when resuming an interrupted run
+RESUME_LOOKUP_BATCH = 50
+
+def iter_records(path):
+    """
+    Yield (line number, record dict) from a JSONL or CSV file without loading
+    it into memory. Blank lines are skipped; unparseable lines yield an error string.
+    """
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+        return
+
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except ValueError as e:
+                yield line_number, f"invalid JSON: {str(e)}"
+
+def record_key(record):
+    """Stable identity for a record: its "id" field, else a hash of its contents."""
+    if record.get("id"):
+        return str(record["id"])
+    payload = json.dumps(record, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+class Checkpoint:
+    """
+    Append-only JSONL log of per-record outcomes. A "submitting" entry, with
+    the idempotency marker about to be sent, is written before each issue is
+    created, so a run that crashes mid-submission can find out on restart
+    whether the issue landed instead of creating it again.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.created = {}
+        self.markers = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # torn final line from a crash
+                    if entry["status"] == "created":
+                        self.created[entry["key"]] = entry
+                        self.markers.pop(entry["key"], None)
+                    elif entry.get("marker"):
+                        self.markers[entry["key"]] = entry["marker"]
+        self._file = open(path, "a", encoding="utf-8")
+
+    def record(self, key, status, **fields):
+        """Durably append one outcome."""
+        entry = dict(fields, key=key, status=status, at=time.time())
+        with self._lock:
+            self._file.write(json.dumps(entry) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            if status == "created":
+                self.created[key] = entry
+                self.markers.pop(key, None)
+            elif fields.get("marker"):
+                self.markers[key] = fields["marker"]
+
+    def close(self):
+        self._file.close()
+
+class ImportStats:
+    """Thread-safe counters for the live progress line."""
+
+    FIELDS = ("read", "skipped", "already_created", "formatted", "created", "recovered", "failed")
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.counts = dict.fromkeys(self.FIELDS, 0)
+        self._lock = threading.Lock()
+
+    def add(self, field, amount=1):
+        with self._lock:
+            self.counts[field] += amount
+
+    def snapshot(self):
+        with self._lock:
+            counts = dict(self.counts)
+        elapsed = time.monotonic() - self.started
+        counts["elapsed"] = elapsed
+        counts["per_minute"] = (counts["created"] + counts["recovered"]) / elapsed * 60 if elapsed else 0.0
+        return counts
+
+    def line(self):
+        counts = self.snapshot()
+        return (
+            f"{counts['elapsed']:6.0f}s  read {counts['read']}  skipped {counts['skipped']}  "
+            f"already created {counts['already_created']}  "
+            f"formatted {counts['formatted']}  created {counts['created'] + counts['recovered']}  "
+            f"failed {counts['failed']}  {counts['per_minute']:.1f} issues/min"
+        )
+
+def _recover_pending(checkpoint, repo_url, token, stats):
+    """Mark issues from an interrupted run as created if their marker is already on GitHub."""
+    pending = list(checkpoint.markers.items())
+    if not pending:
+        return
+    owner, repo = extract_repo_info(repo_url)
+    for start in range(0, len(pending), RESUME_LOOKUP_BATCH):
+        batch = pending[start:start + RESUME_LOOKUP_BATCH]
+        found = find_issues_by_markers(owner, repo, token, [marker for _, marker in batch])
+        for key, marker in batch:
+            if marker in found:
+                checkpoint.record(key, "created", url=found[marker]["url"], number=found[marker]["number"], recovered=True)
+                stats.add("recovered")
+
+def run_import(path, repo_url, token, checkpoint_path=None, format_workers=4, submit_workers=2,
+               skip_format=False, code_index_path=None, progress_interval=5.0, out=sys.stderr):
+    """
+    Stream records from `path` through formatting and issue creation.
+    Formatting and submission run on separate thread pools connected by
+    bounded queues. Returns the final counters.
+    """
+    access_error = check_issue_access(repo_url, token)
+    if access_error:
+        raise Exception(access_error)
+
+    code_index = None
+    if code_index_path and not skip_format:
+        if os.path.isdir(code_index_path):
+            code_index = index_local_path(code_index_path)
+        else:
+            with open(code_index_path, "rb") as f:
+                code_index = index_archive(f, code_index_path)
+
+    checkpoint = Checkpoint(checkpoint_path or f"{path}.checkpoint")
+    stats = ImportStats()
+    _recover_pending(checkpoint, repo_url, token, stats)
+
+    format_queue = queue.Queue(maxsize=format_workers * QUEUE_DEPTH_PER_WORKER)
+    submit_queue = queue.Queue(maxsize=submit_workers * QUEUE_DEPTH_PER_WORKER)
+    stop = threading.Event()
+
+    def fail(key, step, error):
+        checkpoint.record(key, "failed", step=step, error=str(error), marker=checkpoint.markers.get(key))
+        stats.add("failed")
+
+    def format_worker():
+        while True:
+            item = format_queue.get()
+            if item is None:
+                return
+            key, record = item
+            try:
+                if skip_format:
+                    issue = {"title": record["title"], "body": record["body"]}
+                else:
+                    code_context = record.get("code_context") or ""
+                    if code_index and not code_context:
+                        code_context, _ = select_code_context(code_index, record["description"])
+                    code_context, _ = compact_code_context(code_context, record["description"])
+                    issue = format_issue(record["description"], code_context)
+                issue = dict(issue, fields=parse_issue_fields(record))
+                stats.add("formatted")
+                submit_queue.put((key, issue))
+            except Exception as e:
+                fail(key, "processing_description", e)
+
+    def submit_worker():
+        while True:
+            item = submit_queue.get()
+            if item is None:
+                return
+            key, issue = item
+            marker = checkpoint.markers.get(key) or new_marker()
+            try:
+                checkpoint.record(key, "submitting", marker=marker)
+                result = create_github_issue(
+                    repo_url, issue["title"], issue["body"], token, marker=marker, **issue["fields"]
+                )
+                checkpoint.record(key, "created", url=result["url"], number=result["number"])
+                stats.add("created")
+            except Exception as e:
+                fail(key, "submitting_issue", e)
+
+    def report():
+        while not stop.wait(progress_interval):
+            print(stats.line(), file=out, flush=True)
+
+    formatters = [threading.Thread(target=format_worker, name=f"import-format-{i}", daemon=True) for i in range(format_workers)]
+    submitters = [threading.Thread(target=submit_worker, name=f"import-submit-{i}", daemon=True) for i in range(submit_workers)]
+    reporter = threading.Thread(target=report, name="import-progress", daemon=True)
+    for thread in formatters + submitters + [reporter]:
+        thread.start()
+
+    try:
+        required = ("title", "body") if skip_format else ("description",)
+        queued = set()
+        for line_number, record in iter_records(path):
+            stats.add("read")
+            if not isinstance(record, dict) or not all(record.get(field) for field in required):
+                problem = record if isinstance(record, str) else f"missing {' or '.join(required)}"
+                logger.warning(f"Skipping record at line {line_number}: {problem}")
+                stats.add("skipped")
+                continue
+            key = record_key(record)
+            if key in checkpoint.created:
+                stats.add("already_created")
+                continue
+            if key in queued:
+                logger.warning(f"Skipping repeated record at line {line_number}")
+                stats.add("skipped")
+                continue
+            queued.add(key)
+            format_queue.put((key, record))
+
+        for _ in formatters:
+            format_queue.put(None)
+        for thread in formatters:
+            thread.join()
+        for _ in submitters:
+            submit_queue.put(None)
+        for thread in submitters:
+            thread.join()
+    finally:
+        stop.set()
+        checkpoint.close()
+        print(stats.line(), file=out, flush=True)
+    return stats.snapshot()
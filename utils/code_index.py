@@ -0,0 +1,570 @@
+import bisect
+import hashlib
+import json
+import logging
+import mmap
+import os
+import re
+import shutil
+import tarfile
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from array import array
+from .cache import TTLCache
+from .context_compactor import CHARS_PER_TOKEN, CODE_CONTEXT_TOKEN_BUDGET, _terms
+from .metrics import track_stage
+
+logger = logging.getLogger(__name__)
+
+# Indexes of uploaded repository archives (or local checkouts) used to build
+# code_context from a description. Each index lives in a directory named after
+# the archive's SHA-256, so uploading the same archive again reuses it. Only
+# tokens that supplied the archive (recorded by fingerprint in index.json)
+# can use an index.
+CODE_INDEX_DIR = os.environ.get("CODE_INDEX_DIR", "/tmp/issue_creator_code_index")
+CODE_INDEX_MAX_ARCHIVE_BYTES = int(os.environ.get("CODE_INDEX_MAX_ARCHIVE_BYTES", 200 * 1024 * 1024))
+CODE_INDEX_MAX_EXTRACTED_BYTES = int(os.environ.get("CODE_INDEX_MAX_EXTRACTED_BYTES", 500 * 1024 * 1024))
+CODE_INDEX_MAX_FILE_BYTES = int(os.environ.get("CODE_INDEX_MAX_FILE_BYTES", 20 * 1024 * 1024))
+CODE_INDEX_MAX_FILES = int(os.environ.get("CODE_INDEX_MAX_FILES", 50000))
+# Least recently used indexes are removed once there are more than
+# CODE_INDEX_MAX_INDEXES of them or they take more than CODE_INDEX_MAX_DISK_BYTES
+CODE_INDEX_MAX_INDEXES = int(os.environ.get("CODE_INDEX_MAX_INDEXES", 50))
+CODE_INDEX_MAX_DISK_BYTES = int(os.environ.get("CODE_INDEX_MAX_DISK_BYTES", 2 * 1024 * 1024 * 1024))
+# Local checkouts can only be indexed below these directories (colon-separated);
+# empty disables indexing local paths through the web app
+CODE_INDEX_LOCAL_ROOTS = [root for root in os.environ.get("CODE_INDEX_LOCAL_ROOTS", "").split(os.pathsep) if root]
+# Snippets picked for one submission; defaults to the compactor's token budget
+CODE_CONTEXT_BYTE_BUDGET = int(os.environ.get("CODE_CONTEXT_BYTE_BUDGET", CODE_CONTEXT_TOKEN_BUDGET * CHARS_PER_TOKEN))
+# Files at least this large are read through a memory map rather than read()
+MMAP_THRESHOLD = 256 * 1024
+MAX_SNIPPET_LINES = 80
+MAX_SNIPPETS = 12
+
+SOURCE_EXTENSIONS = {
+    ".py", ".js", ".jsx", ".mjs", ".cjs", ".ts", ".tsx", ".go", ".rb", ".java", ".kt", ".rs", ".c", ".h",
+    ".cc", ".cpp", ".hpp", ".cs", ".php", ".swift", ".scala", ".sh", ".sql", ".html", ".css", ".scss",
+    ".md", ".rst", ".txt", ".toml", ".yaml", ".yml", ".json", ".cfg", ".ini",
+}
+SKIPPED_DIRS = {".git", ".hg", ".svn", "node_modules", "__pycache__", ".venv", "venv", ".tox", "dist", "build", ".mypy_cache"}
+
+# Definitions recognised per language; group "name" is the symbol
+PYTHON_SYMBOL = re.compile(rb"^([ \t]*)(?:async[ \t]+)?(def|class)[ \t]+(?P<name>\w+)", re.M)
+JS_SYMBOL = re.compile(
+    rb"^([ \t]*)(?:export[ \t]+(?:default[ \t]+)?)?(?:"
+    rb"(?:async[ \t]+)?(function)\*?[ \t]+(?P<name>[\w$]+)"
+    rb"|(class)[ \t]+(?P<cls>[\w$]+)"
+    rb"|(?:const|let|var)[ \t]+(?P<var>[\w$]+)[ \t]*=[ \t]*(?:async[ \t]*)?(?:function\b|\([^)\n]*\)[ \t]*=>|[\w$]+[ \t]*=>)"
+    rb"|(?:static[ \t]+)?(?:async[ \t]+)?(?P<method>[\w$]+)[ \t]*\([^)\n]*\)[ \t]*\{)",
+    re.M
+)
+JS_KEYWORDS = {"if", "for", "while", "switch", "catch", "function", "return", "with", "else"}
+SYMBOL_LANGUAGES = {".py": "python", ".js": "js", ".jsx": "js", ".mjs": "js", ".cjs": "js", ".ts": "js", ".tsx": "js"}
+
+_loaded = TTLCache(maxsize=32, ttl=60 * 60)
+_evict_lock = threading.Lock()
+_owners_lock = threading.Lock()
+
+class CodeIndex:
+    """
+    Paths, line offsets and Python/JS definitions for one source tree.
+    Line start offsets for every file are stored back to back in offsets.bin,
+    which is memory-mapped on load; file contents are read only for the
+    snippets a submission selects.
+    """
+
+    def __init__(self, path, meta, offsets):
+        self.path = path
+        self.meta = meta
+        self.offsets = offsets
+
+    @property
+    def id(self):
+        return self.meta["id"]
+
+    @property
+    def root(self):
+        return self.meta.get("root") or os.path.join(self.path, "files")
+
+    @classmethod
+    def load(cls, path):
+        """Load an index directory, or return None if it does not exist."""
+        try:
+            with open(os.path.join(path, "index.json")) as f:
+                meta = json.load(f)
+            with open(os.path.join(path, "offsets.bin"), "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                offsets = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)).cast("Q") if size else []
+        except FileNotFoundError:
+            return None
+        return cls(path, meta, offsets)
+
+    def owned_by(self, fingerprint):
+        """True if the token with this fingerprint uploaded the archive or checkout."""
+        return fingerprint in self.meta.get("owners", [])
+
+    def line_offsets(self, file_index):
+        """Byte offset of the start of each line of a file, plus its size."""
+        entry = self.meta["files"][file_index]
+        return self.offsets[entry["offsets"]:entry["offsets"] + entry["lines"] + 1]
+
+    def read_lines(self, file_index, start_line, end_line):
+        """Return lines start_line..end_line (1-based, inclusive) of a file as text."""
+        entry = self.meta["files"][file_index]
+        offsets = self.line_offsets(file_index)
+        end_line = min(end_line, entry["lines"])
+        start, end = offsets[start_line - 1], offsets[end_line]
+        with open(os.path.join(self.root, entry["path"]), "rb") as f:
+            if entry["size"] >= MMAP_THRESHOLD:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    data = mapped[start:end]
+            else:
+                f.seek(start)
+                data = f.read(end - start)
+        return data.decode("utf-8", errors="replace")
+
+    def span_bytes(self, file_index, start_line, end_line):
+        """Size in bytes of lines start_line..end_line of a file, from the offsets alone."""
+        entry = self.meta["files"][file_index]
+        offsets = self.line_offsets(file_index)
+        return offsets[min(end_line, entry["lines"])] - offsets[start_line - 1]
+
+    def stats(self):
+        return {
+            "code_index_id": self.id,
+            "source": self.meta["source"],
+            "files": len(self.meta["files"]),
+            "symbols": len(self.meta["symbols"]),
+            "bytes": sum(entry["size"] for entry in self.meta["files"]),
+            "created_at": self.meta["created_at"],
+        }
+
+def _index_path(index_id):
+    if not re.fullmatch(r"[0-9a-f]{64}", index_id or ""):
+        raise ValueError("Invalid code index ID")
+    return os.path.join(CODE_INDEX_DIR, index_id)
+
+def _wanted(relative_path):
+    """True for source-like files outside dependency and build directories."""
+    parts = relative_path.split("/")
+    if any(part in SKIPPED_DIRS for part in parts[:-1]):
+        return False
+    return os.path.splitext(parts[-1])[1].lower() in SOURCE_EXTENSIONS
+
+def _scan_file(full_path, size):
+    """Return (line start offsets, [(name, kind, line, indent)]) for one file, or None if it is binary."""
+    with open(full_path, "rb") as f:
+        if size >= MMAP_THRESHOLD:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            data = f.read()
+    try:
+        if b"\0" in data[:8192]:
+            return None
+        offsets = [0]
+        position = data.find(b"\n")
+        while position != -1:
+            offsets.append(position + 1)
+            position = data.find(b"\n", position + 1)
+        if offsets[-1] == size and size:
+            offsets.pop()  # no line starts after a trailing newline
+
+        symbols = []
+        language = SYMBOL_LANGUAGES.get(os.path.splitext(full_path)[1].lower())
+        if language == "python":
+            for match in PYTHON_SYMBOL.finditer(data):
+                symbols.append((match.group("name"), match.group(2), match.start(), len(match.group(1))))
+        elif language == "js":
+            for match in JS_SYMBOL.finditer(data):
+                name = match.group("name") or match.group("cls") or match.group("var") or match.group("method")
+                if name.decode("utf-8", errors="replace") in JS_KEYWORDS:
+                    continue
+                kind = b"class" if match.group("cls") else b"function"
+                symbols.append((name, kind, match.start(), len(match.group(1))))
+        return offsets, [
+            (name.decode("utf-8", errors="replace"), kind.decode(), bisect.bisect_right(offsets, start), indent)
+            for name, kind, start, indent in symbols
+        ]
+    finally:
+        if isinstance(data, mmap.mmap):
+            data.close()
+
+def _build(index_dir, meta, root):
+    """Walk `root`, write index.json and offsets.bin into index_dir and return the loaded index."""
+    files = []
+    symbols = []
+    offsets = array("Q")
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(name for name in dirnames if name not in SKIPPED_DIRS)
+        for filename in sorted(filenames):
+            full_path = os.path.join(directory, filename)
+            relative_path = os.path.relpath(full_path, root).replace(os.sep, "/")
+            if not _wanted(relative_path) or os.path.islink(full_path):
+                continue
+            size = os.path.getsize(full_path)
+            if size > CODE_INDEX_MAX_FILE_BYTES:
+                continue
+            scanned = _scan_file(full_path, size)
+            if scanned is None:
+                continue
+            line_offsets, file_symbols = scanned
+            file_index = len(files)
+            files.append({"path": relative_path, "size": size, "lines": len(line_offsets), "offsets": len(offsets)})
+            offsets.extend(line_offsets)
+            offsets.append(size)
+
+            # A definition ends where the next one at the same or outer indentation starts
+            for position, (name, kind, line, indent) in enumerate(file_symbols):
+                end_line = len(line_offsets)
+                for _, _, next_line, next_indent in file_symbols[position + 1:]:
+                    if next_indent <= indent:
+                        end_line = next_line - 1
+                        break
+                symbols.append([name, kind, file_index, line, end_line])
+            if len(files) >= CODE_INDEX_MAX_FILES:
+                logger.warning(f"Code index stopped at {CODE_INDEX_MAX_FILES} files")
+                break
+        else:
+            continue
+        break
+
+    meta = dict(meta, files=files, symbols=symbols, created_at=time.time())
+    with open(os.path.join(index_dir, "offsets.bin"), "wb") as f:
+        offsets.tofile(f)
+    with open(os.path.join(index_dir, "index.json"), "w") as f:
+        json.dump(meta, f)
+    # Recorded separately so eviction does not have to load every index
+    disk_bytes = offsets.itemsize * len(offsets) + os.path.getsize(os.path.join(index_dir, "index.json"))
+    if "root" not in meta:
+        disk_bytes += sum(entry["size"] for entry in files)
+    with open(os.path.join(index_dir, "disk_bytes"), "w") as f:
+        f.write(str(disk_bytes))
+    return CodeIndex.load(index_dir)
+
+def _publish(tmp_dir, index_id):
+    """Move a finished index into place; another worker may have built the same one first."""
+    final_dir = _index_path(index_id)
+    try:
+        os.rename(tmp_dir, final_dir)
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    index = CodeIndex.load(final_dir)
+    _loaded.set(index_id, index)
+    _evict(keep=index_id)
+    return index
+
+def _evict(keep):
+    """Remove least recently used indexes beyond CODE_INDEX_MAX_INDEXES or CODE_INDEX_MAX_DISK_BYTES."""
+    with _evict_lock:
+        indexes = []
+        for name in os.listdir(CODE_INDEX_DIR):
+            path = os.path.join(CODE_INDEX_DIR, name)
+            if not re.fullmatch(r"[0-9a-f]{64}", name):
+                continue
+            try:
+                last_used = os.path.getmtime(os.path.join(path, "index.json"))
+                with open(os.path.join(path, "disk_bytes")) as f:
+                    disk_bytes = int(f.read())
+            except (OSError, ValueError):
+                last_used, disk_bytes = 0, 0
+            indexes.append((last_used, name, disk_bytes))
+
+        indexes.sort(reverse=True)
+        total = 0
+        for position, (_, name, disk_bytes) in enumerate(indexes):
+            total += disk_bytes
+            if name == keep or (position < CODE_INDEX_MAX_INDEXES and total <= CODE_INDEX_MAX_DISK_BYTES):
+                continue
+            # Open memory maps stay valid; the ID is reported as unknown from now on
+            shutil.rmtree(os.path.join(CODE_INDEX_DIR, name), ignore_errors=True)
+            _loaded.pop(name)
+            total -= disk_bytes
+            logger.info(f"Evicted code index {name[:12]}")
+
+def _record_owner(index, owner):
+    """Let another token that supplied the same archive or checkout use an existing index."""
+    if not owner or index.owned_by(owner):
+        return index
+    with _owners_lock:
+        current = CodeIndex.load(index.path) or index
+        meta = dict(current.meta, owners=current.meta.get("owners", []) + [owner])
+        tmp_path = os.path.join(index.path, f"index.json.{uuid.uuid4().hex}")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(index.path, "index.json"))
+    index = CodeIndex.load(index.path)
+    _loaded.set(index.id, index)
+    return index
+
+def _safe_member_path(name):
+    """Normalise an archive member name, or return None if it would escape the extraction directory."""
+    name = name.replace("\\", "/")
+    normalized = os.path.normpath(name).replace(os.sep, "/")
+    if name.startswith("/") or normalized.startswith("..") or re.match(r"^[A-Za-z]:", name):
+        return None
+    return normalized
+
+def _extract(archive_path, target):
+    """Extract regular source files from a zip or tar archive, within the size limits."""
+    extracted = 0
+
+    def copy(source, relative_path, size):
+        nonlocal extracted
+        if size > CODE_INDEX_MAX_FILE_BYTES or not _wanted(relative_path):
+            return
+        extracted += size
+        if extracted > CODE_INDEX_MAX_EXTRACTED_BYTES:
+            raise ValueError("Archive expands beyond the allowed size")
+        destination = os.path.join(target, relative_path)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        with open(destination, "wb") as out:
+            # Copy at most the declared size so a lying header cannot exceed the limits
+            shutil.copyfileobj(_Limited(source, size), out)
+
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as archive:
+            for info in archive.infolist():
+                is_symlink = (info.external_attr >> 16) & 0o170000 == 0o120000
+                relative_path = _safe_member_path(info.filename)
+                if info.is_dir() or is_symlink or relative_path is None:
+                    continue
+                with archive.open(info) as source:
+                    copy(source, relative_path, info.file_size)
+    elif tarfile.is_tarfile(archive_path):
+        with tarfile.open(archive_path) as archive:
+            for member in archive:
+                relative_path = _safe_member_path(member.name)
+                if not member.isreg() or relative_path is None:
+                    continue
+                copy(archive.extractfile(member), relative_path, member.size)
+    else:
+        raise ValueError("Unsupported archive: upload a .zip, .tar, .tar.gz or .tar.bz2 file")
+
+class _Limited:
+    """File wrapper that stops after `limit` bytes."""
+
+    def __init__(self, source, limit):
+        self.source = source
+        self.remaining = limit
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b""
+        size = self.remaining if size < 0 else min(size, self.remaining)
+        data = self.source.read(size)
+        self.remaining -= len(data)
+        return data
+
+def index_archive(stream, filename="", owner=None):
+    """
+    Index an uploaded repository archive and return the CodeIndex. The upload
+    is hashed while it is spooled to disk; an archive indexed before is not
+    extracted again. `owner` is the uploading token's fingerprint.
+    """
+    os.makedirs(CODE_INDEX_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    received = 0
+    with tempfile.NamedTemporaryFile(dir=CODE_INDEX_DIR, prefix="upload-", delete=False) as spool:
+        try:
+            for chunk in iter(lambda: stream.read(1024 * 1024), b""):
+                received += len(chunk)
+                if received > CODE_INDEX_MAX_ARCHIVE_BYTES:
+                    raise ValueError(f"Archive is larger than {CODE_INDEX_MAX_ARCHIVE_BYTES} bytes")
+                digest.update(chunk)
+                spool.write(chunk)
+        except Exception:
+            os.unlink(spool.name)
+            raise
+
+    try:
+        index_id = digest.hexdigest()
+        index = get_code_index(index_id)
+        if index is not None:
+            return _record_owner(index, owner)
+
+        tmp_dir = os.path.join(CODE_INDEX_DIR, f"building-{uuid.uuid4().hex}")
+        files_dir = os.path.join(tmp_dir, "files")
+        os.makedirs(files_dir)
+        try:
+            with track_stage("code_index_build"):
+                _extract(spool.name, files_dir)
+                # GitHub archives wrap everything in one "<repo>-<ref>/" directory
+                entries = os.listdir(files_dir)
+                if len(entries) == 1 and os.path.isdir(os.path.join(files_dir, entries[0])):
+                    for name in os.listdir(os.path.join(files_dir, entries[0])):
+                        os.rename(os.path.join(files_dir, entries[0], name), os.path.join(files_dir, name))
+                    os.rmdir(os.path.join(files_dir, entries[0]))
+                source = os.path.basename(filename) or "archive"
+                _build(tmp_dir, {"id": index_id, "source": source, "owners": [owner] if owner else []}, files_dir)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        index = _record_owner(_publish(tmp_dir, index_id), owner)
+        logger.info(f"Indexed archive {filename} as {index_id[:12]}: {len(index.meta['files'])} files")
+        return index
+    finally:
+        os.unlink(spool.name)
+
+def is_allowed_local_path(path):
+    """True if `path` is inside one of CODE_INDEX_LOCAL_ROOTS."""
+    real_path = os.path.realpath(path)
+    return any(
+        os.path.commonpath([real_path, os.path.realpath(root)]) == os.path.realpath(root)
+        for root in CODE_INDEX_LOCAL_ROOTS
+    )
+
+def index_local_path(path, owner=None):
+    """
+    Index a local checkout in place and return the CodeIndex. The index ID
+    hashes the path with every file's size and mtime, so an unchanged
+    checkout reuses its index and any edit produces a new one. `owner` is the
+    requesting token's fingerprint.
+    """
+    root = os.path.realpath(path)
+    if not os.path.isdir(root):
+        raise ValueError(f"Not a directory: {path}")
+    digest = hashlib.sha256(root.encode("utf-8"))
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(name for name in dirnames if name not in SKIPPED_DIRS)
+        for filename in sorted(filenames):
+            full_path = os.path.join(directory, filename)
+            relative_path = os.path.relpath(full_path, root).replace(os.sep, "/")
+            if _wanted(relative_path) and not os.path.islink(full_path):
+                stat = os.stat(full_path)
+                digest.update(f"{relative_path}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode("utf-8"))
+
+    index_id = digest.hexdigest()
+    index = get_code_index(index_id)
+    if index is not None:
+        return _record_owner(index, owner)
+
+    os.makedirs(CODE_INDEX_DIR, exist_ok=True)
+    tmp_dir = os.path.join(CODE_INDEX_DIR, f"building-{uuid.uuid4().hex}")
+    os.makedirs(tmp_dir)
+    try:
+        with track_stage("code_index_build"):
+            _build(tmp_dir, {"id": index_id, "source": root, "root": root, "owners": [owner] if owner else []}, root)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return _record_owner(_publish(tmp_dir, index_id), owner)
+
+def get_code_index(index_id, fingerprint=None):
+    """
+    Return a previously built index by ID, or None; marks it as recently used.
+    With a token fingerprint, indexes that token did not upload are None too.
+    """
+    path = _index_path(index_id)
+    try:
+        os.utime(os.path.join(path, "index.json"))
+    except FileNotFoundError:
+        _loaded.pop(index_id)
+        return None
+    index = _loaded.get(index_id)
+    if index is None or (fingerprint is not None and not index.owned_by(fingerprint)):
+        # Reloaded on a miss: another worker may have recorded the owner since
+        index = CodeIndex.load(path)
+        if index is not None:
+            _loaded.set(index_id, index)
+    if index is not None and fingerprint is not None and not index.owned_by(fingerprint):
+        return None
+    return index
+
+def _symbol_terms(name):
+    return _terms(name) | {name.lower()}
+
+def select_code_context(index, description, byte_budget=CODE_CONTEXT_BYTE_BUDGET):
+    """
+    Pick the definitions (or file heads) most related to the description and
+    return (code_context, stats) within byte_budget. Symbols named in the
+    description verbatim rank first, then shared identifier terms; matches in
+    a file's path count for all of its definitions.
+    """
+    with track_stage("code_context_select"):
+        description_terms = _terms(description)
+        mentioned = {word.lower() for word in re.findall(r"[\w$]+", description)}
+        files = index.meta["files"]
+        path_scores = [
+            len(_terms(entry["path"].replace("/", " ").replace(".", " ")) & description_terms) * 0.5
+            for entry in files
+        ]
+
+        candidates = []
+        for name, kind, file_index, line, end_line in index.meta["symbols"]:
+            score = len(_symbol_terms(name) & description_terms) + path_scores[file_index]
+            if name.lower() in mentioned and len(name) > 2:
+                score += 3
+            if score > 0:
+                candidates.append((score, file_index, line, min(end_line, line + MAX_SNIPPET_LINES - 1)))
+        with_symbols = {file_index for _, _, file_index, _, _ in index.meta["symbols"]}
+        for file_index, score in enumerate(path_scores):
+            if score > 0 and file_index not in with_symbols:
+                candidates.append((score, file_index, 1, MAX_SNIPPET_LINES))
+        candidates.sort(key=lambda candidate: (-candidate[0], files[candidate[1]]["path"], candidate[2]))
+
+        # Upper bound on each snippet's cost (header, text, separator) from the
+        # line offsets, so candidates that cannot fit are never read, and the
+        # smallest cost still to come, to stop once nothing else fits
+        estimates = [
+            len(files[file_index]["path"]) + 2 * len(str(end_line)) + 6
+            + index.span_bytes(file_index, start_line, end_line) + 2
+            for _, file_index, start_line, end_line in candidates
+        ]
+        smallest_after = estimates[:]
+        for position in range(len(estimates) - 2, -1, -1):
+            smallest_after[position] = min(estimates[position], smallest_after[position + 1])
+
+        snippets = []
+        used = 0
+        covered = {}
+        for position, (score, file_index, start_line, end_line) in enumerate(candidates):
+            if len(snippets) >= MAX_SNIPPETS or byte_budget - used < smallest_after[position]:
+                break
+            if estimates[position] > byte_budget - used:
+                continue
+            # Skip definitions nested inside a snippet that is already included
+            if any(start <= start_line and end_line <= end for start, end in covered.get(file_index, [])):
+                continue
+            lines = index.read_lines(file_index, start_line, end_line).rstrip().split("\n")
+            # The next definition's decorators belong to it, not to this snippet
+            while len(lines) > 1 and (lines[-1].lstrip().startswith("@") or not lines[-1].strip()):
+                lines.pop()
+            text = "\n".join(lines)
+            header = f"# {files[file_index]['path']}:{start_line}-{start_line + text.count(chr(10))}"
+            cost = len(header) + len(text.encode("utf-8")) + 2
+            if used + cost > byte_budget:
+                continue
+            snippets.append(f"{header}\n{text}")
+            covered.setdefault(file_index, []).append((start_line, end_line))
+            used += cost
+
+    stats = {
+        "code_index_id": index.id,
+        "candidates": len(candidates),
+        "snippets": len(snippets),
+        "bytes": used,
+        "byte_budget": byte_budget,
+    }
+    return "\n\n".join(snippets), stats
+
+def build_code_context(index_id, description, fingerprint, byte_budget=CODE_CONTEXT_BYTE_BUDGET):
+    """
+    Select code_context for a description from an index the token with this
+    fingerprint uploaded; raises ValueError if there is no such index.
+    """
+    index = get_code_index(index_id, fingerprint)
+    if index is None:
+        raise ValueError(f"Unknown code index: {index_id}")
+    return select_code_context(index, description, byte_budget)
+
+def get_code_index_stats():
+    """Return totals for the indexes loaded in this process and the loader cache counters."""
+    indexes = [index for _, index, _ in _loaded.items() if index is not None]
+    return {
+        "loaded": len(indexes),
+        "files": sum(len(index.meta["files"]) for index in indexes),
+        "bytes": sum(entry["size"] for index in indexes for entry in index.meta["files"]),
+        "cache": _loaded.stats(),
+    }
@@ -0,0 +1,192 @@
+import hashlib
+import math
+import os
+import re
+
+# Approximate prompt budget for pasted code context. Tokens are estimated at
+# ~4 characters each, which is close enough for both Gemini and GPT-4o.
+CODE_CONTEXT_TOKEN_BUDGET = int(os.environ.get("CODE_CONTEXT_TOKEN_BUDGET", 4000))
+CHARS_PER_TOKEN = 4
+MAX_CHUNK_LINES = 40
+TRUNCATED_MARKER = "\n... (truncated)"
+MAX_LINE_LENGTH = 400
+MAX_REPEAT_PERIOD = 4
+
+BOILERPLATE_PATTERNS = [
+    re.compile(r"^\s*(#|//|/\*|\*|--)\s*[-=*#/_~]{4,}\s*(\*/)?\s*$"),  # separator comments
+    re.compile(r"^\s*(#|//|\*|/\*)\s*(copyright|licensed under|license:|spdx-license-identifier|all rights reserved)", re.I),
+    re.compile(r"^\s*(#|//|\*)?\s*(you may not use this file|distributed under the license|without warranties)", re.I),
+]
+ERROR_PATTERN = re.compile(r"(Traceback|Error|Exception|FAILED|panic|fatal)", re.I)
+WORD_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]+")
+STOP_WORDS = {
+    "the", "and", "for", "that", "this", "with", "from", "are", "was", "when",
+    "not", "but", "have", "has", "should", "would", "could", "into", "our", "its",
+    "def", "self", "return", "import", "const", "let", "var", "function", "class",
+}
+
+def estimate_tokens(text):
+    """Rough token count used for budgeting."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def _terms(text):
+    """Split text into lowercase identifier parts, expanding snake_case and camelCase."""
+    terms = set()
+    for word in WORD_PATTERN.findall(text):
+        parts = re.sub(r"([a-z0-9])([A-Z])", r"\1_\2", word).lower().split("_")
+        for part in parts + [word.lower()]:
+            if len(part) > 2 and part not in STOP_WORDS:
+                terms.add(part)
+    return terms
+
+def _is_boilerplate(line):
+    return any(pattern.search(line) for pattern in BOILERPLATE_PATTERNS)
+
+def _clean_lines(text):
+    """Strip trailing whitespace, boilerplate comments and overlong blob lines; squeeze blank runs."""
+    lines = []
+    for line in text.replace("\r\n", "\n").replace("\r", "\n").split("\n"):
+        line = line.rstrip()
+        if _is_boilerplate(line):
+            continue
+        if len(line) > MAX_LINE_LENGTH and " " not in line.strip():
+            line = f"{line[:80]}... [{len(line)} chars of minified/encoded data omitted]"
+        if not line and lines and not lines[-1]:
+            continue
+        lines.append(line)
+    return lines
+
+def _collapse_repeats(lines):
+    """Collapse consecutive repetitions of a 1..MAX_REPEAT_PERIOD line pattern (e.g. recursive stack frames)."""
+    result = []
+    i = 0
+    while i < len(lines):
+        collapsed = False
+        for period in range(1, MAX_REPEAT_PERIOD + 1):
+            pattern = lines[i:i + period]
+            # Short lines such as closing brackets legitimately repeat in code
+            if len(pattern) < period or sum(len(line.strip()) for line in pattern) < 8:
+                continue
+            repeats = 1
+            while lines[i + repeats * period:i + (repeats + 1) * period] == pattern:
+                repeats += 1
+            if repeats >= 3:
+                result.extend(pattern)
+                result.append(f"... [previous {period} line(s) repeated {repeats - 1} more times]")
+                i += repeats * period
+                collapsed = True
+                break
+        if not collapsed:
+            result.append(lines[i])
+            i += 1
+    return result
+
+def _chunk(lines):
+    """Split lines into blank-line separated blocks of at most MAX_CHUNK_LINES lines."""
+    chunks = []
+    current = []
+    for line in lines:
+        if not line:
+            if current:
+                chunks.append(current)
+                current = []
+            continue
+        current.append(line)
+        if len(current) >= MAX_CHUNK_LINES:
+            chunks.append(current)
+            current = []
+    if current:
+        chunks.append(current)
+    return chunks
+
+def _score(chunk_text, description_terms):
+    """Relevance of a chunk to the description: shared terms, boosted for error output."""
+    chunk_terms = _terms(chunk_text)
+    overlap = len(chunk_terms & description_terms)
+    score = overlap / math.sqrt(max(len(chunk_terms), 1))
+    if ERROR_PATTERN.search(chunk_text):
+        score += 0.5
+    return score
+
+def _truncate(text, max_chars):
+    """Cut text to at most max_chars, at a line break when one is reasonably close, and mark the cut."""
+    limit = max_chars - len(TRUNCATED_MARKER)
+    if limit <= 0:
+        return ""
+    cut = text[:limit]
+    line_break = cut.rfind("\n")
+    if line_break > limit // 2:
+        cut = cut[:line_break]
+    return cut + TRUNCATED_MARKER
+
+def compact_code_context(code_context, description="", token_budget=CODE_CONTEXT_TOKEN_BUDGET):
+    """
+    Shrink pasted code context to fit a token budget.
+    Boilerplate, blank runs, repeated frames and duplicate blocks are always
+    removed; if the result is still over budget the blocks most relevant to the
+    description are kept, in their original order. Returns (text, stats).
+    """
+    original_tokens = estimate_tokens(code_context or "")
+    stats = {
+        "original_chars": len(code_context or ""),
+        "original_tokens": original_tokens,
+        "compacted_chars": 0,
+        "compacted_tokens": 0,
+        "chunks_total": 0,
+        "chunks_kept": 0,
+    }
+    if not code_context:
+        return "", stats
+
+    chunks = []
+    seen = set()
+    for chunk in _chunk(_collapse_repeats(_clean_lines(code_context))):
+        text = "\n".join(chunk)
+        digest = hashlib.sha1(re.sub(r"\s+", " ", text).strip().encode("utf-8")).digest()
+        if digest in seen:
+            continue
+        seen.add(digest)
+        chunks.append(text)
+    stats["chunks_total"] = len(chunks)
+
+    kept = list(range(len(chunks)))
+    if estimate_tokens("\n\n".join(chunks)) > token_budget:
+        description_terms = _terms(description)
+        ranked = sorted(
+            range(len(chunks)),
+            key=lambda index: (-_score(chunks[index], description_terms), index)
+        )
+        kept = []
+        used = 0
+        for index in ranked:
+            cost = estimate_tokens(chunks[index]) + 1
+            if used + cost > token_budget:
+                continue
+            kept.append(index)
+            used += cost
+        if not kept and ranked:
+            # Every chunk is larger than the whole budget; keep the start of the
+            # most relevant one rather than sending no context at all
+            index = ranked[0]
+            chunks[index] = _truncate(chunks[index], token_budget * CHARS_PER_TOKEN - len("...\n\n") * 2)
+            if chunks[index]:
+                kept.append(index)
+        kept.sort()
+
+    parts = []
+    previous = -1
+    for index in kept:
+        if index != previous + 1:
+            parts.append("...")
+        parts.append(chunks[index])
+        previous = index
+    if kept and previous != len(chunks) - 1:
+        parts.append("...")
+
+    compacted = "\n\n".join(parts)
+    stats.update({
+        "compacted_chars": len(compacted),
+        "compacted_tokens": estimate_tokens(compacted),
+        "chunks_kept": len(kept),
+    })
+    return compacted, stats
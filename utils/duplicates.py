@@ -0,0 +1,350 @@
+import fcntl
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+import zlib
+from contextlib import contextmanager
+from .github import check_issue_access, extract_repo_info, iter_issues_updated_since
+from .metrics import track_stage
+
+logger = logging.getLogger(__name__)
+
+# Per-repository index of existing issues used to flag likely duplicates
+# before a new one is formatted. Each repository gets a directory of NumPy
+# arrays that are memory-mapped on load, so every worker on a host shares one
+# copy through the page cache.
+DUPLICATE_CHECK = os.environ.get("DUPLICATE_CHECK", "true").lower() == "true"
+DUPLICATE_INDEX_DIR = os.environ.get("DUPLICATE_INDEX_DIR", "/tmp/issue_creator_duplicates")
+DUPLICATE_THRESHOLD = float(os.environ.get("DUPLICATE_THRESHOLD", 0.3))
+DUPLICATE_MAX_RESULTS = int(os.environ.get("DUPLICATE_MAX_RESULTS", 5))
+DUPLICATE_REFRESH_SECONDS = int(os.environ.get("DUPLICATE_REFRESH_SECONDS", 120))
+# Hashed feature space; collisions only slightly blur scores at this size
+DUPLICATE_FEATURES = 2 ** 18
+# Long bodies add little beyond their opening, which is where the summary is
+DUPLICATE_BODY_CHARS = 4000
+
+ARRAYS = ("rows", "indices", "tf", "weights", "norms", "idf")
+
+WORD_RE = re.compile(r"[a-z0-9_]{2,}")
+COMMENT_RE = re.compile(r"<!--.*?-->", re.S)
+SUFFIXES = ("ing", "ed", "es", "s")
+STOP_WORDS = frozenset("""
+a an and are as at be but by can do for from has have if in into is it its no not of on or
+so that the their then there these this to was we were when which will with would you your
+""".split())
+
+_indexes = {}
+_refreshing = set()
+_lock = threading.Lock()
+
+def _stem(word):
+    """Strip common English inflections so "crashes" and "crash" match."""
+    for suffix in SUFFIXES:
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+def _hashed_features(title, body):
+    """Return hashed unigram and bigram features; title words count twice."""
+    def words(text):
+        return [
+            _stem(word)
+            for word in WORD_RE.findall(COMMENT_RE.sub(" ", text or "").lower())
+            if word not in STOP_WORDS
+        ]
+
+    title_words = words(title)
+    features = []
+    for tokens, repeat in ((title_words, 2), (words((body or "")[:DUPLICATE_BODY_CHARS]), 1)):
+        terms = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        hashed = [zlib.crc32(term.encode("utf-8")) % DUPLICATE_FEATURES for term in terms]
+        features.extend(hashed * repeat)
+    return features
+
+def _vectorize(title, body):
+    """Return (feature indices, log-scaled term frequencies) for one document."""
+    import numpy as np
+
+    features, counts = np.unique(np.array(_hashed_features(title, body), dtype=np.int32), return_counts=True)
+    return features.astype(np.int32), (1.0 + np.log(counts)).astype(np.float32)
+
+class DuplicateIndex:
+    """
+    Hashed TF-IDF vectors for one repository's issues in coordinate form:
+    rows[i], indices[i] and tf[i] describe one non-zero entry. weights holds
+    tf * idf for each entry and norms the L2 norm of each issue vector.
+    """
+
+    def __init__(self, path, meta, arrays):
+        self.path = path
+        self.meta = meta
+        self.arrays = arrays
+
+    @property
+    def version(self):
+        return self.meta.get("version")
+
+    @property
+    def refreshed_at(self):
+        return self.meta.get("refreshed_at", 0)
+
+    @classmethod
+    def empty(cls, path):
+        import numpy as np
+
+        arrays = {name: np.zeros(0, dtype=np.int32 if name in ("rows", "indices") else np.float32) for name in ARRAYS}
+        arrays["idf"] = np.ones(DUPLICATE_FEATURES, dtype=np.float32)
+        return cls(path, {"version": None, "issues": [], "since": None, "refreshed_at": 0}, arrays)
+
+    @classmethod
+    def load(cls, path):
+        """Memory-map the current version on disk, or return None if there is none."""
+        import numpy as np
+
+        try:
+            with open(os.path.join(path, "meta.json")) as f:
+                meta = json.load(f)
+            version_dir = os.path.join(path, meta["version"])
+            arrays = {name: np.load(os.path.join(version_dir, f"{name}.npy"), mmap_mode="r") for name in ARRAYS}
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable duplicate index at {path}: {str(e)}")
+            return None
+        return cls(path, meta, arrays)
+
+    def __len__(self):
+        return len(self.meta["issues"])
+
+    def search(self, title, body="", limit=DUPLICATE_MAX_RESULTS, threshold=DUPLICATE_THRESHOLD):
+        """Return up to `limit` issues whose cosine similarity to the text is at least `threshold`."""
+        import numpy as np
+
+        if not len(self):
+            return []
+        features, tf = _vectorize(title, body)
+        if not len(features):
+            return []
+        idf = self.arrays["idf"]
+        query = tf * idf[features]
+        query_norm = float(np.sqrt(np.dot(query, query)))
+
+        dense = np.zeros(DUPLICATE_FEATURES, dtype=np.float32)
+        dense[features] = query
+        scores = np.bincount(
+            self.arrays["rows"],
+            weights=self.arrays["weights"] * dense[self.arrays["indices"]],
+            minlength=len(self)
+        )
+        scores /= np.maximum(self.arrays["norms"], 1e-9) * query_norm
+
+        count = min(limit, len(scores))
+        top = np.argpartition(-scores, count - 1)[:count]
+        results = []
+        for row in top[np.argsort(-scores[top])]:
+            if scores[row] < threshold:
+                break
+            issue = self.meta["issues"][row]
+            results.append({
+                "number": issue["number"],
+                "title": issue["title"],
+                "url": issue["url"],
+                "state": issue["state"],
+                "score": round(float(scores[row]), 3),
+            })
+        return results
+
+    def updated(self, issues):
+        """Return a new in-memory index with `issues` added, replacing earlier versions of the same issues."""
+        import numpy as np
+
+        latest = {}
+        for issue in issues:
+            latest[issue["number"]] = issue
+        kept_issues = [issue for issue in self.meta["issues"] if issue["number"] not in latest]
+        keep = np.array([issue["number"] not in latest for issue in self.meta["issues"]], dtype=bool)
+
+        rows = np.asarray(self.arrays["rows"])
+        entries = keep[rows] if len(rows) else np.zeros(0, dtype=bool)
+        renumber = np.cumsum(keep, dtype=np.int64) - 1
+        parts = {
+            "rows": [renumber[rows[entries]].astype(np.int32)],
+            "indices": [np.asarray(self.arrays["indices"])[entries]],
+            "tf": [np.asarray(self.arrays["tf"])[entries]],
+        }
+
+        new_issues = sorted(latest.values(), key=lambda issue: issue["updatedAt"])
+        for offset, issue in enumerate(new_issues):
+            features, tf = _vectorize(issue["title"], issue.get("body"))
+            parts["rows"].append(np.full(len(features), len(kept_issues) + offset, dtype=np.int32))
+            parts["indices"].append(features)
+            parts["tf"].append(tf)
+
+        arrays = {name: np.concatenate(values) for name, values in parts.items()}
+        all_issues = kept_issues + [
+            {key: issue[key] for key in ("number", "title", "url", "state", "updatedAt")}
+            for issue in new_issues
+        ]
+
+        # Features are unique within an issue, so a bincount is the document frequency
+        document_frequency = np.bincount(arrays["indices"], minlength=DUPLICATE_FEATURES)
+        arrays["idf"] = (np.log((1 + len(all_issues)) / (1 + document_frequency)) + 1).astype(np.float32)
+        arrays["weights"] = (arrays["tf"] * arrays["idf"][arrays["indices"]]).astype(np.float32)
+        arrays["norms"] = np.sqrt(
+            np.bincount(arrays["rows"], weights=arrays["weights"] ** 2, minlength=len(all_issues))
+        ).astype(np.float32)
+
+        since = max([self.meta.get("since") or ""] + [issue["updatedAt"] for issue in new_issues]) or None
+        meta = {"version": None, "issues": all_issues, "since": since, "refreshed_at": time.time()}
+        return DuplicateIndex(self.path, meta, arrays)
+
+    def touch(self):
+        """Record a sync that found no changes without rewriting the arrays."""
+        with _locked(self.path):
+            current = self.load(self.path)
+            if current is not None and current.version != self.version:
+                # Another worker saved a newer version; keep it rather than point back at ours
+                return current
+            self.meta = dict(self.meta, refreshed_at=time.time())
+            self._write_meta(self.meta)
+        return self
+
+    def _write_meta(self, meta):
+        tmp_path = os.path.join(self.path, f"meta.json.{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(self.path, "meta.json"))
+
+    def save(self):
+        """
+        Write the arrays to a new version directory and switch meta.json to it
+        atomically, so readers never see a partly written index. Older versions
+        beyond the previous one are removed; open memory maps stay valid. Saves
+        from every worker are serialised by a lock file, so no worker removes
+        a version another is about to switch to.
+        """
+        import numpy as np
+
+        os.makedirs(self.path, exist_ok=True)
+        with _locked(self.path):
+            version = f"v{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}"
+            version_dir = os.path.join(self.path, version)
+            os.makedirs(version_dir, exist_ok=True)
+            for name in ARRAYS:
+                np.save(os.path.join(version_dir, f"{name}.npy"), self.arrays[name])
+
+            previous = self.load(self.path)
+            self._write_meta(dict(self.meta, version=version))
+
+            keep = {version, previous.version if previous else None}
+            for entry in os.listdir(self.path):
+                if entry.startswith("v") and entry not in keep:
+                    shutil.rmtree(os.path.join(self.path, entry), ignore_errors=True)
+        return self.load(self.path)
+
+@contextmanager
+def _locked(path):
+    """Hold an exclusive lock on a repository's index directory across processes."""
+    with open(os.path.join(path, ".lock"), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _index_path(owner, repo):
+    return os.path.join(DUPLICATE_INDEX_DIR, f"{owner.lower()}__{repo.lower()}")
+
+def refresh_index(owner, repo, token):
+    """
+    Bring a repository's index up to date: pick up a newer version saved by
+    another worker, then fetch issues updated since the last sync.
+    """
+    key = (owner.lower(), repo.lower())
+    path = _index_path(owner, repo)
+    index = _indexes.get(key)
+    on_disk = DuplicateIndex.load(path)
+    if on_disk is not None and (index is None or on_disk.version != index.version):
+        index = on_disk
+        _indexes[key] = index
+    if index is not None and time.time() - index.refreshed_at < DUPLICATE_REFRESH_SECONDS:
+        return index
+
+    with track_stage("duplicate_index_refresh"):
+        issues = []
+        for page in iter_issues_updated_since(owner, repo, token, index.meta["since"] if index else None):
+            issues.extend(page)
+        # `since` is inclusive, so the newest issues already indexed come back
+        # on every sync; only versions the index does not have count as changes
+        if index is not None:
+            known = {(issue["number"], issue["updatedAt"]) for issue in index.meta["issues"]}
+            issues = [issue for issue in issues if (issue["number"], issue["updatedAt"]) not in known]
+        if issues or index is None:
+            index = (index or DuplicateIndex.empty(path)).updated(issues).save()
+        else:
+            index = index.touch()
+    _indexes[key] = index
+    logger.info(f"Duplicate index for {owner}/{repo} refreshed with {len(issues)} changed issues ({len(index)} total)")
+    return index
+
+def _schedule_refresh(owner, repo, token):
+    """Refresh a repository's index on a background thread unless one is already running."""
+    key = (owner.lower(), repo.lower())
+    with _lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    def run():
+        try:
+            refresh_index(owner, repo, token)
+        except Exception as e:
+            logger.warning(f"Could not refresh duplicate index for {owner}/{repo}: {str(e)}")
+        finally:
+            with _lock:
+                _refreshing.discard(key)
+
+    threading.Thread(target=run, name=f"duplicate-index-{owner}/{repo}", daemon=True).start()
+
+def find_duplicates(repo_url, description, token, limit=DUPLICATE_MAX_RESULTS, threshold=DUPLICATE_THRESHOLD):
+    """
+    Return existing issues in the repository that look like duplicates of the
+    description, most similar first. The index is refreshed in the background,
+    so a repository seen for the first time is not checked until it is built.
+    """
+    owner, repo = extract_repo_info(repo_url)
+    # One index serves every token, so it is only searched for tokens that
+    # are confirmed to have access; failing to confirm returns nothing
+    try:
+        if check_issue_access(repo_url, token):
+            return []
+    except Exception as e:
+        logger.warning(f"Skipping duplicate check for {owner}/{repo}, access unconfirmed: {str(e)}")
+        return []
+    key = (owner.lower(), repo.lower())
+    index = _indexes.get(key)
+    if index is None:
+        index = DuplicateIndex.load(_index_path(owner, repo))
+        if index is not None:
+            _indexes[key] = index
+    if index is None or time.time() - index.refreshed_at >= DUPLICATE_REFRESH_SECONDS:
+        _schedule_refresh(owner, repo, token)
+    if index is None:
+        return []
+
+    with track_stage("duplicate_search"):
+        return index.search(description, limit=limit, threshold=threshold)
+
+def get_duplicate_index_stats():
+    """Return totals over the loaded repository indexes; repository names are not exposed."""
+    indexes = list(_indexes.values())
+    return {
+        "repositories": len(indexes),
+        "issues": sum(len(index) for index in indexes),
+        "oldest_refresh": min((index.refreshed_at for index in indexes), default=None),
+    }
@@ -1,14 +1,45 @@
 import os
-import google.generativeai as genai
 import json
 import re
+import threading
+from .json_stream import IssueStreamParser
 
 # Configure Gemini
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
-genai.configure(api_key=GEMINI_API_KEY)
-
-def process_issue_description(description, code_context=''):
-    """Generate a well-formatted GitHub issue using Gemini."""
+# Optional REST endpoint override, e.g. a local stand-in used by the benchmarks
+GEMINI_API_ENDPOINT = os.environ.get("GEMINI_API_ENDPOINT")
+
+# The SDK takes most of a second to import, so it is loaded on first use
+# rather than when a worker starts (see benchmarks/import_time.py)
+_genai = None
+_genai_lock = threading.Lock()
+
+def get_genai():
+    """Import and configure the Gemini SDK once, returning the module."""
+    global _genai
+    with _genai_lock:
+        if _genai is None:
+            import google.generativeai as genai
+            if GEMINI_API_ENDPOINT:
+                genai.configure(api_key=GEMINI_API_KEY, transport="rest", client_options={"api_endpoint": GEMINI_API_ENDPOINT})
+            else:
+                genai.configure(api_key=GEMINI_API_KEY)
+            _genai = genai
+        return _genai
+
+GEMINI_MODEL = "gemini-2.0-flash-exp"
+# Bump whenever the prompt below changes so cached issues are not reused
+PROMPT_VERSION = "1"
+
+def process_issue_description(description, code_context='', on_partial=None, timeout=None, cancel_event=None,
+                              label_options=None):
+    """
+    Generate a well-formatted GitHub issue using Gemini.
+    When on_partial is given the response is streamed and on_partial receives
+    {"title": ...} once the title is complete and {"body_delta": ...} chunks.
+    A set cancel_event stops a streamed generation between chunks.
+    With label_options the result also carries "labels" picked from that list.
+    """
     try:
         # Prepare the context prompt
         context_prompt = ""
@@ -21,6 +52,11 @@ Here is the relevant code context to consider:
 
 Please use this code context to create a more detailed and specific issue."""
 
+        labels_prompt = ""
+        if label_options:
+            labels_prompt = f"""
+- Also include a "labels" field: a JSON array of up to three labels that fit the issue, chosen only from {json.dumps(label_options)}"""
+
         # Create the full prompt
         prompt = f"""You are an expert at formatting GitHub issues.
 Given the following description and optional code context, create a well-structured issue with a clear title and detailed markdown-formatted body.
@@ -39,7 +75,7 @@ IMPORTANT:
 - Keep all information factual and based only on the provided description and code context
 - If code context is provided, use it to make the issue more specific and technical
 - Include relevant code snippets from the context if they help explain the issue
-- Format your response as a JSON object with two fields: "title" and "body"
+- Format your response as a JSON object with two fields: "title" and "body"{labels_prompt}
 - ONLY return the JSON object, nothing else
 
 Description: {description}
@@ -47,11 +83,25 @@ Description: {description}
 {context_prompt}"""
 
         # Generate content using Gemini
-        model = genai.GenerativeModel("gemini-2.0-flash-exp")
-        response = model.generate_content(prompt)
-
-        # Get the text content of the response
-        content = response.text.strip()
+        model = get_genai().GenerativeModel(GEMINI_MODEL)
+        request_options = {"timeout": timeout} if timeout else None
+        if on_partial or cancel_event:
+            parser = IssueStreamParser(
+                on_title=lambda title: on_partial and on_partial({'title': title}),
+                on_body=lambda text: on_partial and on_partial({'body_delta': text})
+            )
+            chunks = []
+            for chunk in model.generate_content(prompt, stream=True, request_options=request_options):
+                if cancel_event and cancel_event.is_set():
+                    raise Exception("Generation cancelled")
+                chunks.append(chunk.text)
+                parser.feed(chunk.text)
+            content = "".join(chunks).strip()
+        else:
+            response = model.generate_content(prompt, request_options=request_options)
+
+            # Get the text content of the response
+            content = response.text.strip()
 
         # Try to find JSON content within the response
         json_match = re.search(r'\{[\s\S]*\}', content)
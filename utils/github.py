@@ -1,21 +1,125 @@
 import re
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
 from urllib.parse import urlparse
 import requests
+from requests.adapters import HTTPAdapter
+from .cache import TTLCache
+from .metrics import track_stage
+from .rate_limit import RateLimitScheduler, classify_response
 from .openai_helper import generate_github_graphql_query
+from .graphql_queries import (
+    LLM_QUERY_FALLBACK,
+    QUERY_REGISTRY,
+    build_bulk_create_issue_mutation,
+    build_bulk_update_issue_mutation,
+    build_user_ids_query,
+    get_registered_query,
+    missing_schema_fields,
+    required_schema_types,
+    schema_field_names,
+)
 
-GITHUB_GRAPHQL_URL = "https://api.github.com/graphql"
+GITHUB_GRAPHQL_URL = os.environ.get("GITHUB_GRAPHQL_URL", "https://api.github.com/graphql")
+
+logger = logging.getLogger(__name__)
+
+# Connection pool and timeouts for the shared GitHub client. The pool defaults
+# to the number of threads per gunicorn worker so no thread's keep-alive
+# connection is discarded under load.
+GITHUB_POOL_SIZE = int(os.environ.get("GITHUB_POOL_SIZE", os.environ.get("GUNICORN_THREADS", 64)))
+GITHUB_CONNECT_TIMEOUT = float(os.environ.get("GITHUB_CONNECT_TIMEOUT", 5))
+GITHUB_READ_TIMEOUT = float(os.environ.get("GITHUB_READ_TIMEOUT", 30))
+GITHUB_GZIP = os.environ.get("GITHUB_GZIP", "true").lower() == "true"
+
+# Per-token pacing and retry policy. Mutations get their own, slower bucket to
+# stay under GitHub's secondary (content creation) limits.
+GITHUB_RATE_PER_SECOND = float(os.environ.get("GITHUB_RATE_PER_SECOND", 5))
+GITHUB_RATE_BURST = int(os.environ.get("GITHUB_RATE_BURST", 20))
+GITHUB_MUTATIONS_PER_MINUTE = float(os.environ.get("GITHUB_MUTATIONS_PER_MINUTE", 80))
+GITHUB_MAX_RETRIES = int(os.environ.get("GITHUB_MAX_RETRIES", 3))
+GITHUB_MAX_RETRY_WAIT = float(os.environ.get("GITHUB_MAX_RETRY_WAIT", 30))
+
+# Hidden marker appended to issue bodies so a mutation whose outcome is
+# unknown (timeout, 502) can be looked up before it is retried.
+IDEMPOTENCY_MARKERS = os.environ.get("GITHUB_IDEMPOTENCY_MARKERS", "true").lower() == "true"
+
+# Introspection results change only when GitHub ships a schema update, so they
+# are shared across tokens and optionally snapshotted to disk for warm restarts.
+SCHEMA_CACHE_TTL = int(os.environ.get("GITHUB_SCHEMA_CACHE_TTL", 24 * 60 * 60))
+SCHEMA_CACHE_PATH = os.environ.get("GITHUB_SCHEMA_CACHE_PATH")
+_schema_cache = TTLCache(ttl=SCHEMA_CACHE_TTL)
+_schema_snapshot_lock = threading.Lock()
+_schema_snapshot_loaded = False
+
+# Repository node IDs keyed by (token hash, owner, repo) so one token never
+# sees another token's private-repository lookups.
+REPO_ID_CACHE_SIZE = int(os.environ.get("GITHUB_REPO_ID_CACHE_SIZE", 1024))
+REPO_ID_CACHE_TTL = int(os.environ.get("GITHUB_REPO_ID_CACHE_TTL", 60 * 60))
+_repo_id_cache = TTLCache(maxsize=REPO_ID_CACHE_SIZE, ttl=REPO_ID_CACHE_TTL)
+
+# Token identity and per-repository access keyed by token hash. The TTL is
+# short so revoked tokens and permission changes are noticed quickly.
+TOKEN_CACHE_SIZE = int(os.environ.get("GITHUB_TOKEN_CACHE_SIZE", 4096))
+TOKEN_CACHE_TTL = int(os.environ.get("GITHUB_TOKEN_CACHE_TTL", 5 * 60))
+_token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL)
+_repo_access_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL)
+
+# Label and milestone IDs per repository (keyed like repository IDs), fetched
+# together in one query, and user IDs by login. Names given with an issue are
+# resolved from these so they can be sent in the createIssue call itself.
+REPO_METADATA_CACHE_TTL = int(os.environ.get("GITHUB_REPO_METADATA_CACHE_TTL", 10 * 60))
+USER_ID_CACHE_TTL = int(os.environ.get("GITHUB_USER_ID_CACHE_TTL", 24 * 60 * 60))
+_repo_metadata_cache = TTLCache(maxsize=REPO_ID_CACHE_SIZE, ttl=REPO_METADATA_CACHE_TTL)
+_user_id_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=USER_ID_CACHE_TTL)
+# An unknown name refetches the cached lists at most this often per repository
+REPO_METADATA_MIN_REFRESH = 60
+# Logins looked up per aliased user query
+USER_LOOKUP_BATCH = 50
+
+# Anyone who can read a repository with issues enabled may open an issue in it
+ISSUE_PERMISSIONS = {"READ", "TRIAGE", "WRITE", "MAINTAIN", "ADMIN"}
+
+# Number of aliased createIssue fields per bulk mutation document; kept small
+# so each request stays well under GitHub's query complexity limits.
+BULK_CHUNK_SIZE = int(os.environ.get("GITHUB_BULK_CHUNK_SIZE", 10))
+
+# GraphQL error types that mean a cached repository ID can no longer be used
+REPO_INVALIDATING_ERRORS = {"NOT_FOUND", "FORBIDDEN"}
+
+# Operation names from the query registry that matched the live schema;
+# None until the registry has been validated once in this process.
+_validated_queries = None
+_validation_lock = threading.Lock()
 
 def validate_github_token(token):
     """
-    Validate a GitHub token by making a test GraphQL query.
+    Validate a GitHub token, using the cached result when one is fresh.
     Returns True if the token is valid, False otherwise.
     """
-    headers = {
-        "Authorization": f"bearer {token}",
-        "Content-Type": "application/json",
-    }
-    
-    # Simple query to check if the token is valid and has the required permissions
+    try:
+        return get_token_info(token)["valid"]
+    except Exception:
+        return False
+
+def get_token_info(token):
+    """
+    Return {"valid", "login", "scopes"} for a token, cached by its fingerprint.
+    scopes lists the X-OAuth-Scopes of a classic token and is None for
+    fine-grained and app tokens, which do not report scopes. Failures to
+    reach GitHub raise rather than being cached as an invalid token.
+    """
+    key = token_fingerprint(token)
+    info = _token_cache.get(key)
+    if info is not None:
+        return info
+
+    # Simple query to check if the token is valid
     query = """
     query {
         viewer {
@@ -23,28 +127,169 @@ def validate_github_token(token):
         }
     }
     """
-    
-    try:
-        response = requests.post(
-            GITHUB_GRAPHQL_URL,
-            headers=headers,
-            json={"query": query}
-        )
-        
+    with track_stage("token_validation"):
+        response = github_client.post(token, query)
+
+    if response.status_code == 401:
+        info = {"valid": False, "login": None, "scopes": None}
+    else:
+        data = _graphql_json(response)
         if response.status_code != 200:
-            return False
-            
-        data = response.json()
-        return "data" in data and "viewer" in data["data"] and "login" in data["data"]["viewer"]
-    except Exception:
-        return False
+            raise Exception(f"GitHub returned HTTP {response.status_code}: {data.get('message', '')}")
+        login = ((data.get("data") or {}).get("viewer") or {}).get("login")
+        scopes = response.headers.get("X-OAuth-Scopes")
+        info = {
+            "valid": bool(login),
+            "login": login,
+            "scopes": None if scopes is None else [scope.strip() for scope in scopes.split(",") if scope.strip()],
+        }
+    _token_cache.set(key, info)
+    return info
 
-def get_schema_info(token, type_name=None):
-    """Get GraphQL schema information using introspection."""
-    headers = {
-        "Authorization": f"bearer {token}",
-        "Content-Type": "application/json",
+class GitHubRequestAmbiguous(Exception):
+    """A mutation failed in a way that leaves unknown whether GitHub applied it."""
+
+class GitHubClient:
+    """Keep-alive, connection-pooled client shared by every GitHub GraphQL call."""
+
+    def __init__(self, url=GITHUB_GRAPHQL_URL, pool_size=GITHUB_POOL_SIZE,
+                 connect_timeout=GITHUB_CONNECT_TIMEOUT, read_timeout=GITHUB_READ_TIMEOUT,
+                 gzip=GITHUB_GZIP, scheduler=None):
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+        self.gzip = gzip
+        self.scheduler = scheduler or RateLimitScheduler(
+            rate=GITHUB_RATE_PER_SECOND,
+            burst=GITHUB_RATE_BURST,
+            mutation_rate=GITHUB_MUTATIONS_PER_MINUTE / 60,
+            max_wait=GITHUB_MAX_RETRY_WAIT,
+            max_retries=GITHUB_MAX_RETRIES
+        )
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def headers(self, token):
+        """Return request headers for the given token."""
+        return {
+            "Authorization": f"bearer {token}",
+            "Content-Type": "application/json",
+            "Accept": "application/json",  # Explicitly request JSON response
+            "Accept-Encoding": "gzip, deflate" if self.gzip else "identity",
+        }
+
+    def post(self, token, query, variables=None, timeout=None, mutation=False, cost=1):
+        """
+        POST a GraphQL document and return the raw response.
+        Requests are paced per token. Rate-limited responses are retried after
+        the delay GitHub asks for; transient failures (5xx, timeouts, dropped
+        connections) are retried for queries but raise GitHubRequestAmbiguous
+        for mutations, so the caller can check whether the first attempt landed.
+        """
+        key = token_fingerprint(token)
+        payload = {"query": query}
+        if variables is not None:
+            payload["variables"] = variables
+
+        attempt = 0
+        while True:
+            self.scheduler.acquire(key, mutation=mutation, cost=cost)
+            response = None
+            error = None
+            try:
+                response = self.session.post(
+                    self.url,
+                    headers=self.headers(token),
+                    json=payload,
+                    timeout=timeout or self.timeout
+                )
+            except requests.exceptions.ConnectTimeout as e:
+                # Never reached GitHub, so always safe to retry
+                error, kind = e, "rate_limited"
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                error, kind = e, "transient"
+            else:
+                self.scheduler.record(key, response)
+                kind = classify_response(response)
+                if kind == "ok":
+                    return response
+
+            reason = str(error) if error else f"HTTP {response.status_code}"
+            if kind == "transient" and mutation:
+                raise GitHubRequestAmbiguous(reason)
+
+            delay = self.scheduler.backoff(attempt, response)
+            if attempt >= self.scheduler.max_retries or delay > self.scheduler.max_wait:
+                if response is not None:
+                    return response
+                raise error
+
+            logger.warning(f"GitHub request failed ({reason}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+
+    def close(self):
+        """Close pooled connections."""
+        self.session.close()
+
+github_client = GitHubClient()
+
+def _load_schema_snapshot():
+    """Populate the schema cache from the on-disk snapshot, once per process."""
+    global _schema_snapshot_loaded
+
+    with _schema_snapshot_lock:
+        if _schema_snapshot_loaded:
+            return
+        _schema_snapshot_loaded = True
+        if not SCHEMA_CACHE_PATH or not os.path.exists(SCHEMA_CACHE_PATH):
+            return
+        try:
+            with open(SCHEMA_CACHE_PATH) as f:
+                snapshot = json.load(f)
+            for key, entry in snapshot.items():
+                _schema_cache.set(key, entry["data"], stored_at=entry["fetched_at"])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable schema cache snapshot: {str(e)}")
+
+def _save_schema_snapshot():
+    """Write the live schema cache entries to the on-disk snapshot."""
+    if not SCHEMA_CACHE_PATH:
+        return
+    snapshot = {
+        key: {"data": data, "fetched_at": fetched_at}
+        for key, data, fetched_at in _schema_cache.items()
     }
+    tmp_path = f"{SCHEMA_CACHE_PATH}.tmp"
+    try:
+        with _schema_snapshot_lock:
+            with open(tmp_path, "w") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, SCHEMA_CACHE_PATH)
+    except OSError as e:
+        logger.warning(f"Could not write schema cache snapshot: {str(e)}")
+
+def invalidate_schema_cache(type_name=None):
+    """Drop one cached type (or the whole schema cache) from memory and disk."""
+    if type_name is None:
+        _schema_cache.clear()
+    else:
+        _schema_cache.pop(type_name)
+    _save_schema_snapshot()
+    reset_query_validation()
+
+def get_schema_cache_stats():
+    """Return hit/miss counters for the schema cache."""
+    return _schema_cache.stats()
+
+def get_schema_info(token, type_name=None):
+    """Get GraphQL schema information using introspection, served from cache when fresh."""
+    _load_schema_snapshot()
+    cache_key = type_name or "__schema"
+    cached = _schema_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
     if type_name:
         # Query specific type
@@ -76,6 +321,9 @@ def get_schema_info(token, type_name=None):
                         }
                     }
                 }
+                inputFields {
+                    name
+                }
             }
         }
         """
@@ -98,21 +346,56 @@ def get_schema_info(token, type_name=None):
         """
         variables = {}
 
-    response = requests.post(
-        GITHUB_GRAPHQL_URL,
-        headers=headers,
-        json={"query": query, "variables": variables}
-    )
+    with track_stage("schema_introspection", type=cache_key):
+        response = github_client.post(token, query, variables)
 
-    if response.status_code != 200:
-        raise Exception(f"Failed to fetch schema: {response.text}")
+        if response.status_code != 200:
+            raise Exception(f"Failed to fetch schema: HTTP {response.status_code}: {response.text[:200]}")
 
-    data = response.json()
-    if "errors" in data:
-        raise Exception(f"GraphQL schema error: {data['errors']}")
+        data = response.json()
+        if "errors" in data:
+            raise Exception(f"GraphQL schema error: {data['errors']}")
 
+    _schema_cache.set(cache_key, data["data"])
+    _save_schema_snapshot()
     return data["data"]
 
+def token_fingerprint(token):
+    """Return a stable hash of a token for use in cache keys, never the token itself."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def _repo_cache_key(token, owner, repo):
+    return (token_fingerprint(token), owner.lower(), repo.lower())
+
+def invalidate_repository_id(token, owner, repo):
+    """Forget the cached node ID, access check and metadata for a repository as seen by this token."""
+    key = _repo_cache_key(token, owner, repo)
+    _repo_id_cache.pop(key)
+    _repo_access_cache.pop(key)
+    _repo_metadata_cache.pop(key)
+
+def get_repo_id_cache_stats():
+    """Return hit/miss counters for the repository ID cache."""
+    return _repo_id_cache.stats()
+
+def get_token_cache_stats():
+    """Return hit/miss counters for the token and repository access caches."""
+    return {"token": _token_cache.stats(), "repo_access": _repo_access_cache.stats()}
+
+def get_metadata_cache_stats():
+    """Return hit/miss counters for the label/milestone and user ID caches."""
+    return {"repo_metadata": _repo_metadata_cache.stats(), "user_id": _user_id_cache.stats()}
+
+def _is_repo_access_error(errors):
+    """Return True if GraphQL errors indicate the repository is gone or inaccessible."""
+    for error in errors:
+        if error.get("type") in REPO_INVALIDATING_ERRORS:
+            return True
+        message = error.get("message", "").lower()
+        if "could not resolve to a node" in message or "does not have permission" in message:
+            return True
+    return False
+
 def extract_repo_info(repo_url):
     """Extract owner and repo name from GitHub URL."""
     parsed = urlparse(repo_url)
@@ -125,84 +408,622 @@ def extract_repo_info(repo_url):
 
     return path_parts[0], path_parts[1]
 
-def create_github_issue(repo_url, title, body, token):
-    """Create a GitHub issue using GraphQL API with dynamic query generation."""
+def validate_query_registry(token):
+    """
+    Check the precompiled query registry against the introspected schema.
+    Runs once per process and returns the names of the operations that passed.
+    """
+    global _validated_queries
+
+    with _validation_lock:
+        if _validated_queries is not None:
+            return _validated_queries
+
+        schema_fields = {}
+        for type_name in sorted(required_schema_types()):
+            schema_info = get_schema_info(token, type_name)
+            schema_fields[type_name] = schema_field_names(schema_info.get("__type"))
+
+        valid = set()
+        for operation_type in QUERY_REGISTRY:
+            missing = missing_schema_fields(operation_type, schema_fields)
+            if missing:
+                logger.warning(f"Registered query {operation_type} does not match schema, missing: {missing}")
+            else:
+                valid.add(operation_type)
+
+        _validated_queries = valid
+        return valid
+
+def reset_query_validation():
+    """Forget the registry validation result so it is re-checked on next use."""
+    global _validated_queries
+    with _validation_lock:
+        _validated_queries = None
+
+def get_graphql_query(operation_type, params, token):
+    """
+    Return (query, variables) for an operation, preferring the precompiled registry.
+    Falls back to LLM generation only when GITHUB_LLM_QUERY_FALLBACK is enabled.
+    """
+    with track_stage("query_generation", operation=operation_type):
+        if operation_type in validate_query_registry(token):
+            return get_registered_query(operation_type, params)
+
+        if not LLM_QUERY_FALLBACK:
+            raise Exception(f"No validated GraphQL query registered for {operation_type}")
+
+        logger.info(f"Generating GraphQL query for {operation_type} with the LLM fallback")
+        type_name = {
+            "repository_id_query": "Repository",
+            "create_issue_mutation": "CreateIssuePayload",
+        }.get(operation_type)
+        given = [name for name, value in params.items() if value is not None]
+        if type_name:
+            params = dict(params, schema_info=get_schema_info(token, type_name))
+        query, variables = generate_github_graphql_query(operation_type, params)
+        # A generated createIssue that leaves out labels, assignees or the
+        # milestone would still succeed, silently without them
+        dropped = [name for name in given if operation_type == "create_issue_mutation" and f"${name}" not in query]
+        if dropped:
+            raise Exception(f"Generated {operation_type} does not use {', '.join(dropped)}")
+        return query, variables
+
+def _clean_text(text):
+    """Replace characters that cannot be encoded as UTF-8."""
+    return text.encode('utf-8', errors='replace').decode('utf-8')
+
+def _graphql_json(response):
+    """Parse a GraphQL response body, turning error pages and data-less error responses into exceptions."""
     try:
-        owner, repo = extract_repo_info(repo_url)
+        data = response.json()
+    except ValueError:
+        raise Exception(f"GitHub returned HTTP {response.status_code}: {response.text[:200]}")
+    if response.status_code >= 400 and not (isinstance(data, dict) and ("data" in data or "errors" in data)):
+        message = data.get("message", "") if isinstance(data, dict) else ""
+        raise Exception(f"GitHub returned HTTP {response.status_code}: {message}")
+    return data
+
+def new_marker():
+    """Return a fresh hidden idempotency marker for an issue body."""
+    return f"<!-- issue-creator-request: {uuid.uuid4().hex} -->"
+
+def _with_marker(body, marker=None):
+    """Append a hidden idempotency marker to an issue body; returns (body, marker)."""
+    if not IDEMPOTENCY_MARKERS:
+        return body, None
+    marker = marker or new_marker()
+    return f"{body}\n\n{marker}", marker
 
-        # Get schema information for Repository type
-        repo_schema = get_schema_info(token, "Repository")
+def find_issues_by_markers(owner, repo, token, markers):
+    """Return {marker: result} for recently created issues whose body carries a marker."""
+    query, variables = get_graphql_query(
+        "recent_issues_query",
+        {
+            "owner": owner,
+            "name": repo,
+            "count": min(100, max(25, 2 * len(markers))),
+        },
+        token
+    )
+    data = _graphql_json(github_client.post(token, query, variables))
+    if "errors" in data:
+        raise Exception(data["errors"][0]["message"])
 
-        # Get schema information for CreateIssuePayload type
-        mutation_schema = get_schema_info(token, "CreateIssuePayload")
+    found = {}
+    for node in data["data"]["repository"]["issues"]["nodes"]:
+        for marker in markers:
+            if marker in (node.get("body") or ""):
+                found[marker] = {"success": True, "id": node["id"], "url": node["url"], "number": node["number"]}
+    return found
 
-        # First, get repository ID using schema-aware query generation
-        repo_query, repo_variables = generate_github_graphql_query(
-            "repository_id_query",
+def iter_issues_updated_since(owner, repo, token, since=None):
+    """
+    Yield pages (lists of issue dicts with number, title, body, url, state and
+    updatedAt) of every issue updated at or after `since`, oldest first.
+    """
+    after = None
+    while True:
+        query, variables = get_graphql_query(
+            "issues_since_query",
             {
                 "owner": owner,
                 "name": repo,
-                "schema_info": repo_schema
-            }
+                "since": since,
+                "after": after,
+            },
+            token
         )
+        with track_stage("issue_sync_page"):
+            data = _graphql_json(github_client.post(token, query, variables))
+        if "errors" in data:
+            raise Exception(data["errors"][0]["message"])
 
-        headers = {
-            "Authorization": f"bearer {token}",
-            "Content-Type": "application/json",
-            "Accept": "application/json",  # Explicitly request JSON response
-        }
+        connection = data["data"]["repository"]["issues"]
+        yield connection["nodes"]
+        if not connection["pageInfo"]["hasNextPage"]:
+            return
+        after = connection["pageInfo"]["endCursor"]
 
-        # Get repository ID
-        repo_response = requests.post(
-            GITHUB_GRAPHQL_URL,
-            headers=headers,
-            json={
-                "query": repo_query,
-                "variables": repo_variables
-            }
-        )
+def get_repository_id(owner, repo, token):
+    """Return the repository node ID, using the per-token LRU cache when warm."""
+    cache_key = _repo_cache_key(token, owner, repo)
+    repository_id = _repo_id_cache.get(cache_key)
+    if repository_id is not None:
+        return repository_id
 
-        repo_data = repo_response.json()
+    repo_query, repo_variables = get_graphql_query(
+        "repository_id_query",
+        {
+            "owner": owner,
+            "name": repo,
+        },
+        token
+    )
+
+    # Get repository ID
+    with track_stage("repo_id_lookup"):
+        repo_response = github_client.post(token, repo_query, repo_variables)
+
+        repo_data = _graphql_json(repo_response)
         if "errors" in repo_data:
             raise Exception(repo_data["errors"][0]["message"])
 
-        repository_id = repo_data["data"]["repository"]["id"]
+    repository_id = repo_data["data"]["repository"]["id"]
+    _repo_id_cache.set(cache_key, repository_id)
+    return repository_id
+
+def get_repository_access(owner, repo, token):
+    """
+    Return {"found", "permission", "has_issues", "is_private"} for a repository
+    as seen by this token, cached per token hash. Also warms the repository ID cache.
+    """
+    cache_key = _repo_cache_key(token, owner, repo)
+    access = _repo_access_cache.get(cache_key)
+    if access is not None:
+        return access
+
+    query, variables = get_graphql_query("repository_access_query", {"owner": owner, "name": repo}, token)
+    with track_stage("repo_access_check"):
+        data = _graphql_json(github_client.post(token, query, variables))
+
+    repository = (data.get("data") or {}).get("repository")
+    if repository:
+        access = {
+            "found": True,
+            "permission": repository.get("viewerPermission"),
+            "has_issues": repository.get("hasIssuesEnabled", True),
+            "is_private": repository.get("isPrivate", False),
+        }
+        _repo_id_cache.set(cache_key, repository["id"])
+    elif _is_repo_access_error(data.get("errors") or []):
+        access = {"found": False, "permission": None, "has_issues": False, "is_private": None}
+    else:
+        errors = data.get("errors") or [{"message": data.get("message", "No repository returned")}]
+        raise Exception(errors[0]["message"])
+
+    _repo_access_cache.set(cache_key, access)
+    return access
+
+def get_repository_metadata(owner, repo, token, refresh=False):
+    """
+    Return {"labels": {name: id}, "label_names", "milestones": {title: {"id",
+    "number"}}, "fetched_at"} for a repository, keyed by lowercased name, with
+    labels and open milestones paged through together in one query. Cached per
+    token hash; also warms the repository ID cache.
+    """
+    cache_key = _repo_cache_key(token, owner, repo)
+    if not refresh:
+        metadata = _repo_metadata_cache.get(cache_key)
+        if metadata is not None:
+            return metadata
+
+    metadata = {"labels": {}, "label_names": [], "milestones": {}, "fetched_at": time.time()}
+    cursors = {"labelsAfter": None, "milestonesAfter": None}
+    while True:
+        query, variables = get_graphql_query(
+            "repository_metadata_query",
+            dict(cursors, owner=owner, name=repo),
+            token
+        )
+        with track_stage("repo_metadata_lookup"):
+            data = _graphql_json(github_client.post(token, query, variables))
+        if "errors" in data:
+            if _is_repo_access_error(data["errors"]):
+                invalidate_repository_id(token, owner, repo)
+            raise Exception(data["errors"][0]["message"])
+
+        repository = data["data"]["repository"]
+        for label in repository["labels"]["nodes"]:
+            if label["name"].lower() not in metadata["labels"]:
+                metadata["label_names"].append(label["name"])
+            metadata["labels"][label["name"].lower()] = label["id"]
+        for milestone in repository["milestones"]["nodes"]:
+            metadata["milestones"][milestone["title"].lower()] = {"id": milestone["id"], "number": milestone["number"]}
+
+        # A connection that is already complete is re-read from its last
+        # cursor, which returns its final page again; names are deduplicated
+        more = False
+        for field, cursor in (("labels", "labelsAfter"), ("milestones", "milestonesAfter")):
+            page_info = repository[field]["pageInfo"]
+            if page_info["hasNextPage"]:
+                cursors[cursor] = page_info["endCursor"]
+                more = True
+        if not more:
+            break
+
+    _repo_id_cache.set(cache_key, repository["id"])
+    _repo_metadata_cache.set(cache_key, metadata)
+    return metadata
+
+def get_label_names(owner, repo, token):
+    """Return the names of a repository's labels from the metadata cache."""
+    return list(get_repository_metadata(owner, repo, token)["label_names"])
+
+def get_user_ids(logins, token):
+    """
+    Return {login: node ID, or None for unknown users}. Uncached logins are
+    looked up together in aliased queries of up to USER_LOOKUP_BATCH users.
+    """
+    ids = {}
+    missing = []
+    for login in dict.fromkeys(logins):
+        user_id = _user_id_cache.get(login.lower())
+        if user_id is None:
+            missing.append(login)
+        else:
+            ids[login] = user_id
+    if not missing:
+        return ids
+
+    if "user_id_query" not in validate_query_registry(token):
+        raise Exception("No validated GraphQL query registered for user_id_query")
+    for start in range(0, len(missing), USER_LOOKUP_BATCH):
+        batch = missing[start:start + USER_LOOKUP_BATCH]
+        variables = {f"login{i}": login for i, login in enumerate(batch)}
+        with track_stage("user_id_lookup"):
+            data = _graphql_json(github_client.post(token, build_user_ids_query(len(batch)), variables))
+        # Unknown logins come back as null fields with NOT_FOUND errors
+        payload = data.get("data")
+        if payload is None:
+            errors = data.get("errors") or [{"message": data.get("message", "No data returned")}]
+            raise Exception(errors[0]["message"])
+        for i, login in enumerate(batch):
+            user = payload.get(f"user{i}")
+            ids[login] = user["id"] if user else None
+            if user:
+                _user_id_cache.set(login.lower(), user["id"])
+    return ids
+
+def parse_issue_fields(data):
+    """
+    Read optional "labels", "assignees" and "milestone" names from a request
+    or import record; lists or comma-separated strings. Empty values are dropped.
+    """
+    def names(value):
+        if isinstance(value, str):
+            value = value.split(",")
+        return [str(name).strip() for name in value or [] if str(name).strip()]
+
+    fields = {
+        "labels": names(data.get("labels")),
+        "assignees": names(data.get("assignees")),
+        "milestone": str(data.get("milestone") or "").strip() or None,
+    }
+    return {key: value for key, value in fields.items() if value}
+
+def _match_metadata(metadata, labels, milestone):
+    """Look names up in repository metadata; returns (label IDs, milestone ID, names not found)."""
+    label_ids = []
+    missing = []
+    for label in labels:
+        label_id = metadata["labels"].get(label.lower())
+        if label_id is None:
+            missing.append(f"label '{label}'")
+        elif label_id not in label_ids:
+            label_ids.append(label_id)
+
+    milestone_id = None
+    if milestone:
+        wanted = str(milestone).lstrip("#").lower()
+        for title, info in metadata["milestones"].items():
+            if title == wanted or str(info["number"]) == wanted:
+                milestone_id = info["id"]
+                break
+        else:
+            missing.append(f"milestone '{milestone}'")
+    return label_ids, milestone_id, missing
+
+def resolve_issue_fields(owner, repo, token, labels=None, assignees=None, milestone=None):
+    """
+    Resolve label names, assignee logins and a milestone title (or number) to
+    the node IDs createIssue takes. Returns {"labelIds", "assigneeIds",
+    "milestoneId"} with None for anything not given; raises ValueError naming
+    whatever does not exist. Warm caches make this free of API calls.
+    """
+    fields = {"labelIds": None, "assigneeIds": None, "milestoneId": None}
+    labels = [label for label in labels or [] if label]
+    assignees = [login.lstrip("@") for login in assignees or [] if login]
+    missing = []
+
+    if labels or milestone:
+        metadata = get_repository_metadata(owner, repo, token)
+        label_ids, milestone_id, not_found = _match_metadata(metadata, labels, milestone)
+        if not_found and time.time() - metadata["fetched_at"] >= REPO_METADATA_MIN_REFRESH:
+            # The cached lists may predate a label or milestone created since
+            metadata = get_repository_metadata(owner, repo, token, refresh=True)
+            label_ids, milestone_id, not_found = _match_metadata(metadata, labels, milestone)
+        missing.extend(not_found)
+        fields["labelIds"] = label_ids or None
+        fields["milestoneId"] = milestone_id
+
+    if assignees:
+        user_ids = get_user_ids(assignees, token)
+        missing.extend(f"user '{login}'" for login in assignees if not user_ids.get(login))
+        fields["assigneeIds"] = list(dict.fromkeys(user_ids[login] for login in assignees if user_ids.get(login))) or None
+
+    if missing:
+        raise ValueError(f"Not found in {owner}/{repo}: {', '.join(missing)}")
+    return fields
+
+def check_issue_access(repo_url, token):
+    """
+    Return None if the token can open issues in the repository, otherwise the
+    reason it cannot. Answers from cache when possible, so it is cheap enough
+    to run before formatting an issue with the LLM.
+    """
+    owner, repo = extract_repo_info(repo_url)
+    info = get_token_info(token)
+    if not info["valid"]:
+        return "Invalid GitHub token"
+
+    access = get_repository_access(owner, repo, token)
+    if not access["found"]:
+        return f"Repository {owner}/{repo} was not found or is not accessible with this token"
+    if access["permission"] not in ISSUE_PERMISSIONS:
+        return f"Token for {info['login']} has no access to {owner}/{repo}"
+    if not access["has_issues"]:
+        return f"Issues are disabled for {owner}/{repo}"
+
+    # Classic tokens also need an OAuth scope covering the repository
+    if info["scopes"] is not None:
+        needed = "repo" if access["is_private"] else "public_repo"
+        if "repo" not in info["scopes"] and needed not in info["scopes"]:
+            return f"Token is missing the {needed} scope"
+    return None
+
+def create_github_issue(repo_url, title, body, token, progress=None, marker=None,
+                        labels=None, assignees=None, milestone=None):
+    """
+    Create a GitHub issue using GraphQL API with precompiled queries.
+    progress, if given, is called with the name of each stage as it starts.
+    marker reuses a previously issued idempotency marker (see new_marker).
+    labels, assignees and milestone are names, set by the same mutation.
+    """
+    def report(step):
+        if progress:
+            progress(step)
+
+    try:
+        owner, repo = extract_repo_info(repo_url)
+
+        # Validating the query registry is the only slow part of query
+        # generation (schema introspection on a cold cache)
+        report('generating_query')
+        validate_query_registry(token)
+
+        report('fetching_repo')
+        repository_id = get_repository_id(owner, repo, token)
+        fields = resolve_issue_fields(owner, repo, token, labels, assignees, milestone)
 
         # Clean the title and body to remove problematic Unicode characters
-        title = title.encode('utf-8', errors='replace').decode('utf-8')
-        body = body.encode('utf-8', errors='replace').decode('utf-8')
+        title = _clean_text(title)
+        body, marker = _with_marker(_clean_text(body), marker)
 
-        # Generate the create issue mutation query with schema awareness
-        create_query, create_variables = generate_github_graphql_query(
+        create_query, create_variables = get_graphql_query(
             "create_issue_mutation",
             {
                 "repositoryId": repository_id,
                 "title": title,
                 "body": body,
-                "schema_info": mutation_schema
-            }
+                **fields,
+            },
+            token
         )
 
-        # Create the issue
-        response = requests.post(
-            GITHUB_GRAPHQL_URL,
-            headers=headers,
-            json={
-                "query": create_query,
-                "variables": create_variables
-            }
-        )
+        # Create the issue. If the outcome of an attempt is unknown, look for
+        # its marker before trying again so the issue is never created twice.
+        report('submitting_issue')
+        attempt = 0
+        while True:
+            try:
+                with track_stage("create_issue_mutation"):
+                    response = github_client.post(token, create_query, create_variables, mutation=True)
+                    data = _graphql_json(response)
+                break
+            except GitHubRequestAmbiguous as e:
+                if not marker or attempt >= github_client.scheduler.max_retries:
+                    raise
+                existing = find_issues_by_markers(owner, repo, token, [marker]).get(marker)
+                if existing:
+                    return existing
+                delay = github_client.scheduler.backoff(attempt)
+                logger.warning(f"createIssue outcome unknown ({str(e)}), not found on GitHub; retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
 
-        data = response.json()
         if "errors" in data:
+            if _is_repo_access_error(data["errors"]):
+                invalidate_repository_id(token, owner, repo)
             raise Exception(data["errors"][0]["message"])
 
         issue_data = data["data"]["createIssue"]["issue"]
         return {
             "success": True,
+            # Queries generated by the LLM fallback may not select the node ID
+            "id": issue_data.get("id"),
             "url": issue_data["url"],
             "number": issue_data["number"]
         }
 
     except Exception as e:
-        raise Exception(f"Failed to create GitHub issue: {str(e)}")
\ No newline at end of file
+        raise Exception(f"Failed to create GitHub issue: {str(e)}")
+
+def _create_issue_chunk(owner, repo, repository_id, token, chunk, attempt=0):
+    """
+    Submit one aliased createIssue document for `chunk`, a list of
+    (title, body, marker, fields) tuples with fields as returned by
+    resolve_issue_fields. Returns one result per item. When the outcome is
+    unknown, items already on GitHub are matched by marker and only the rest
+    are resubmitted.
+    """
+    variables = {"repositoryId": repository_id}
+    for i, (title, body, _, fields) in enumerate(chunk):
+        variables[f"title{i}"] = title
+        variables[f"body{i}"] = body
+        for name, value in fields.items():
+            variables[f"{name}{i}"] = value
+
+    try:
+        with track_stage("bulk_create_mutation"):
+            response = github_client.post(
+                token,
+                build_bulk_create_issue_mutation(len(chunk)),
+                variables,
+                mutation=True,
+                cost=len(chunk)
+            )
+            data = _graphql_json(response)
+    except GitHubRequestAmbiguous as e:
+        markers = [marker for _, _, marker, _ in chunk if marker]
+        if len(markers) != len(chunk) or attempt >= github_client.scheduler.max_retries:
+            return [{"success": False, "error": f"Failed to create GitHub issue: {str(e)}"} for _ in chunk]
+        try:
+            found = find_issues_by_markers(owner, repo, token, markers)
+        except Exception as lookup_error:
+            return [{"success": False, "error": f"Failed to create GitHub issue: {str(lookup_error)}"} for _ in chunk]
+        remaining = [item for item in chunk if item[2] not in found]
+        if remaining:
+            time.sleep(github_client.scheduler.backoff(attempt))
+            retried = iter(_create_issue_chunk(owner, repo, repository_id, token, remaining, attempt + 1))
+        return [found[item[2]] if item[2] in found else next(retried) for item in chunk]
+    except Exception as e:
+        return [{"success": False, "error": f"Failed to create GitHub issue: {str(e)}"} for _ in chunk]
+
+    errors_by_alias = {}
+    for error in data.get("errors") or []:
+        path = error.get("path") or [None]
+        errors_by_alias.setdefault(path[0], error)
+    if errors_by_alias and _is_repo_access_error(errors_by_alias.values()):
+        invalidate_repository_id(token, owner, repo)
+
+    results = []
+    payload = data.get("data") or {}
+    for i in range(len(chunk)):
+        alias = f"issue{i}"
+        created = payload.get(alias)
+        if created and created.get("issue"):
+            results.append({
+                "success": True,
+                "id": created["issue"]["id"],
+                "url": created["issue"]["url"],
+                "number": created["issue"]["number"]
+            })
+        else:
+            error = errors_by_alias.get(alias) or errors_by_alias.get(None) or {"message": "No result returned"}
+            results.append({"success": False, "error": f"Failed to create GitHub issue: {error['message']}"})
+    return results
+
+def create_github_issues(repo_url, issues, token):
+    """
+    Create several issues in one repository using aliased createIssue mutations.
+    `issues` is a list of {"title", "body"} dicts, optionally with a "marker"
+    from new_marker() so a later retry can find it and "labels", "assignees"
+    and "milestone" names as for create_github_issue; returns one result per item,
+    in order, each either {"success": True, "id", "url", "number"} or
+    {"success": False, "error"}. Failures of individual items do not abort the batch.
+    """
+    try:
+        owner, repo = extract_repo_info(repo_url)
+        repository_id = get_repository_id(owner, repo, token)
+    except Exception as e:
+        error = f"Failed to create GitHub issue: {str(e)}"
+        return [{"success": False, "error": error} for _ in issues]
+
+    # Without a validated registry entry the aliased document cannot be trusted,
+    # so fall back to one (possibly LLM-generated) mutation per issue.
+    if "create_issue_mutation" not in validate_query_registry(token):
+        results = []
+        for issue in issues:
+            try:
+                results.append(create_github_issue(
+                    repo_url, issue["title"], issue["body"], token, marker=issue.get("marker"),
+                    labels=issue.get("labels"), assignees=issue.get("assignees"), milestone=issue.get("milestone")
+                ))
+            except Exception as e:
+                results.append({"success": False, "error": str(e)})
+        return results
+
+    # One lookup covers every assignee in the batch; the repository's labels
+    # and milestones are fetched once by the first item that needs them
+    logins = [login.lstrip("@") for issue in issues for login in issue.get("assignees") or [] if login]
+    if logins:
+        try:
+            get_user_ids(logins, token)
+        except Exception as e:
+            logger.warning(f"Batched assignee lookup failed: {str(e)}")
+
+    results = [None] * len(issues)
+    prepared = []
+    for index, issue in enumerate(issues):
+        try:
+            fields = resolve_issue_fields(
+                owner, repo, token, issue.get("labels"), issue.get("assignees"), issue.get("milestone")
+            )
+        except Exception as e:
+            results[index] = {"success": False, "error": f"Failed to create GitHub issue: {str(e)}"}
+            continue
+        body, marker = _with_marker(_clean_text(issue["body"]), issue.get("marker"))
+        prepared.append((index, (_clean_text(issue["title"]), body, marker, fields)))
+
+    for start in range(0, len(prepared), BULK_CHUNK_SIZE):
+        chunk = prepared[start:start + BULK_CHUNK_SIZE]
+        chunk_results = _create_issue_chunk(owner, repo, repository_id, token, [item for _, item in chunk])
+        for (index, _), result in zip(chunk, chunk_results):
+            results[index] = result
+    return results
+
+def link_related_issues(issues, token):
+    """
+    Add an "Also filed in" list naming the others to the body of each issue,
+    in one aliased updateIssue document. `issues` are dicts with "id",
+    "repo" ("owner/name"), "number" and the "body" and "marker" the issue
+    was created with. Editing a body to the same text is harmless, so an
+    attempt with an unknown outcome is simply repeated.
+    """
+    if len(issues) < 2:
+        return
+    if "update_issue_mutation" not in validate_query_registry(token):
+        raise Exception("No validated GraphQL query registered for update_issue_mutation")
+
+    variables = {}
+    for i, issue in enumerate(issues):
+        others = "\n".join(f"- {other['repo']}#{other['number']}" for other in issues if other is not issue)
+        body, _ = _with_marker(_clean_text(f"{issue['body']}\n\n---\nAlso filed in:\n{others}"), issue.get("marker"))
+        variables[f"id{i}"] = issue["id"]
+        variables[f"body{i}"] = body
+
+    mutation = build_bulk_update_issue_mutation(len(issues))
+    attempt = 0
+    while True:
+        try:
+            with track_stage("cross_link_mutation"):
+                data = _graphql_json(github_client.post(token, mutation, variables, mutation=True, cost=len(issues)))
+            break
+        except GitHubRequestAmbiguous:
+            if attempt >= github_client.scheduler.max_retries:
+                raise
+            time.sleep(github_client.scheduler.backoff(attempt))
+            attempt += 1
+    if data.get("errors"):
+        raise Exception(data["errors"][0]["message"])
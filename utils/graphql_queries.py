@@ -0,0 +1,285 @@
+import os
+
+# Set to "true" to let GPT-4o generate queries for operations that are not
+# registered below (or that failed schema validation).
+LLM_QUERY_FALLBACK = os.environ.get("GITHUB_LLM_QUERY_FALLBACK", "false").lower() == "true"
+
+# Precompiled GraphQL operations. Each entry lists the schema fields it relies
+# on so the whole registry can be checked against GitHub's introspected schema
+# once, instead of asking the LLM to regenerate the same text on every issue.
+QUERY_REGISTRY = {
+    "repository_id_query": {
+        "query": """
+query GetRepositoryId($owner: String!, $name: String!) {
+    repository(owner: $owner, name: $name) {
+        id
+    }
+}
+""".strip(),
+        "variables": ["owner", "name"],
+        "requires": {
+            "Query": ["repository"],
+            "Repository": ["id"],
+        },
+    },
+    "repository_access_query": {
+        "query": """
+query GetRepositoryAccess($owner: String!, $name: String!) {
+    repository(owner: $owner, name: $name) {
+        id
+        viewerPermission
+        hasIssuesEnabled
+        isPrivate
+    }
+}
+""".strip(),
+        "variables": ["owner", "name"],
+        "requires": {
+            "Query": ["repository"],
+            "Repository": ["id", "viewerPermission", "hasIssuesEnabled", "isPrivate"],
+        },
+    },
+    "create_issue_mutation": {
+        "query": """
+mutation CreateIssue($repositoryId: ID!, $title: String!, $body: String!, $labelIds: [ID!], $assigneeIds: [ID!], $milestoneId: ID) {
+    createIssue(input: {
+        repositoryId: $repositoryId
+        title: $title
+        body: $body
+        labelIds: $labelIds
+        assigneeIds: $assigneeIds
+        milestoneId: $milestoneId
+    }) {
+        issue {
+            id
+            url
+            number
+        }
+    }
+}
+""".strip(),
+        "variables": ["repositoryId", "title", "body", "labelIds", "assigneeIds", "milestoneId"],
+        "requires": {
+            "Mutation": ["createIssue"],
+            "CreateIssueInput": ["repositoryId", "title", "body", "labelIds", "assigneeIds", "milestoneId"],
+            "CreateIssuePayload": ["issue"],
+            "Issue": ["id", "url", "number"],
+        },
+    },
+    "update_issue_mutation": {
+        "query": """
+mutation UpdateIssue($id: ID!, $body: String!) {
+    updateIssue(input: {
+        id: $id
+        body: $body
+    }) {
+        issue {
+            url
+        }
+    }
+}
+""".strip(),
+        "variables": ["id", "body"],
+        "requires": {
+            "Mutation": ["updateIssue"],
+            "UpdateIssueInput": ["id", "body"],
+            "UpdateIssuePayload": ["issue"],
+            "Issue": ["url"],
+        },
+    },
+    "repository_metadata_query": {
+        "query": """
+query RepositoryMetadata($owner: String!, $name: String!, $labelsAfter: String, $milestonesAfter: String) {
+    repository(owner: $owner, name: $name) {
+        id
+        labels(first: 100, after: $labelsAfter) {
+            pageInfo {
+                hasNextPage
+                endCursor
+            }
+            nodes {
+                id
+                name
+            }
+        }
+        milestones(first: 100, after: $milestonesAfter, states: [OPEN]) {
+            pageInfo {
+                hasNextPage
+                endCursor
+            }
+            nodes {
+                id
+                number
+                title
+            }
+        }
+    }
+}
+""".strip(),
+        "variables": ["owner", "name", "labelsAfter", "milestonesAfter"],
+        "requires": {
+            "Query": ["repository"],
+            "Repository": ["id", "labels", "milestones"],
+            "LabelConnection": ["pageInfo", "nodes"],
+            "MilestoneConnection": ["pageInfo", "nodes"],
+            "PageInfo": ["hasNextPage", "endCursor"],
+            "Label": ["id", "name"],
+            "Milestone": ["id", "number", "title"],
+        },
+    },
+    "user_id_query": {
+        "query": """
+query GetUserId($login: String!) {
+    user(login: $login) {
+        id
+    }
+}
+""".strip(),
+        "variables": ["login"],
+        "requires": {
+            "Query": ["user"],
+            "User": ["id"],
+        },
+    },
+    "recent_issues_query": {
+        "query": """
+query RecentIssues($owner: String!, $name: String!, $count: Int!) {
+    repository(owner: $owner, name: $name) {
+        issues(first: $count, orderBy: {field: CREATED_AT, direction: DESC}) {
+            nodes {
+                id
+                url
+                number
+                body
+            }
+        }
+    }
+}
+""".strip(),
+        "variables": ["owner", "name", "count"],
+        "requires": {
+            "Query": ["repository"],
+            "Repository": ["issues"],
+            "Issue": ["id", "url", "number", "body"],
+        },
+    },
+    "issues_since_query": {
+        "query": """
+query IssuesSince($owner: String!, $name: String!, $since: DateTime, $after: String) {
+    repository(owner: $owner, name: $name) {
+        issues(first: 100, after: $after, filterBy: {since: $since}, orderBy: {field: UPDATED_AT, direction: ASC}) {
+            pageInfo {
+                hasNextPage
+                endCursor
+            }
+            nodes {
+                number
+                title
+                body
+                url
+                state
+                updatedAt
+            }
+        }
+    }
+}
+""".strip(),
+        "variables": ["owner", "name", "since", "after"],
+        "requires": {
+            "Query": ["repository"],
+            "Repository": ["issues"],
+            "IssueFilters": ["since"],
+            "IssueConnection": ["pageInfo", "nodes"],
+            "PageInfo": ["hasNextPage", "endCursor"],
+            "Issue": ["number", "title", "body", "url", "state", "updatedAt"],
+        },
+    },
+}
+
+def required_schema_types():
+    """Return the schema type names referenced by the registry."""
+    type_names = set()
+    for operation in QUERY_REGISTRY.values():
+        type_names.update(operation["requires"])
+    return type_names
+
+def schema_field_names(type_info):
+    """Return the field and input field names declared on an introspected type."""
+    if not type_info:
+        return set()
+    names = {field["name"] for field in type_info.get("fields") or []}
+    names.update(field["name"] for field in type_info.get("inputFields") or [])
+    return names
+
+def missing_schema_fields(operation_type, schema_fields):
+    """List the required `Type.field` names absent from the given schema map."""
+    operation = QUERY_REGISTRY[operation_type]
+    return [
+        f"{type_name}.{field}"
+        for type_name, fields in operation["requires"].items()
+        for field in fields
+        if field not in schema_fields.get(type_name, set())
+    ]
+
+def get_registered_query(operation_type, params):
+    """Return the (query, variables) pair for a registered operation."""
+    operation = QUERY_REGISTRY[operation_type]
+    missing = [name for name in operation["variables"] if name not in params]
+    if missing:
+        raise ValueError(f"Missing variables for {operation_type}: {missing}")
+    variables = {name: params[name] for name in operation["variables"]}
+    return operation["query"], variables
+
+def build_bulk_create_issue_mutation(count):
+    """
+    Build one mutation document that creates `count` issues in a repository.
+    Each createIssue field is aliased issue0..issueN so results and errors can
+    be mapped back to their position in the batch.
+    """
+    definitions = ", ".join(
+        f"$title{i}: String!, $body{i}: String!, $labelIds{i}: [ID!], $assigneeIds{i}: [ID!], $milestoneId{i}: ID"
+        for i in range(count)
+    )
+    fields = "\n".join(
+        f"""    issue{i}: createIssue(input: {{
+        repositoryId: $repositoryId
+        title: $title{i}
+        body: $body{i}
+        labelIds: $labelIds{i}
+        assigneeIds: $assigneeIds{i}
+        milestoneId: $milestoneId{i}
+    }}) {{
+        issue {{
+            id
+            url
+            number
+        }}
+    }}"""
+        for i in range(count)
+    )
+    return f"mutation CreateIssues($repositoryId: ID!, {definitions}) {{\n{fields}\n}}"
+
+def build_user_ids_query(count):
+    """
+    Build one query that looks up the node IDs of `count` users by login,
+    aliased user0..userN like the bulk createIssue mutation.
+    """
+    definitions = ", ".join(f"$login{i}: String!" for i in range(count))
+    fields = "\n".join(f"    user{i}: user(login: $login{i}) {{\n        id\n    }}" for i in range(count))
+    return f"query GetUserIds({definitions}) {{\n{fields}\n}}"
+
+def build_bulk_update_issue_mutation(count):
+    """Build one mutation document that replaces the bodies of `count` issues, aliased link0..linkN."""
+    definitions = ", ".join(f"$id{i}: ID!, $body{i}: String!" for i in range(count))
+    fields = "\n".join(
+        f"""    link{i}: updateIssue(input: {{
+        id: $id{i}
+        body: $body{i}
+    }}) {{
+        issue {{
+            url
+        }}
+    }}"""
+        for i in range(count)
+    )
+    return f"mutation UpdateIssues({definitions}) {{\n{fields}\n}}"
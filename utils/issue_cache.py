@@ -0,0 +1,106 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from .cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Processed issues keyed by a hash of their inputs. The memory tier is an LRU;
+# the optional disk tier survives restarts and is trimmed to a byte budget.
+ISSUE_CACHE_SIZE = int(os.environ.get("ISSUE_CACHE_SIZE", 512))
+ISSUE_CACHE_TTL = int(os.environ.get("ISSUE_CACHE_TTL", 24 * 60 * 60))
+ISSUE_CACHE_DIR = os.environ.get("ISSUE_CACHE_DIR")
+ISSUE_CACHE_MAX_BYTES = int(os.environ.get("ISSUE_CACHE_MAX_BYTES", 50 * 1024 * 1024))
+
+_memory_cache = TTLCache(maxsize=ISSUE_CACHE_SIZE, ttl=ISSUE_CACHE_TTL)
+_disk_lock = threading.Lock()
+_disk_hits = 0
+
+def issue_cache_key(description, code_context, model_name, prompt_version, label_options=None):
+    """Return the content address for a formatting request."""
+    parts = [description, code_context or "", model_name, prompt_version]
+    if label_options:
+        parts.append(sorted(label_options))
+    payload = json.dumps(parts)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _disk_path(key):
+    return os.path.join(ISSUE_CACHE_DIR, f"{key}.json")
+
+def _read_disk(key):
+    if not ISSUE_CACHE_DIR:
+        return None
+    path = _disk_path(key)
+    try:
+        with open(path) as f:
+            result = json.load(f)
+        os.utime(path)  # mark as recently used for eviction
+        return result
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable issue cache entry {key}: {str(e)}")
+        return None
+
+def _write_disk(key, result):
+    if not ISSUE_CACHE_DIR:
+        return
+    try:
+        with _disk_lock:
+            os.makedirs(ISSUE_CACHE_DIR, exist_ok=True)
+            tmp_path = f"{_disk_path(key)}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(result, f)
+            os.replace(tmp_path, _disk_path(key))
+            _evict_disk()
+    except OSError as e:
+        logger.warning(f"Could not write issue cache entry: {str(e)}")
+
+def _evict_disk():
+    """Delete least recently used files until the disk tier fits its byte budget."""
+    entries = []
+    total = 0
+    for entry in os.scandir(ISSUE_CACHE_DIR):
+        if entry.is_file() and entry.name.endswith(".json"):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+    for _, size, path in sorted(entries):
+        if total <= ISSUE_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+def get_cached_issue(key):
+    """Return a cached {"title", "body"} for key, or None."""
+    global _disk_hits
+
+    result = _memory_cache.get(key)
+    if result is not None:
+        return dict(result)
+    result = _read_disk(key)
+    if result is not None:
+        with _disk_lock:
+            _disk_hits += 1
+        _memory_cache.set(key, result)
+        return dict(result)
+    return None
+
+def store_issue(key, result):
+    """Store a processed issue in both tiers."""
+    _memory_cache.set(key, dict(result))
+    _write_disk(key, result)
+
+def get_issue_cache_stats():
+    """Return hit counters for the processed-issue cache."""
+    stats = _memory_cache.stats()
+    lookups = stats["hits"] + stats["misses"]
+    stats["disk_hits"] = _disk_hits
+    stats["misses"] -= _disk_hits
+    stats["hit_rate"] = (stats["hits"] + _disk_hits) / lookups if lookups else 0.0
+    return stats
@@ -0,0 +1,115 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while the queue is at its maximum depth."""
+
+class JobRunner:
+    """
+    Bounded background worker pool for long-running pipelines.
+    At most `max_workers` jobs run at once and at most `max_queue` more wait;
+    finished jobs are kept for `result_ttl` seconds so clients can poll them.
+    With a `store` (anything with save_job/get_job, such as a progress
+    backend) job records are also written there, so other workers can read
+    jobs this one runs.
+    """
+
+    def __init__(self, max_workers=4, max_queue=100, result_ttl=15 * 60, store=None):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.result_ttl = result_ttl
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, job_id=None, **kwargs):
+        """Queue fn(*args, **kwargs) and return the job ID, or raise JobQueueFull."""
+        job_id = job_id or uuid.uuid4().hex
+        with self._lock:
+            self._cleanup_locked()
+            if self._pending >= self.max_workers + self.max_queue:
+                raise JobQueueFull("Job queue is full, try again later")
+            self._pending += 1
+            self._jobs[job_id] = {
+                "id": job_id,
+                "status": "queued",
+                "result": None,
+                "error": None,
+                "created_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+            }
+            job = dict(self._jobs[job_id])
+        self._save(job)
+        self._executor.submit(self._run, job_id, fn, args, kwargs)
+        return job_id
+
+    def _run(self, job_id, fn, args, kwargs):
+        self._update(job_id, status="running", started_at=time.time())
+        try:
+            fields = {"status": "succeeded", "result": fn(*args, **kwargs)}
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {str(e)}")
+            fields = {"status": "failed", "error": str(e)}
+        fields["finished_at"] = time.time()
+        with self._lock:
+            self._pending -= 1
+        self._update(job_id, **fields)
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            if job_id not in self._jobs:
+                return
+            self._jobs[job_id].update(fields)
+            job = dict(self._jobs[job_id])
+        self._save(job)
+
+    def _save(self, job):
+        if self.store is None:
+            return
+        try:
+            self.store.save_job(job)
+        except Exception as e:
+            logger.warning(f"Could not store job {job['id']}: {str(e)}")
+
+    def _cleanup_locked(self):
+        cutoff = time.time() - self.result_ttl
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["finished_at"] is not None and job["finished_at"] < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        """Return a copy of the job record, or None if unknown or expired."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                return dict(job)
+        if self.store is None:
+            return None
+        # Submitted to, or run by, another worker
+        try:
+            return self.store.get_job(job_id)
+        except Exception as e:
+            logger.warning(f"Could not read job {job_id}: {str(e)}")
+            return None
+
+    def stats(self):
+        """Return the number of queued, running and retained jobs."""
+        with self._lock:
+            statuses = [job["status"] for job in self._jobs.values()]
+            return {
+                "queued": statuses.count("queued"),
+                "running": statuses.count("running"),
+                "retained": len(statuses),
+                "capacity": self.max_workers + self.max_queue,
+            }
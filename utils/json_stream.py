@@ -0,0 +1,126 @@
+ESCAPES = {
+    '"': '"',
+    '\\': '\\',
+    '/': '/',
+    'b': '\b',
+    'f': '\f',
+    'n': '\n',
+    'r': '\r',
+    't': '\t',
+}
+
+class IssueStreamParser:
+    """
+    Incremental parser for a streamed {"title": ..., "body": ...} JSON object.
+    Text can be fed in arbitrary chunks (including leading prose or code fences);
+    `on_title(title)` fires once the title string is complete and
+    `on_body(text)` fires with each newly decoded piece of the body. The parser
+    only drives progress updates, the complete response is still validated
+    with json.loads afterwards.
+    """
+
+    def __init__(self, on_title=None, on_body=None):
+        self.on_title = on_title
+        self.on_body = on_body
+        self.state = "start"
+        self.key = None
+        self.chars = []
+        self.escape = None
+        self.depth = 0
+        self.title = None
+        self.body_emitted = 0
+
+    def feed(self, text):
+        """Consume the next chunk of model output."""
+        for char in text:
+            self._step(char)
+        if self.state == "value" and self.key == "body":
+            self._emit_body()
+
+    def _emit_body(self, final=False):
+        end = len(self.chars)
+        if not final and end and 0xD800 <= ord(self.chars[-1]) <= 0xDBFF:
+            end -= 1  # wait for the low half of a surrogate pair
+        pending = "".join(self.chars[self.body_emitted:end])
+        if pending:
+            self.body_emitted = end
+            if self.on_body:
+                self.on_body(pending)
+
+    def _step(self, char):
+        state = self.state
+        if state == "start":
+            if char == "{":
+                self.state = "key_or_end"
+        elif state == "key_or_end":
+            if char == '"':
+                self.state = "key"
+                self.chars = []
+            elif char == "}":
+                self.state = "done"
+        elif state in ("key", "value"):
+            self._string_char(char)
+        elif state == "colon":
+            if char == ":":
+                self.state = "value_start"
+        elif state == "value_start":
+            if char == '"':
+                self.state = "value"
+                self.chars = []
+                self.body_emitted = 0
+            elif not char.isspace():
+                self.state = "other_value"
+                self.depth = 1 if char in "[{" else 0
+        elif state == "other_value":
+            self._skip_value_char(char)
+
+    def _skip_value_char(self, char):
+        # Non-string values are skipped; strings inside nested values are not
+        # expected in the issue schema, so only bracket depth is tracked.
+        if char in "[{":
+            self.depth += 1
+        elif char in "]}":
+            if self.depth == 0:
+                self.state = "done"
+            else:
+                self.depth -= 1
+        elif char == "," and self.depth == 0:
+            self.state = "key_or_end"
+
+    def _string_char(self, char):
+        if self.escape is not None:
+            self.escape += char
+            if self.escape[0] == "u":
+                if len(self.escape) == 5:
+                    self._append_unicode(int(self.escape[1:], 16))
+                    self.escape = None
+            else:
+                self.chars.append(ESCAPES.get(self.escape, self.escape))
+                self.escape = None
+        elif char == "\\":
+            self.escape = ""
+        elif char == '"':
+            self._end_string()
+        else:
+            self.chars.append(char)
+
+    def _append_unicode(self, code):
+        # Recombine UTF-16 surrogate pairs split across two \u escapes
+        if 0xDC00 <= code <= 0xDFFF and self.chars and 0xD800 <= ord(self.chars[-1]) <= 0xDBFF:
+            high = ord(self.chars.pop())
+            code = 0x10000 + ((high - 0xD800) << 10) + (code - 0xDC00)
+        self.chars.append(chr(code))
+
+    def _end_string(self):
+        if self.state == "key":
+            self.key = "".join(self.chars)
+            self.state = "colon"
+            return
+
+        if self.key == "title":
+            self.title = "".join(self.chars)
+            if self.on_title:
+                self.on_title(self.title)
+        elif self.key == "body":
+            self._emit_body(final=True)
+        self.state = "key_or_end"
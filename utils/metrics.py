@@ -0,0 +1,123 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, spanning cached lookups through slow LLM calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+METRIC_PREFIX = "issue_creator"
+
+_lock = threading.Lock()
+_metrics = {}
+
+def _label_key(labels):
+    return tuple(sorted((labels or {}).items()))
+
+def _metric(name, metric_type, help_text):
+    metric = _metrics.get(name)
+    if metric is None:
+        metric = {"type": metric_type, "help": help_text, "samples": {}}
+        _metrics[name] = metric
+    return metric
+
+def inc_counter(name, help_text, labels=None, amount=1):
+    """Increase a counter."""
+    with _lock:
+        samples = _metric(name, "counter", help_text)["samples"]
+        key = _label_key(labels)
+        samples[key] = samples.get(key, 0) + amount
+
+def set_gauge(name, help_text, value, labels=None):
+    """Set a gauge to an absolute value."""
+    with _lock:
+        _metric(name, "gauge", help_text)["samples"][_label_key(labels)] = value
+
+def add_gauge(name, help_text, amount, labels=None):
+    """Move a gauge up or down."""
+    with _lock:
+        samples = _metric(name, "gauge", help_text)["samples"]
+        key = _label_key(labels)
+        samples[key] = samples.get(key, 0) + amount
+
+def observe_histogram(name, help_text, value, labels=None, buckets=LATENCY_BUCKETS):
+    """Record one observation in a cumulative histogram."""
+    with _lock:
+        samples = _metric(name, "histogram", help_text)["samples"]
+        key = _label_key(labels)
+        sample = samples.get(key)
+        if sample is None:
+            sample = {"buckets": buckets, "counts": [0] * len(buckets), "sum": 0.0, "count": 0}
+            samples[key] = sample
+        for i, bound in enumerate(sample["buckets"]):
+            if value <= bound:
+                sample["counts"][i] += 1
+        sample["sum"] += value
+        sample["count"] += 1
+
+@contextmanager
+def track_stage(stage, **labels):
+    """
+    Time a pipeline stage: records its latency histogram, counts errors and
+    keeps an in-flight gauge while it runs.
+    """
+    labels = dict(labels, stage=stage)
+    add_gauge(f"{METRIC_PREFIX}_stage_in_flight", "Pipeline stages currently running", 1, labels)
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        inc_counter(f"{METRIC_PREFIX}_stage_errors_total", "Pipeline stage failures", labels)
+        raise
+    finally:
+        observe_histogram(
+            f"{METRIC_PREFIX}_stage_duration_seconds",
+            "Pipeline stage latency in seconds",
+            time.perf_counter() - started,
+            labels
+        )
+        add_gauge(f"{METRIC_PREFIX}_stage_in_flight", "Pipeline stages currently running", -1, labels)
+
+def _format_labels(key, extra=None):
+    items = list(key) + list(extra or [])
+    if not items:
+        return ""
+    pairs = []
+    for name, value in items:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+def render_prometheus():
+    """Render every metric in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        for name in sorted(_metrics):
+            metric = _metrics[name]
+            lines.append(f"# HELP {name} {metric['help']}")
+            lines.append(f"# TYPE {name} {metric['type']}")
+            for key, sample in sorted(metric["samples"].items()):
+                if metric["type"] != "histogram":
+                    lines.append(f"{name}{_format_labels(key)} {sample}")
+                    continue
+                for bound, count in zip(sample["buckets"], sample["counts"]):
+                    lines.append(f"{name}_bucket{_format_labels(key, [('le', bound)])} {count}")
+                lines.append(f"{name}_bucket{_format_labels(key, [('le', '+Inf')])} {sample['count']}")
+                lines.append(f"{name}_sum{_format_labels(key)} {sample['sum']}")
+                lines.append(f"{name}_count{_format_labels(key)} {sample['count']}")
+    return "\n".join(lines) + "\n"
+
+def get_stage_summary():
+    """Return {stage: {"count", "sum", "errors"}} for quick inspection and benchmarks."""
+    summary = {}
+    with _lock:
+        durations = _metrics.get(f"{METRIC_PREFIX}_stage_duration_seconds", {"samples": {}})["samples"]
+        errors = _metrics.get(f"{METRIC_PREFIX}_stage_errors_total", {"samples": {}})["samples"]
+        for key, sample in durations.items():
+            stage = dict(key)["stage"]
+            entry = summary.setdefault(stage, {"count": 0, "sum": 0.0, "errors": 0})
+            entry["count"] += sample["count"]
+            entry["sum"] += sample["sum"]
+        for key, count in errors.items():
+            stage = dict(key)["stage"]
+            summary.setdefault(stage, {"count": 0, "sum": 0.0, "errors": 0})["errors"] += count
+    return summary
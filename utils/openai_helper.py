@@ -1,14 +1,36 @@
 import os
 import json
 import logging
-from openai import OpenAI
+import threading
 
 # the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
 # do not change this unless explicitly requested by the user
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
-client = OpenAI(api_key=OPENAI_API_KEY)
-
-def process_issue_description(description, code_context=''):
+OPENAI_MODEL = "gpt-4o"
+# Bump whenever the issue prompt below changes so cached issues are not reused
+PROMPT_VERSION = "1"
+
+# The SDK is slow to import and only needed for the secondary provider and the
+# GraphQL fallback, so the client is created on first use
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """Return the shared OpenAI client, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            from openai import OpenAI
+            _client = OpenAI(api_key=OPENAI_API_KEY)
+        return _client
+
+def process_issue_description(description, code_context='', on_partial=None, timeout=None, cancel_event=None,
+                              label_options=None):
+    """
+    Generate a well-formatted GitHub issue using GPT-4o.
+    Accepts the same keyword arguments as the Gemini helper; the response is not
+    streamed, so on_partial and cancel_event are only honoured around the call.
+    """
     try:
         context_prompt = ""
         if code_context:
@@ -20,8 +42,13 @@ Here is the relevant code context to consider:
 
 Please use this code context to create a more detailed and specific issue."""
 
-        response = client.chat.completions.create(
-            model="gpt-4o",
+        labels_prompt = ""
+        if label_options:
+            labels_prompt = f"""
+- Also include a "labels" field: a JSON array of up to three labels that fit the issue, chosen only from {json.dumps(label_options)}"""
+
+        response = get_client().chat.completions.create(
+            model=OPENAI_MODEL,
             messages=[
                 {
                     "role": "system",
@@ -41,7 +68,7 @@ IMPORTANT:
 - Do not reference any issues or pull requests
 - Keep all information factual and based only on the provided description and code context
 - If code context is provided, use it to make the issue more specific and technical
-- Include relevant code snippets from the context if they help explain the issue
+- Include relevant code snippets from the context if they help explain the issue{labels_prompt}
 
 Return a JSON response in exactly this format:
 {{
@@ -54,14 +81,20 @@ Return a JSON response in exactly this format:
                     "content": f"Create a GitHub issue from this description and format it as JSON: {description}\n\n{context_prompt}"
                 }
             ],
-            response_format={"type": "json_object"}
+            response_format={"type": "json_object"},
+            timeout=timeout
         )
+        if cancel_event and cancel_event.is_set():
+            raise Exception("Generation cancelled")
 
         # Parse the JSON response
         try:
             result = json.loads(response.choices[0].message.content)
             if not isinstance(result, dict) or 'title' not in result or 'body' not in result:
                 raise ValueError("Invalid response format from OpenAI")
+            if on_partial:
+                on_partial({'title': result['title']})
+                on_partial({'body_delta': result['body']})
             return result
         except json.JSONDecodeError as e:
             raise Exception(f"Failed to parse OpenAI response as JSON: {str(e)}")
@@ -77,8 +110,8 @@ def generate_github_graphql_query(operation_type, params):
         if schema_info:
             schema_context = f"\nHere is the relevant schema information:\n{json.dumps(schema_info, indent=2)}"
 
-        response = client.chat.completions.create(
-            model="gpt-4o",
+        response = get_client().chat.completions.create(
+            model=OPENAI_MODEL,
             messages=[
                 {
                     "role": "system",
@@ -93,14 +126,19 @@ query GetRepositoryId($owner: String!, $name: String!) {{
     }}
 }}
 
-For create_issue_mutation, generate a mutation like this:
-mutation CreateIssue($repositoryId: ID!, $title: String!, $body: String!) {{
+For create_issue_mutation, generate a mutation like this, passing every
+parameter given (labelIds, assigneeIds and milestoneId may be null):
+mutation CreateIssue($repositoryId: ID!, $title: String!, $body: String!, $labelIds: [ID!], $assigneeIds: [ID!], $milestoneId: ID) {{
     createIssue(input: {{
         repositoryId: $repositoryId
         title: $title
         body: $body
+        labelIds: $labelIds
+        assigneeIds: $assigneeIds
+        milestoneId: $milestoneId
     }}) {{
         issue {{
+            id
             url
             number
         }}
@@ -0,0 +1,387 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import requests
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import inspect, text
+
+from .github import (
+    GitHubRequestAmbiguous,
+    create_github_issue,
+    create_github_issues,
+    extract_repo_info,
+    find_issues_by_markers,
+    new_marker,
+    token_fingerprint,
+)
+from .metrics import inc_counter, track_stage
+from .rate_limit import RateLimitExceeded
+
+logger = logging.getLogger(__name__)
+
+# Durable queue of formatted issues waiting to be created on GitHub. SQLite by
+# default; point DATABASE_URL at PostgreSQL to share it between hosts.
+OUTBOX_ENABLED = os.environ.get("OUTBOX_ENABLED", "true").lower() == "true"
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///outbox.db")
+OUTBOX_BATCH_SIZE = int(os.environ.get("OUTBOX_BATCH_SIZE", 50))
+OUTBOX_POLL_SECONDS = float(os.environ.get("OUTBOX_POLL_SECONDS", 5))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", 8))
+OUTBOX_RETRY_BASE = float(os.environ.get("OUTBOX_RETRY_BASE", 10))
+OUTBOX_RETRY_MAX = float(os.environ.get("OUTBOX_RETRY_MAX", 15 * 60))
+# A claimed item not finished within this time is assumed to belong to a
+# worker that died; it is released and checked for on GitHub before resubmitting
+OUTBOX_CLAIM_TIMEOUT = int(os.environ.get("OUTBOX_CLAIM_TIMEOUT", 5 * 60))
+
+OUTBOX_STATES = ("pending", "submitting", "created", "failed")
+
+# Failures that say nothing about the issue itself, so it is kept and retried
+TRANSIENT_ERRORS = (RateLimitExceeded, GitHubRequestAmbiguous, requests.exceptions.RequestException)
+# Batch results only carry the error text, so the message is matched as well
+TRANSIENT_MESSAGE = re.compile(
+    r"HTTP (5\d\d|429)\b|rate limit|timed out|Max retries exceeded|Connection (aborted|refused|reset)",
+    re.IGNORECASE
+)
+
+db = SQLAlchemy()
+
+_app = None
+
+# Tokens are never written to the database: items only record the token's
+# fingerprint and are drained while this process knows the matching token.
+# A user token is held only while it has pending or submitting items; the
+# server's GITHUB_TOKEN is kept for the life of the process.
+_tokens = {}
+_pinned_tokens = set()
+_tokens_lock = threading.Lock()
+
+class OutboxItem(db.Model):
+    __tablename__ = "issue_outbox"
+
+    id = db.Column(db.String(32), primary_key=True)
+    repo_url = db.Column(db.String(512), nullable=False)
+    title = db.Column(db.Text, nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    marker = db.Column(db.String(128))
+    # Label, assignee and milestone names as JSON; resolved to IDs at submission
+    issue_fields = db.Column(db.Text)
+    token_fingerprint = db.Column(db.String(64), nullable=False, index=True)
+    session_id = db.Column(db.String(128))
+    status = db.Column(db.String(16), nullable=False, default="pending", index=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text)
+    issue_url = db.Column(db.String(512))
+    issue_number = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "repo_url": self.repo_url,
+            "title": self.title,
+            **self.fields(),
+            "status": self.status,
+            "attempts": self.attempts,
+            "last_error": self.last_error,
+            "url": self.issue_url,
+            "number": self.issue_number,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat(),
+            "next_attempt_at": self.next_attempt_at.isoformat() if self.status == "pending" else None,
+        }
+
+    def fields(self):
+        """Return the stored {"labels", "assignees", "milestone"} names."""
+        return json.loads(self.issue_fields) if self.issue_fields else {}
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def init_outbox(app):
+    """Bind the outbox to the Flask app and create its table."""
+    global _app
+    app.config.setdefault("SQLALCHEMY_DATABASE_URI", DATABASE_URL)
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", {"pool_recycle": 300, "pool_pre_ping": True})
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        _add_missing_columns()
+    _app = app
+    if os.environ.get("GITHUB_TOKEN"):
+        remember_token(os.environ["GITHUB_TOKEN"])
+        _pinned_tokens.add(token_fingerprint(os.environ["GITHUB_TOKEN"]))
+
+def _add_missing_columns():
+    """Add nullable columns introduced after an existing outbox table was created."""
+    existing = {column["name"] for column in inspect(db.engine).get_columns(OutboxItem.__tablename__)}
+    for column in OutboxItem.__table__.columns:
+        if column.name not in existing and column.nullable:
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            with db.engine.begin() as connection:
+                connection.execute(text(f"ALTER TABLE {OutboxItem.__tablename__} ADD COLUMN {column.name} {column_type}"))
+            logger.info(f"Added column {column.name} to {OutboxItem.__tablename__}")
+
+def remember_token(token):
+    """Make a token available to the drain worker for items submitted with it."""
+    with _tokens_lock:
+        _tokens[token_fingerprint(token)] = token
+
+def forget_settled_tokens(fingerprints):
+    """
+    Drop the tokens for `fingerprints` that no longer have pending or
+    submitting items. Callers need an app context. enqueue_issue() stores its
+    item before remembering the token, so a token is never dropped while an
+    item that needs it is being added.
+    """
+    with _tokens_lock:
+        candidates = [
+            fingerprint for fingerprint in fingerprints
+            if fingerprint in _tokens and fingerprint not in _pinned_tokens
+        ]
+        if not candidates:
+            return
+        busy = {
+            fingerprint for (fingerprint,) in db.session.query(OutboxItem.token_fingerprint).filter(
+                OutboxItem.token_fingerprint.in_(candidates),
+                OutboxItem.status.in_(("pending", "submitting"))
+            ).distinct()
+        }
+        for fingerprint in candidates:
+            if fingerprint not in busy:
+                del _tokens[fingerprint]
+
+def release_token(token):
+    """Forget a token (e.g. on sign-out) unless it still has items waiting to be submitted."""
+    with _app.app_context():
+        forget_settled_tokens([token_fingerprint(token)])
+
+def is_transient_error(error):
+    """True when an error (or anything it wraps) means GitHub could not be reached or asked us to wait."""
+    while error is not None:
+        if isinstance(error, TRANSIENT_ERRORS):
+            return True
+        if TRANSIENT_MESSAGE.search(str(error)):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+def _retry_delay(attempts):
+    return min(OUTBOX_RETRY_MAX, OUTBOX_RETRY_BASE * (2 ** max(0, attempts - 1)))
+
+def _count(status):
+    inc_counter("issue_creator_outbox_transitions_total", "Outbox items moved to each state", {"status": status})
+
+def enqueue_issue(repo_url, title, body, token, session_id=None, claim=False, fields=None, marker=None):
+    """
+    Store a formatted issue before it is submitted and return its outbox ID.
+    With claim=True the item is reserved for an immediate submit_now() call
+    instead of being left for the drain worker. fields holds optional
+    "labels", "assignees" and "milestone" names; marker overrides the
+    idempotency marker otherwise generated for the item.
+    """
+    now = _utcnow()
+    item = OutboxItem(
+        id=uuid.uuid4().hex,
+        repo_url=repo_url,
+        title=title,
+        body=body,
+        marker=marker or new_marker(),
+        issue_fields=json.dumps(fields) if fields else None,
+        token_fingerprint=token_fingerprint(token),
+        session_id=session_id,
+        status="submitting" if claim else "pending",
+        attempts=0,
+        created_at=now,
+        updated_at=now,
+        next_attempt_at=now
+    )
+    with _app.app_context():
+        db.session.add(item)
+        db.session.commit()
+        remember_token(token)
+        _count("pending")
+        return item.id
+
+def _claim(item_ids):
+    """Atomically move pending items to "submitting"; returns the IDs this worker won."""
+    claimed = []
+    now = _utcnow()
+    for item_id in item_ids:
+        updated = OutboxItem.query.filter_by(id=item_id, status="pending").update(
+            {"status": "submitting", "updated_at": now},
+            synchronize_session=False
+        )
+        if updated:
+            claimed.append(item_id)
+    db.session.commit()
+    return claimed
+
+def _finish(item, result=None, error=None, transient=True):
+    """Record the outcome of a submission attempt on a claimed item."""
+    now = _utcnow()
+    item.attempts += 1
+    item.updated_at = now
+    if result and result.get("success"):
+        item.status = "created"
+        item.issue_url = result["url"]
+        item.issue_number = result["number"]
+        item.last_error = None
+    elif transient and item.attempts < OUTBOX_MAX_ATTEMPTS:
+        item.status = "pending"
+        item.last_error = error
+        item.next_attempt_at = now + timedelta(seconds=_retry_delay(item.attempts))
+    else:
+        item.status = "failed"
+        item.last_error = error
+    _count(item.status)
+
+def submit_now(item_id, progress=None):
+    """
+    Submit an item enqueued with claim=True on the caller's thread. Returns the
+    create_github_issue result; on failure the item is either left queued for
+    the drain worker (transient errors) or marked failed, and the error re-raised.
+    """
+    with _app.app_context():
+        item = db.session.get(OutboxItem, item_id)
+        if item is None or item.status != "submitting":
+            raise Exception(f"Outbox item {item_id} is not claimed for submission")
+        token = _tokens.get(item.token_fingerprint)
+        try:
+            result = create_github_issue(
+                item.repo_url, item.title, item.body, token, progress=progress, marker=item.marker, **item.fields()
+            )
+        except Exception as e:
+            _finish(item, error=str(e), transient=is_transient_error(e))
+            db.session.commit()
+            forget_settled_tokens([item.token_fingerprint])
+            raise
+        _finish(item, result=result)
+        db.session.commit()
+        forget_settled_tokens([item.token_fingerprint])
+        return result
+
+def get_outbox_item(item_id, fingerprint):
+    """Return an outbox item as a dict, or None unless it was submitted with the token `fingerprint`."""
+    with _app.app_context():
+        item = db.session.get(OutboxItem, item_id)
+        return item.to_dict() if item and item.token_fingerprint == fingerprint else None
+
+def list_outbox_items(fingerprint, status=None, limit=50):
+    """Return the most recently updated items submitted with the token `fingerprint`, optionally filtered by status."""
+    with _app.app_context():
+        query = OutboxItem.query.filter_by(token_fingerprint=fingerprint)
+        if status:
+            query = query.filter_by(status=status)
+        return [item.to_dict() for item in query.order_by(OutboxItem.updated_at.desc()).limit(limit)]
+
+def get_outbox_stats(fingerprint=None):
+    """Return item counts per state, for one token's items when `fingerprint` is given."""
+    with _app.app_context():
+        query = db.session.query(OutboxItem.status, db.func.count(OutboxItem.id))
+        if fingerprint:
+            query = query.filter(OutboxItem.token_fingerprint == fingerprint)
+        counts = dict(query.group_by(OutboxItem.status).all())
+    return {state: counts.get(state, 0) for state in OUTBOX_STATES}
+
+def _release_stale_claims():
+    """Return items stuck in "submitting" (their worker died) to the queue."""
+    cutoff = _utcnow() - timedelta(seconds=OUTBOX_CLAIM_TIMEOUT)
+    released = OutboxItem.query.filter(
+        OutboxItem.status == "submitting",
+        OutboxItem.updated_at < cutoff
+    ).update(
+        {"status": "pending", "attempts": OutboxItem.attempts + 1, "updated_at": _utcnow()},
+        synchronize_session=False
+    )
+    db.session.commit()
+    if released:
+        logger.warning(f"Released {released} stale outbox claims")
+
+def _drain_group(repo_url, token, items):
+    """Submit items for one repository and token as a batch of aliased mutations."""
+    # Items that were tried before may already exist; match them by marker first
+    found = {}
+    retried = [item for item in items if item.attempts and item.marker]
+    if retried:
+        try:
+            owner, repo = extract_repo_info(repo_url)
+            found = find_issues_by_markers(owner, repo, token, [item.marker for item in retried])
+        except Exception as e:
+            # Resubmitting without the lookup could create an issue twice, so
+            # the retried items wait for a later pass and only new ones go now
+            logger.warning(f"Outbox marker lookup failed for {repo_url}: {str(e)}")
+            for item in retried:
+                _finish(item, error=f"Could not check for an earlier submission: {str(e)}", transient=True)
+            items = [item for item in items if item not in retried]
+
+    to_send = [item for item in items if item.marker not in found]
+    results = []
+    if to_send:
+        results = create_github_issues(
+            repo_url,
+            [dict(item.fields(), title=item.title, body=item.body, marker=item.marker) for item in to_send],
+            token
+        )
+    results = dict(zip((item.id for item in to_send), results))
+    for item in items:
+        result = found.get(item.marker) or results[item.id]
+        error = result.get("error")
+        _finish(item, result=result, error=error, transient=bool(error) and is_transient_error(Exception(error)))
+
+def drain_once(batch_size=OUTBOX_BATCH_SIZE):
+    """Submit up to batch_size due items; returns how many were attempted."""
+    with _app.app_context():
+        _release_stale_claims()
+        with _tokens_lock:
+            tokens = dict(_tokens)
+        if not tokens:
+            return 0
+
+        due = OutboxItem.query.filter(
+            OutboxItem.status == "pending",
+            OutboxItem.next_attempt_at <= _utcnow(),
+            OutboxItem.token_fingerprint.in_(list(tokens))
+        ).order_by(OutboxItem.created_at).limit(batch_size).all()
+        claimed = set(_claim([item.id for item in due]))
+        if not claimed:
+            return 0
+
+        groups = {}
+        for item in due:
+            if item.id in claimed:
+                db.session.refresh(item)
+                groups.setdefault((item.repo_url, item.token_fingerprint), []).append(item)
+
+        with track_stage("outbox_drain"):
+            for (repo_url, fingerprint), items in groups.items():
+                try:
+                    _drain_group(repo_url, tokens[fingerprint], items)
+                except Exception as e:
+                    for item in items:
+                        if item.status == "submitting":
+                            _finish(item, error=str(e), transient=is_transient_error(e))
+                db.session.commit()
+        forget_settled_tokens({fingerprint for _, fingerprint in groups})
+        return len(claimed)
+
+def start_drain_worker(interval=OUTBOX_POLL_SECONDS):
+    """Drain the outbox on a daemon thread, looping without delay while batches are full."""
+    def run():
+        while True:
+            try:
+                if drain_once() >= OUTBOX_BATCH_SIZE:
+                    continue
+            except Exception as e:
+                logger.warning(f"Outbox drain failed: {str(e)}")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=run, name="outbox-drain", daemon=True)
+    thread.start()
+    return thread
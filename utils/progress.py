@@ -0,0 +1,230 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_BACKEND = os.environ.get("PROGRESS_BACKEND", "memory")
+PROGRESS_DB_PATH = os.environ.get("PROGRESS_DB_PATH", "/tmp/issue_creator_progress.db")
+PROGRESS_BUFFER_SIZE = int(os.environ.get("PROGRESS_BUFFER_SIZE", 256))
+PROGRESS_SESSION_TTL = int(os.environ.get("PROGRESS_SESSION_TTL", 5 * 60))
+PROGRESS_CLEANUP_INTERVAL = int(os.environ.get("PROGRESS_CLEANUP_INTERVAL", 60))
+# Asynchronous job records are kept here too, so /jobs/<id> and
+# /progress/<job_id> work on whichever worker serves them
+PROGRESS_JOB_TTL = int(os.environ.get("PROGRESS_JOB_TTL", 15 * 60))
+
+class InMemoryProgressBackend:
+    """
+    Per-process progress bus. Each session keeps a bounded buffer of numbered
+    events so a subscriber that connects late, or reconnects, can still read them.
+    Only suitable when publisher and subscriber share a process.
+    """
+
+    def __init__(self, buffer_size=PROGRESS_BUFFER_SIZE, session_ttl=PROGRESS_SESSION_TTL, job_ttl=PROGRESS_JOB_TTL):
+        self.buffer_size = buffer_size
+        self.session_ttl = session_ttl
+        self.job_ttl = job_ttl
+        self._sessions = {}
+        self._jobs = {}
+        self._cond = threading.Condition()
+
+    def publish(self, session_id, event):
+        """Append an event to the session buffer and return its event ID."""
+        with self._cond:
+            state = self._sessions.get(session_id)
+            if state is None:
+                state = {"events": deque(maxlen=self.buffer_size), "next_id": 1, "touched": time.time()}
+                self._sessions[session_id] = state
+            event_id = state["next_id"]
+            state["next_id"] += 1
+            state["events"].append((event_id, event))
+            state["touched"] = time.time()
+            self._cond.notify_all()
+            return event_id
+
+    def _events_after(self, session_id, after_id):
+        state = self._sessions.get(session_id)
+        if state is None:
+            return []
+        state["touched"] = time.time()
+        return [(event_id, event) for event_id, event in state["events"] if event_id > after_id]
+
+    def read(self, session_id, after_id=0, timeout=None):
+        """Return buffered events newer than after_id, waiting up to timeout for one."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                events = self._events_after(session_id, after_id)
+                if events:
+                    return events
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return []
+                self._cond.wait(remaining)
+
+    def discard(self, session_id):
+        """Drop the buffer for a finished session."""
+        with self._cond:
+            self._sessions.pop(session_id, None)
+
+    def save_job(self, job):
+        """Store the latest record of an asynchronous job."""
+        with self._cond:
+            self._jobs[job["id"]] = (dict(job), time.time())
+
+    def get_job(self, job_id):
+        """Return a stored job record, or None."""
+        with self._cond:
+            entry = self._jobs.get(job_id)
+            return dict(entry[0]) if entry else None
+
+    def cleanup(self):
+        """Remove sessions that have been idle for longer than the TTL, and expired job records."""
+        now = time.time()
+        with self._cond:
+            expired = [sid for sid, state in self._sessions.items() if state["touched"] < now - self.session_ttl]
+            for session_id in expired:
+                del self._sessions[session_id]
+            for job_id in [job_id for job_id, (_, saved_at) in self._jobs.items() if saved_at < now - self.job_ttl]:
+                del self._jobs[job_id]
+        return len(expired)
+
+class SQLiteProgressBackend:
+    """
+    Cross-process progress bus stored in a local SQLite database in WAL mode,
+    so a /progress stream and the request publishing to it may be served by
+    different gunicorn workers. Subscribers poll for new rows.
+    """
+
+    def __init__(self, path=PROGRESS_DB_PATH, buffer_size=PROGRESS_BUFFER_SIZE,
+                 session_ttl=PROGRESS_SESSION_TTL, poll_interval=0.05, job_ttl=PROGRESS_JOB_TTL):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.session_ttl = session_ttl
+        self.job_ttl = job_ttl
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS progress_events (
+                session_id TEXT NOT NULL,
+                event_id INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (session_id, event_id)
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS progress_jobs (
+                job_id TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                saved_at REAL NOT NULL
+            )
+        """)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def publish(self, session_id, event):
+        """Append an event to the session buffer and return its event ID."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            (event_id,) = conn.execute(
+                "SELECT COALESCE(MAX(event_id), 0) + 1 FROM progress_events WHERE session_id = ?",
+                (session_id,)
+            ).fetchone()
+            conn.execute(
+                "INSERT INTO progress_events (session_id, event_id, payload, created_at) VALUES (?, ?, ?, ?)",
+                (session_id, event_id, json.dumps(event), time.time())
+            )
+            conn.execute(
+                "DELETE FROM progress_events WHERE session_id = ? AND event_id <= ?",
+                (session_id, event_id - self.buffer_size)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return event_id
+
+    def read(self, session_id, after_id=0, timeout=None):
+        """Return buffered events newer than after_id, polling up to timeout for one."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        conn = self._connection()
+        while True:
+            rows = conn.execute(
+                "SELECT event_id, payload FROM progress_events WHERE session_id = ? AND event_id > ? ORDER BY event_id",
+                (session_id, after_id)
+            ).fetchall()
+            if rows:
+                return [(event_id, json.loads(payload)) for event_id, payload in rows]
+            if deadline is not None and time.monotonic() >= deadline:
+                return []
+            time.sleep(self.poll_interval)
+
+    def discard(self, session_id):
+        """Drop the buffer for a finished session."""
+        self._connection().execute("DELETE FROM progress_events WHERE session_id = ?", (session_id,))
+
+    def save_job(self, job):
+        """Store the latest record of an asynchronous job."""
+        self._connection().execute(
+            "INSERT OR REPLACE INTO progress_jobs (job_id, payload, saved_at) VALUES (?, ?, ?)",
+            (job["id"], json.dumps(job), time.time())
+        )
+
+    def get_job(self, job_id):
+        """Return a stored job record, or None."""
+        row = self._connection().execute(
+            "SELECT payload FROM progress_jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def cleanup(self):
+        """Remove sessions whose newest event is older than the TTL, and expired job records."""
+        conn = self._connection()
+        cursor = conn.execute(
+            """
+            DELETE FROM progress_events WHERE session_id IN (
+                SELECT session_id FROM progress_events GROUP BY session_id HAVING MAX(created_at) < ?
+            )
+            """,
+            (time.time() - self.session_ttl,)
+        )
+        conn.execute("DELETE FROM progress_jobs WHERE saved_at < ?", (time.time() - self.job_ttl,))
+        return cursor.rowcount
+
+def create_progress_backend(name=PROGRESS_BACKEND):
+    """Instantiate the progress backend selected by name ("memory" or "sqlite")."""
+    if name == "memory":
+        return InMemoryProgressBackend()
+    if name == "sqlite":
+        return SQLiteProgressBackend()
+    raise ValueError(f"Unknown progress backend: {name}")
+
+def start_cleanup_thread(backend, interval=PROGRESS_CLEANUP_INTERVAL):
+    """Run backend.cleanup() every `interval` seconds on a daemon thread."""
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                removed = backend.cleanup()
+                if removed:
+                    logger.debug(f"Removed {removed} expired progress entries")
+            except Exception as e:
+                logger.warning(f"Progress cleanup failed: {str(e)}")
+
+    thread = threading.Thread(target=run, name="progress-cleanup", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,198 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from . import gemini_helper, openai_helper
+from .admission import llm_admission
+from .issue_cache import get_cached_issue, issue_cache_key, store_issue
+from .metrics import track_stage
+
+logger = logging.getLogger(__name__)
+
+# "single" sends every request to the primary provider only; "hedged" starts the
+# secondary when the primary has not answered within its recent latency percentile.
+LLM_MODE = os.environ.get("LLM_MODE", "single")
+LLM_PRIMARY_PROVIDER = os.environ.get("LLM_PRIMARY_PROVIDER", "gemini")
+LLM_SECONDARY_PROVIDER = os.environ.get("LLM_SECONDARY_PROVIDER", "openai")
+LLM_DEADLINE = float(os.environ.get("LLM_DEADLINE", 60))
+LLM_HEDGE_PERCENTILE = float(os.environ.get("LLM_HEDGE_PERCENTILE", 90))
+LLM_HEDGE_DEFAULT_DELAY = float(os.environ.get("LLM_HEDGE_DEFAULT_DELAY", 5))
+LLM_HEDGE_MIN_DELAY = float(os.environ.get("LLM_HEDGE_MIN_DELAY", 1))
+LLM_HEDGE_MAX_DELAY = float(os.environ.get("LLM_HEDGE_MAX_DELAY", 20))
+LLM_HEDGE_MIN_SAMPLES = 20
+# Labels kept from a model's suggestions (the prompts ask for up to three)
+MAX_SUGGESTED_LABELS = 3
+
+PROVIDERS = {
+    "gemini": gemini_helper.process_issue_description,
+    "openai": openai_helper.process_issue_description,
+}
+
+# Model and prompt version behind each provider; cached issues are keyed by
+# these so a result is only reused for the model that produced it
+PROVIDER_MODELS = {
+    "gemini": (gemini_helper.GEMINI_MODEL, gemini_helper.PROMPT_VERSION),
+    "openai": (openai_helper.OPENAI_MODEL, openai_helper.PROMPT_VERSION),
+}
+
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("LLM_PROVIDER_THREADS", 32)),
+    thread_name_prefix="llm"
+)
+
+class LatencyTracker:
+    """Rolling window of successful call latencies per provider."""
+
+    def __init__(self, window=200):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, provider, seconds):
+        with self._lock:
+            self._samples.setdefault(provider, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, provider, pct):
+        """Return the pct-th percentile latency in seconds, or None without enough samples."""
+        with self._lock:
+            samples = sorted(self._samples.get(provider, ()))
+        if len(samples) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def stats(self):
+        """Return sample counts and p50/p90/p99 per provider, in seconds."""
+        with self._lock:
+            providers = {name: sorted(samples) for name, samples in self._samples.items()}
+        stats = {}
+        for name, samples in providers.items():
+            pick = lambda pct: samples[min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))]
+            stats[name] = {"count": len(samples), "p50": pick(50), "p90": pick(90), "p99": pick(99)}
+        return stats
+
+latency_tracker = LatencyTracker()
+
+def hedge_delay(provider=LLM_PRIMARY_PROVIDER):
+    """Seconds to wait for the primary before launching the secondary."""
+    delay = latency_tracker.percentile(provider, LLM_HEDGE_PERCENTILE)
+    if delay is None:
+        return LLM_HEDGE_DEFAULT_DELAY
+    return min(LLM_HEDGE_MAX_DELAY, max(LLM_HEDGE_MIN_DELAY, delay))
+
+def _suggested_labels(result, label_options):
+    """Keep only suggested labels that exist in the repository, in its spelling."""
+    known = {label.lower(): label for label in label_options}
+    suggested = result.get("labels") if isinstance(result.get("labels"), list) else []
+    picked = []
+    for label in suggested:
+        label = known.get(str(label).lower())
+        if label and label not in picked:
+            picked.append(label)
+    return picked[:MAX_SUGGESTED_LABELS]
+
+def _cache_key(name, description, code_context, label_options):
+    model_name, prompt_version = PROVIDER_MODELS[name]
+    return issue_cache_key(description, code_context, model_name, prompt_version, label_options)
+
+def _cached_result(providers, description, code_context, on_partial, label_options):
+    """Return the first cached result from the given providers, replaying it to on_partial."""
+    for name in providers:
+        cached = get_cached_issue(_cache_key(name, description, code_context, label_options))
+        if cached is not None:
+            if on_partial:
+                on_partial({'title': cached['title']})
+                on_partial({'body_delta': cached['body']})
+            logger.info(f"Issue served from the {name} cache")
+            return cached
+    return None
+
+def _call_provider(name, description, code_context, on_partial, timeout, cancel_event, label_options=None):
+    started = time.perf_counter()
+    with track_stage("llm_provider", provider=name):
+        result = PROVIDERS[name](
+            description,
+            code_context,
+            on_partial=on_partial,
+            timeout=timeout,
+            cancel_event=cancel_event,
+            label_options=label_options
+        )
+    latency_tracker.record(name, time.perf_counter() - started)
+    if label_options:
+        result = dict(result, labels=_suggested_labels(result, label_options))
+    store_issue(_cache_key(name, description, code_context, label_options), result)
+    return result
+
+def format_issue(description, code_context='', on_partial=None, mode=None, label_options=None, admission_key=None):
+    """
+    Format an issue with the configured provider(s) and return {"title", "body"}.
+    In hedged mode the secondary provider is started once the primary exceeds
+    its hedge delay (or fails); the first valid result wins and the other call
+    is cancelled. With label_options (a repository's label names) the result
+    also has "labels", the ones the model picked from that list. Results are
+    cached per producing model, so a repeat request skips the providers; with
+    admission_key only calls that reach a provider wait for an LLM admission slot.
+    """
+    mode = mode or LLM_MODE
+    providers = [LLM_PRIMARY_PROVIDER] if mode != "hedged" else [LLM_PRIMARY_PROVIDER, LLM_SECONDARY_PROVIDER]
+    cached = _cached_result(providers, description, code_context, on_partial, label_options)
+    if cached is not None:
+        return cached
+    with llm_admission.admit(admission_key) if admission_key else nullcontext():
+        return _call_providers(description, code_context, on_partial, mode, label_options)
+
+def _call_providers(description, code_context, on_partial, mode, label_options):
+    if mode != "hedged":
+        return _call_provider(
+            LLM_PRIMARY_PROVIDER, description, code_context, on_partial, LLM_DEADLINE, None, label_options
+        )
+
+    deadline = time.monotonic() + LLM_DEADLINE
+    cancel_events = {LLM_PRIMARY_PROVIDER: threading.Event(), LLM_SECONDARY_PROVIDER: threading.Event()}
+    futures = {
+        _executor.submit(
+            _call_provider, LLM_PRIMARY_PROVIDER, description, code_context, on_partial,
+            LLM_DEADLINE, cancel_events[LLM_PRIMARY_PROVIDER], label_options
+        ): LLM_PRIMARY_PROVIDER
+    }
+
+    done, _ = wait(futures, timeout=hedge_delay())
+    errors = []
+    hedged = False
+    while True:
+        for future in done:
+            provider = futures.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                errors.append(f"{provider}: {str(e)}")
+                continue
+            for other in futures.values():
+                cancel_events[other].set()
+            for other_future in futures:
+                other_future.cancel()
+            if provider != LLM_PRIMARY_PROVIDER and on_partial:
+                on_partial({'title': result['title'], 'body': result['body']})
+            logger.info(f"Issue formatted by {provider}{' (hedged)' if hedged else ''}")
+            return result
+
+        remaining = deadline - time.monotonic()
+        if not hedged and remaining > 0:
+            # The primary is slow or failed: start the secondary alongside it
+            hedged = True
+            futures[_executor.submit(
+                _call_provider, LLM_SECONDARY_PROVIDER, description, code_context, None,
+                remaining, cancel_events[LLM_SECONDARY_PROVIDER], label_options
+            )] = LLM_SECONDARY_PROVIDER
+
+        if not futures or remaining <= 0:
+            for event in cancel_events.values():
+                event.set()
+            reason = "; ".join(errors) or f"no provider answered within {LLM_DEADLINE:.0f}s"
+            raise Exception(f"Failed to process issue description: {reason}")
+
+        done, _ = wait(futures, timeout=remaining, return_when=FIRST_COMPLETED)
@@ -0,0 +1,166 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+# Transient HTTP statuses worth retrying
+RETRYABLE_STATUS = {500, 502, 503, 504}
+
+class RateLimitExceeded(Exception):
+    """Raised when a token's quota is exhausted for longer than we are willing to wait."""
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, up to `capacity` banked."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, cost=1):
+        """Take `cost` tokens, returning how long the caller must wait before proceeding."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= cost
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def refund(self, cost=1):
+        """Give back tokens from a reservation that was not used."""
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + cost)
+
+def classify_response(response):
+    """
+    Sort a GitHub response into "ok", "rate_limited" (rejected before it ran,
+    so always safe to retry) or "transient" (may or may not have been applied).
+    """
+    if response.status_code in RETRYABLE_STATUS:
+        return "transient"
+    if response.status_code == 429:
+        return "rate_limited"
+    if response.status_code == 403:
+        if response.headers.get("Retry-After") or response.headers.get("X-RateLimit-Remaining") == "0":
+            return "rate_limited"
+        if "rate limit" in response.text.lower():
+            return "rate_limited"
+        return "ok"
+    if response.status_code == 200:
+        try:
+            errors = response.json().get("errors") or []
+        except ValueError:
+            return "transient"
+        if any(error.get("type") == "RATE_LIMITED" for error in errors):
+            return "rate_limited"
+    return "ok"
+
+def retry_after_seconds(response):
+    """Seconds requested by a Retry-After header (delta or HTTP date), or None."""
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class RateLimitScheduler:
+    """
+    Paces GitHub requests per token. Each token gets a token bucket for all
+    requests and a slower one for content-creating mutations; the remaining
+    GraphQL points reported in response headers are tracked so requests wait
+    for the reset window instead of failing when a token runs dry.
+    """
+
+    def __init__(self, rate=5.0, burst=20, mutation_rate=80 / 60, mutation_burst=10,
+                 reserve=10, max_wait=30.0, max_retries=3, backoff_base=0.5, backoff_max=20.0):
+        self.rate = rate
+        self.burst = burst
+        self.mutation_rate = mutation_rate
+        self.mutation_burst = mutation_burst
+        self.reserve = reserve
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def _state(self, key):
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                state = {
+                    "bucket": TokenBucket(self.rate, self.burst),
+                    "mutations": TokenBucket(self.mutation_rate, self.mutation_burst),
+                    "remaining": None,
+                    "limit": None,
+                    "reset_at": None,
+                }
+                self._states[key] = state
+            return state
+
+    def acquire(self, key, mutation=False, cost=1):
+        """Block until a request for this token may be sent."""
+        state = self._state(key)
+        wait = 0.0
+        remaining, reset_at = state["remaining"], state["reset_at"]
+        if remaining is not None and reset_at and remaining <= self.reserve:
+            wait = reset_at - time.time()
+        if wait > self.max_wait:
+            raise RateLimitExceeded(f"GitHub rate limit for this token resets in {int(wait)}s")
+
+        wait = max(wait, state["bucket"].reserve())
+        if mutation:
+            wait = max(wait, state["mutations"].reserve(cost))
+        if wait > self.max_wait:
+            # A rejected call sends nothing, so it must not push later callers further back
+            state["bucket"].refund()
+            if mutation:
+                state["mutations"].refund(cost)
+            raise RateLimitExceeded(f"GitHub rate limit for this token resets in {int(wait)}s")
+        if wait > 0:
+            time.sleep(wait)
+
+    def record(self, key, response):
+        """Update the token's quota from X-RateLimit-* response headers."""
+        headers = response.headers
+        state = self._state(key)
+        try:
+            if "X-RateLimit-Remaining" in headers:
+                state["remaining"] = int(headers["X-RateLimit-Remaining"])
+            if "X-RateLimit-Limit" in headers:
+                state["limit"] = int(headers["X-RateLimit-Limit"])
+            if "X-RateLimit-Reset" in headers:
+                state["reset_at"] = float(headers["X-RateLimit-Reset"])
+        except ValueError:
+            pass
+
+    def backoff(self, attempt, response=None):
+        """Delay before retry number `attempt` (0-based): Retry-After if given, else jittered exponential."""
+        retry_after = retry_after_seconds(response)
+        if retry_after is not None:
+            return retry_after
+        if response is not None and response.headers.get("X-RateLimit-Remaining") == "0":
+            reset = response.headers.get("X-RateLimit-Reset")
+            if reset:
+                try:
+                    return max(0.0, float(reset) - time.time())
+                except ValueError:
+                    pass
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(ceiling / 2, ceiling)
+
+    def stats(self, key):
+        """Return the last known quota for a token key."""
+        state = self._state(key)
+        return {"remaining": state["remaining"], "limit": state["limit"], "reset_at": state["reset_at"]}